@@ -0,0 +1,261 @@
+"""
+Benchmarks for the per-frame detection hot path.
+
+Everything runs on synthetic frames, masks and landmarks, so no camera or
+model file is needed. Run from the repository root::
+
+    python -m benchmarks.detection_benchmark --output bench.json
+    python -m benchmarks.detection_benchmark --compare base.json bench.json
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from unittest import mock
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from mediapipe.tasks.python.components.containers.landmark import NormalizedLandmark
+from mediapipe.tasks.python.vision.pose_landmarker import PoseLandmarkerResult
+
+from yoga_pose_recognition.detection import yoga_pose_detector
+from yoga_pose_recognition.detection.landmarks import NUM_LANDMARKS, LandmarkBuffer
+from yoga_pose_recognition.detection.utils.compositing import MaskCompositor
+from yoga_pose_recognition.detection.utils.drawing_utils import DrawingUtils
+
+PERCENTILES = (50, 90, 99)
+
+
+class SyntheticScene:
+    """Seeded frames, masks and landmarker results of a given size."""
+
+    def __init__(self, width: int, height: int, seed: int) -> None:
+        self.rng = np.random.default_rng(seed)
+        self.width = width
+        self.height = height
+        self.frame = self.rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        self.background = self.rng.integers(
+            0,
+            255,
+            (height, width, 3),
+            dtype=np.uint8,
+        )
+        yy, xx = np.mgrid[0:height, 0:width]
+        # A soft ellipse roughly where a person would stand.
+        distance = ((xx - width / 2) / (width / 5)) ** 2 + (
+            (yy - height / 2) / (height / 2.2)
+        ) ** 2
+        self.mask = np.clip(1.5 - distance, 0, 1).astype(np.float32)
+        self.base_landmarks = self.rng.uniform(0.3, 0.7, (NUM_LANDMARKS, 3))
+
+    def result(self) -> PoseLandmarkerResult:
+        jitter = self.rng.normal(0, 0.005, self.base_landmarks.shape)
+        points = self.base_landmarks + jitter
+        return PoseLandmarkerResult(
+            pose_landmarks=[
+                [
+                    NormalizedLandmark(x=x, y=y, z=z, visibility=0.99, presence=0.99)
+                    for x, y, z in points.tolist()
+                ],
+            ],
+            pose_world_landmarks=[],
+            segmentation_masks=[
+                mp.Image(image_format=mp.ImageFormat.VEC32F1, data=self.mask),
+            ],
+        )
+
+    def image(self) -> mp.Image:
+        return mp.Image(image_format=mp.ImageFormat.SRGB, data=self.frame)
+
+
+def measure(
+    step: Callable[[], Any],
+    iterations: int,
+    warmup: int,
+) -> Dict[str, float]:
+    for _ in range(warmup):
+        step()
+
+    timings = np.empty(iterations, dtype=np.float64)
+    allocations = np.empty(iterations, dtype=np.float64)
+    tracemalloc.start()
+    try:
+        for i in range(iterations):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            started = time.perf_counter()
+            step()
+            timings[i] = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            allocations[i] = peak - current
+    finally:
+        tracemalloc.stop()
+
+    # tracemalloc slows every allocation down, so time a clean pass as well.
+    clean = np.empty(iterations, dtype=np.float64)
+    for i in range(iterations):
+        started = time.perf_counter()
+        step()
+        clean[i] = time.perf_counter() - started
+
+    stats = {f"p{p}_ms": float(np.percentile(clean, p) * 1000) for p in PERCENTILES}
+    stats["mean_ms"] = float(clean.mean() * 1000)
+    stats["fps"] = float(1 / clean.mean()) if clean.mean() > 0 else 0.0
+    stats["alloc_bytes_per_frame"] = float(np.median(allocations))
+    stats["traced_mean_ms"] = float(timings.mean() * 1000)
+    return stats
+
+
+def build_stages(scene: SyntheticScene, pose: str) -> Dict[str, Callable[[], Any]]:
+    drawing_utils = DrawingUtils()
+    landmark_buffer = LandmarkBuffer()
+    compositor = MaskCompositor()
+    soft_compositor = MaskCompositor(soft_blend=True)
+    results = [scene.result() for _ in range(32)]
+    landmarks = landmark_buffer.update(results[0])[0].copy()
+    _, status = drawing_utils.evaluate_pose(pose, landmarks)
+    canvas = scene.frame.copy()
+    composited = compositor.composite(scene.frame, scene.mask, scene.background)
+    result_index = itertools.count()
+    # 30 fps worth of timestamps so the temporal filter runs its normal path
+    frame_clock = itertools.count(0, 33)
+
+    with (
+        mock.patch.object(yoga_pose_detector, "open_source"),
+        mock.patch.object(yoga_pose_detector, "PoseLandmarker"),
+    ):
+        detector = yoga_pose_detector.YogaPoseDetector()
+    detector.current_pose = pose
+    detector.background_image = scene.background
+    image = scene.image()
+
+    def next_result() -> PoseLandmarkerResult:
+        return results[next(result_index) % len(results)]
+
+    def composite(mask_compositor: MaskCompositor) -> None:
+        output = mask_compositor.composite(scene.frame, scene.mask, scene.background)
+        # Encoded right away in the pipeline, so the buffer goes straight back.
+        mask_compositor.release(output)
+
+    return {
+        "landmark_buffer": lambda: landmark_buffer.update(next_result()),
+        "evaluate_pose": lambda: drawing_utils.evaluate_pose(pose, landmarks),
+        "draw_skeleton": lambda: drawing_utils.draw_pose_landmarks(
+            canvas,
+            landmarks,
+            status,
+        ),
+        "draw_landmarks_on_image": lambda: detector.draw_landmarks_on_image(
+            canvas,
+            next_result(),
+        ),
+        "composite_hard": lambda: composite(compositor),
+        "composite_soft": lambda: composite(soft_compositor),
+        "jpeg_encode": lambda: cv2.imencode(".jpg", composited),
+        "on_get_result": lambda: detector.on_get_result(
+            next_result(),
+            image,
+            next(frame_clock),
+        ),
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    scene = SyntheticScene(args.width, args.height, args.seed)
+    stages = build_stages(scene, args.pose)
+    selected = args.stages or list(stages)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "mediapipe": mp.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "system": platform.platform(),
+            "width": args.width,
+            "height": args.height,
+            "pose": args.pose,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "stages": {},
+    }
+    for name in selected:
+        report["stages"][name] = measure(stages[name], args.iterations, args.warmup)
+        write_row(name, report["stages"][name])
+    return report
+
+
+def write_row(name: str, stats: Dict[str, float]) -> None:
+    sys.stdout.write(
+        f"{name:<26}"
+        f"p50 {stats['p50_ms']:8.3f} ms  "
+        f"p99 {stats['p99_ms']:8.3f} ms  "
+        f"{stats['fps']:9.1f} fps  "
+        f"{stats['alloc_bytes_per_frame'] / 1024:9.1f} KiB/frame\n",
+    )
+
+
+def compare(baseline_path: str, candidate_path: str, threshold: float) -> int:
+    baseline = json.loads(Path(baseline_path).read_text())["stages"]
+    candidate = json.loads(Path(candidate_path).read_text())["stages"]
+
+    regressions: List[str] = []
+    for name in sorted(set(baseline) & set(candidate)):
+        before = baseline[name]["p50_ms"]
+        after = candidate[name]["p50_ms"]
+        change = (after - before) / before if before > 0 else 0.0
+        marker = ""
+        if change > threshold:
+            marker = "  REGRESSION"
+            regressions.append(name)
+        sys.stdout.write(
+            f"{name:<26}{before:8.3f} -> {after:8.3f} ms  {change:+7.1%}{marker}\n",
+        )
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--pose", default="triangle_pose")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="*", help="Only run these stages.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CANDIDATE"),
+        help="Compare two JSON reports instead of running.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative p50 slowdown reported as a regression.",
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    report = run(args)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
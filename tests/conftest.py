@@ -0,0 +1,33 @@
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pytest
+
+from yoga_pose_recognition.detection.landmarks import LANDMARK_FIELDS, NUM_LANDMARKS
+from yoga_pose_recognition.detection.models.pose import Pose, PoseData
+
+DATA_DIR = Path(__file__).parents[1] / "data"
+
+
+@pytest.fixture(scope="session")
+def poses() -> Dict[str, Pose]:
+    """The pose templates shipped in data/pose.json."""
+    pose_data = PoseData.model_validate_json((DATA_DIR / "pose.json").read_text())
+    return {pose.name: pose for pose in pose_data.poses}
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    return np.random.default_rng(0)
+
+
+def random_people(
+    rng: np.random.Generator,
+    count: int = 1,
+    dtype: type = np.float32,
+) -> list[np.ndarray]:
+    """(33, 4) landmark arrays with coordinates and visibility in [0, 1)."""
+    return [
+        rng.random((NUM_LANDMARKS, LANDMARK_FIELDS)).astype(dtype) for _ in range(count)
+    ]
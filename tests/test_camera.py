@@ -0,0 +1,83 @@
+import time
+from pathlib import Path
+from typing import List
+
+import cv2
+import numpy as np
+import pytest
+from loguru import logger
+
+from yoga_pose_recognition.detection.utils import camera
+from yoga_pose_recognition.detection.utils.camera import (
+    RING_SIZE,
+    Camera,
+    ImageSequenceSource,
+    ThreadedSource,
+)
+
+
+class FlakySource(ThreadedSource):
+    """Fails ``failures`` grabs, then delivers frames."""
+
+    def __init__(self, failures: int) -> None:
+        super().__init__("flaky")
+        self.failures = failures
+        self.grabbed_at: List[float] = []
+
+    def _grab(self, out: np.ndarray | None) -> np.ndarray | None:
+        self.grabbed_at.append(time.monotonic())
+        if len(self.grabbed_at) <= self.failures:
+            return None
+        return np.zeros((2, 2, 3), dtype=np.uint8)
+
+
+def test_threaded_source_requires_a_grab() -> None:
+    with pytest.raises(TypeError):
+        ThreadedSource("abstract")  # type: ignore[abstract]
+
+
+def test_failed_grabs_back_off(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(camera, "RETRY_DELAY_S", 0.01)
+    monkeypatch.setattr(camera, "MAX_RETRY_DELAY_S", 0.04)
+    source = FlakySource(failures=4)
+    try:
+        assert source.get_frame().shape == (2, 2, 3)
+    finally:
+        source.release()
+
+    gaps = np.diff(source.grabbed_at[:5])
+    assert (gaps >= [0.01, 0.02, 0.04, 0.04]).all()
+
+
+def test_camera_logs_a_disconnect_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(camera, "RETRY_DELAY_S", 0.01)
+    monkeypatch.setattr(camera, "MAX_RETRY_DELAY_S", 0.01)
+    monkeypatch.setattr(camera, "FRAME_TIMEOUT_S", 0.1)
+    messages: List[str] = []
+    sink = logger.add(messages.append, format="{level} {message}")
+    source = Camera("missing-camera.mp4")
+    try:
+        assert source.get_frame().size == 0
+    finally:
+        logger.remove(sink)
+        source.release()
+
+    assert [m for m in messages if m.startswith("ERROR")] == [
+        "ERROR Failed to read frame from camera-missing-camera.mp4, retrying.\n",
+    ]
+
+
+def test_image_sequence_reuses_the_ring(tmp_path: Path) -> None:
+    paths = []
+    for value in (0, 255):
+        path = tmp_path / f"{value}.png"
+        cv2.imwrite(str(path), np.full((4, 6, 3), value, dtype=np.uint8))
+        paths.append(path)
+    source = ImageSequenceSource(paths, fps=500)
+    try:
+        frames = [source.get_frame() for _ in range(3 * RING_SIZE)]
+    finally:
+        source.release()
+
+    assert all(frame.shape == (4, 6, 3) for frame in frames)
+    assert len({id(frame) for frame in frames}) <= RING_SIZE
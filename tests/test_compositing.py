@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+import pytest
+
+from yoga_pose_recognition.detection.utils.compositing import MaskCompositor
+
+
+def test_leased_outputs_are_never_reused() -> None:
+    compositor = MaskCompositor()
+    frame = np.full((4, 6, 3), 200, dtype=np.uint8)
+    mask = np.ones((4, 6), dtype=np.float32)
+
+    leased = [compositor.composite(frame, mask, None) for _ in range(5)]
+
+    assert len({id(output) for output in leased}) == 5
+    for output in leased:
+        np.testing.assert_array_equal(output, frame)
+
+
+def test_released_outputs_are_reused() -> None:
+    compositor = MaskCompositor()
+    frame = np.zeros((4, 6, 3), dtype=np.uint8)
+    mask = np.zeros((4, 6), dtype=np.float32)
+    first = compositor.composite(frame, mask, None)
+    compositor.release(first)
+    # Foreign arrays and double releases are ignored.
+    compositor.release(frame)
+    compositor.release(first)
+
+    outputs = {id(compositor.composite(frame, mask, None)) for _ in range(3)}
+
+    assert id(first) in outputs
+    assert id(frame) not in outputs
+    assert len(outputs) == 3
+
+
+@pytest.mark.parametrize("with_background", [False, True])
+def test_hard_mode_matches_the_per_frame_version(
+    rng: np.random.Generator,
+    with_background: bool,
+) -> None:
+    frame = rng.integers(0, 256, (12, 16, 3), dtype=np.uint8)
+    background = rng.integers(0, 256, (12, 16, 3), dtype=np.uint8)
+    mask = rng.random((12, 16)).astype(np.float32)
+    mask[mask < 0.3] = 0
+    # What the detector drew before the compositor
+    visualized_mask = (np.repeat(mask[:, :, np.newaxis], 3, axis=2) * 255).astype(
+        np.uint8,
+    )
+    expected = cv2.bitwise_and(frame, visualized_mask)
+    if with_background:
+        nonzero_mask = visualized_mask != 0
+        expected_background = background.copy()
+        expected_background[nonzero_mask] = expected[nonzero_mask]
+        expected = expected_background
+
+    output = MaskCompositor().composite(
+        frame,
+        mask,
+        background if with_background else None,
+    )
+
+    np.testing.assert_array_equal(output, expected)
@@ -0,0 +1,93 @@
+import struct
+
+import numpy as np
+
+from tests.conftest import random_people
+from yoga_pose_recognition.detection.landmark_packets import (
+    FLAG_WRONG,
+    MESSAGE_LANDMARKS,
+    MESSAGE_MASK,
+    encode_landmarks,
+    encode_mask,
+    run_lengths,
+)
+from yoga_pose_recognition.detection.pose_rules import CONNECTIONS, ConnectionStatus
+
+
+def decode_runs(runs: np.ndarray, size: int) -> np.ndarray:
+    values = np.arange(len(runs)) % 2 == 1
+    decoded = np.repeat(values, runs.astype(np.intp))
+    assert decoded.size == size
+    return decoded
+
+
+def test_landmarks_message_layout(rng: np.random.Generator) -> None:
+    people = random_people(rng, count=2)
+    status = [
+        np.full(len(CONNECTIONS), ConnectionStatus.CORRECT, dtype=np.int8),
+        np.full(len(CONNECTIONS), ConnectionStatus.NORMAL, dtype=np.int8),
+    ]
+    status[1][3] = ConnectionStatus.WRONG
+
+    message = encode_landmarks(123456789, list(zip(people, status, strict=True)))
+
+    header = struct.unpack_from("<BBBBq", message)
+    assert header == (MESSAGE_LANDMARKS, 2, len(CONNECTIONS), FLAG_WRONG, 123456789)
+    person_size = 33 * 4 * 2 + len(CONNECTIONS)
+    assert len(message) == 12 + 2 * person_size
+    for i, (landmarks, person_status) in enumerate(zip(people, status, strict=True)):
+        offset = 12 + i * person_size
+        decoded = np.frombuffer(message, "<f2", 33 * 4, offset).reshape(33, 4)
+        np.testing.assert_allclose(decoded, landmarks, atol=1e-3)
+        decoded_status = np.frombuffer(
+            message,
+            np.uint8,
+            len(CONNECTIONS),
+            offset + 33 * 4 * 2,
+        )
+        np.testing.assert_array_equal(decoded_status, person_status)
+
+
+def test_landmarks_message_without_people() -> None:
+    assert encode_landmarks(5, []) == struct.pack(
+        "<BBBBq",
+        MESSAGE_LANDMARKS,
+        0,
+        len(CONNECTIONS),
+        0,
+        5,
+    )
+
+
+def test_run_lengths_round_trip(rng: np.random.Generator) -> None:
+    for binary in (
+        rng.random((48, 64)) > 0.5,
+        np.ones((4, 4), dtype=bool),
+        np.zeros((4, 4), dtype=bool),
+    ):
+        runs = run_lengths(binary)
+        np.testing.assert_array_equal(decode_runs(runs, binary.size), binary.ravel())
+
+
+def test_run_lengths_split_long_runs() -> None:
+    binary = np.zeros(200_000, dtype=bool)
+    binary[-10:] = True
+
+    runs = run_lengths(binary)
+
+    assert runs.max() <= np.iinfo(np.uint16).max
+    np.testing.assert_array_equal(decode_runs(runs, binary.size), binary)
+
+
+def test_mask_message_round_trip() -> None:
+    mask = np.zeros((480, 640), dtype=np.float32)
+    mask[120:360, 200:440] = 1.0
+
+    message = encode_mask(42, mask, width=160)
+
+    kind, width, height, timestamp_ms, count = struct.unpack_from("<BxHHqI", message)
+    assert (kind, width, height, timestamp_ms) == (MESSAGE_MASK, 160, 120, 42)
+    runs = np.frombuffer(message, "<u2", count, struct.calcsize("<BxHHqI"))
+    decoded = decode_runs(runs, width * height).reshape(height, width)
+    assert decoded[30:90, 50:110].all()
+    assert decoded.sum() == 60 * 60
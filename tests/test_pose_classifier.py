@@ -0,0 +1,95 @@
+from typing import Dict
+
+import numpy as np
+
+from tests.conftest import random_people
+from yoga_pose_recognition.detection.models.pose import Pose
+from yoga_pose_recognition.detection.pose_classifier import PoseClassifier
+from yoga_pose_recognition.detection.pose_rules import CompiledPose
+
+
+def compile_poses(poses: Dict[str, Pose]) -> Dict[str, CompiledPose]:
+    return {name: CompiledPose(pose) for name, pose in poses.items()}
+
+
+def test_scores_match_each_pose_scored_alone(
+    poses: Dict[str, Pose],
+    rng: np.random.Generator,
+) -> None:
+    compiled_poses = compile_poses(poses)
+    classifier = PoseClassifier(compiled_poses)
+
+    for landmarks in random_people(rng, count=20):
+        confidences, mean_errors, _ = classifier.scores(landmarks)
+        for name, confidence, mean_error in zip(
+            classifier.names,
+            confidences,
+            mean_errors,
+            strict=True,
+        ):
+            pose = compiled_poses[name]
+            errors = np.abs(pose.calculate_angles(landmarks) - pose.targets)
+            similarity = np.exp(-0.5 * (errors / pose.tolerances) ** 2)
+            weight_sum = pose.weights.sum()
+
+            assert np.isclose(
+                confidence,
+                (similarity * pose.weights).sum() / weight_sum,
+                atol=1e-5,
+            )
+            assert np.isclose(
+                mean_error,
+                (errors * pose.weights).sum() / weight_sum,
+                atol=1e-3,
+            )
+
+
+def test_classify_ranks_the_matching_template_first(
+    poses: Dict[str, Pose],
+    rng: np.random.Generator,
+) -> None:
+    landmarks = random_people(rng)[0]
+    # A template whose targets are exactly the angles of these landmarks
+    template = poses["triangle_pose"].model_copy(deep=True)
+    template.name = "measured"
+    for angle, value in zip(
+        template.angles,
+        CompiledPose(template).calculate_angles(landmarks).tolist(),
+        strict=True,
+    ):
+        angle.value = value
+    classifier = PoseClassifier(compile_poses({**poses, "measured": template}))
+
+    matches = classifier.classify(landmarks)
+
+    assert matches[0].pose == "measured"
+    assert matches[0].confidence == 1.0
+    assert matches[0].mean_error == 0.0
+    assert len(matches) == 3
+    assert [m.confidence for m in matches] == sorted(
+        (m.confidence for m in matches),
+        reverse=True,
+    )
+
+
+def test_classifier_picks_the_side_the_rules_judge(
+    poses: Dict[str, Pose],
+    rng: np.random.Generator,
+) -> None:
+    template = poses["triangle_pose"].model_copy(update={"mirror": True})
+    compiled_pose = CompiledPose(template)
+    classifier = PoseClassifier({template.name: compiled_pose})
+
+    for landmarks in random_people(rng, count=20):
+        match = classifier.classify(landmarks, top_k=1)[0]
+
+        assert match.side == compiled_pose.measure(landmarks).side
+
+
+def test_templates_without_angles_are_not_candidates(
+    poses: Dict[str, Pose],
+) -> None:
+    classifier = PoseClassifier(compile_poses(poses))
+
+    assert "no_pose" not in classifier.names
+    assert len(classifier) == len(poses) - 1
@@ -0,0 +1,53 @@
+from typing import Any, Dict
+
+import pytest
+from pydantic import ValidationError
+
+from yoga_pose_recognition.detection.models.pose import Angle, Pose
+from yoga_pose_recognition.detection.pose_rules import CompiledPose
+
+CONNECTIONS = {
+    "connection1": "LEFT_SHOULDER_TO_LEFT_ELBOW",
+    "connection2": "LEFT_ELBOW_TO_LEFT_WRIST",
+}
+POINTS = ("LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")
+
+
+@pytest.mark.parametrize(
+    "definition",
+    [
+        {},
+        {"connection1": CONNECTIONS["connection1"]},
+        {"connection2": CONNECTIONS["connection2"]},
+        {**CONNECTIONS, "points": POINTS},
+        {"connection1": CONNECTIONS["connection1"], "points": POINTS},
+        {"connection2": CONNECTIONS["connection2"], "points": POINTS},
+        {"points": ("LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_SHOULDER")},
+        {"points": (11, 13, 11)},
+    ],
+)
+def test_angle_rejects_ambiguous_definitions(definition: Dict[str, Any]) -> None:
+    with pytest.raises(ValidationError):
+        Angle(value=90, **definition)
+
+
+@pytest.mark.parametrize("definition", [CONNECTIONS, {"points": POINTS}])
+def test_angle_accepts_one_definition(definition: Dict[str, Any]) -> None:
+    Angle(value=90, **definition)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{"tolerance": 0}, {"tolerance": -5}, {"hysteresis": -1}],
+)
+def test_pose_rejects_bad_tolerances(options: Dict[str, float]) -> None:
+    with pytest.raises(ValidationError):
+        Pose(name="bad", angles=[], **options)
+
+
+def test_compiled_pose_rejects_a_landmark_named_twice() -> None:
+    # LEFT_SHOULDER is landmark 11
+    angle = Angle(value=90, points=("LEFT_SHOULDER", "LEFT_ELBOW", 11))
+
+    with pytest.raises(ValueError, match="Repeated landmark"):
+        CompiledPose(Pose(name="bad", angles=[angle]))
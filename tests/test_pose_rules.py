@@ -0,0 +1,93 @@
+from typing import Dict, Tuple
+
+import numpy as np
+import pytest
+
+from tests.conftest import random_people
+from yoga_pose_recognition.detection.body_connections import BodyConnections
+from yoga_pose_recognition.detection.models.pose import Pose
+from yoga_pose_recognition.detection.pose_rules import (
+    CONNECTIONS,
+    CompiledPose,
+    ConnectionStatus,
+    extract_xyz,
+)
+
+
+def legacy_connection_status(
+    pose: Pose,
+    landmarks: np.ndarray,
+) -> Tuple[list[float], Dict[Tuple[int, int], ConnectionStatus]]:
+    """The per-angle loop the drawing code used before the rules were compiled."""
+    angles = []
+    status = {}
+    for angle in pose.angles:
+        connection1 = BodyConnections[angle.connection1].value
+        connection2 = BodyConnections[angle.connection2].value
+        try:
+            x, y, z = extract_xyz(connection1, connection2)
+        except ValueError:
+            continue
+
+        vector1 = landmarks[x, :2] - landmarks[y, :2]
+        vector2 = landmarks[z, :2] - landmarks[y, :2]
+        norm1 = np.linalg.norm(vector1)
+        norm2 = np.linalg.norm(vector2)
+        if norm1 == 0 or norm2 == 0:
+            calculated_angle = 0.0
+        else:
+            cosine_angle = np.dot(vector1, vector2) / (norm1 * norm2)
+            calculated_angle = np.degrees(np.arccos(np.clip(cosine_angle, -1.0, 1.0)))
+        angles.append(calculated_angle)
+
+        verdict = (
+            ConnectionStatus.CORRECT
+            if abs(calculated_angle - angle.value) < 20
+            else ConnectionStatus.WRONG
+        )
+        status[connection1] = verdict
+        status[connection2] = verdict
+    for connection in CONNECTIONS:
+        status.setdefault(connection, ConnectionStatus.NORMAL)
+    return angles, status
+
+
+def test_compiled_pose_matches_legacy_loop(
+    poses: Dict[str, Pose],
+    rng: np.random.Generator,
+) -> None:
+    for pose in poses.values():
+        compiled_pose = CompiledPose(pose)
+        for landmarks in random_people(rng, count=50, dtype=np.float64):
+            angles, status = compiled_pose.evaluate(landmarks)
+            legacy_angles, legacy_status = legacy_connection_status(pose, landmarks)
+
+            np.testing.assert_allclose(angles, legacy_angles, atol=1e-3)
+            assert status.tolist() == [legacy_status[c] for c in CONNECTIONS]
+
+
+def test_compiled_pose_without_angles_is_all_normal(
+    rng: np.random.Generator,
+) -> None:
+    compiled_pose = CompiledPose(Pose(name="empty", angles=[]))
+    angles, status = compiled_pose.evaluate(random_people(rng)[0])
+
+    assert len(angles) == 0
+    assert np.all(status == ConnectionStatus.NORMAL)
+
+
+def test_unknown_connection_is_rejected() -> None:
+    pose = Pose.model_validate(
+        {
+            "name": "broken",
+            "angles": [
+                {
+                    "connection1": "LEFT_KNEE_TO_NOWHERE",
+                    "connection2": "LEFT_HIP_TO_LEFT_KNEE",
+                    "value": 90,
+                },
+            ],
+        },
+    )
+    with pytest.raises(ValueError, match="Unknown connection"):
+        CompiledPose(pose)
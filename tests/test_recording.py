@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tests.conftest import random_people
+from yoga_pose_recognition.detection.pose_rules import CONNECTIONS, ConnectionStatus
+from yoga_pose_recognition.detection.recording import (
+    Recording,
+    RecordingPlayer,
+    SessionRecorder,
+)
+
+FRAME_SIZE = (1280, 720)
+
+
+def scores(*wrong: bool) -> list[tuple[np.ndarray, np.ndarray]]:
+    return [
+        (
+            np.zeros(0, dtype=np.float32),
+            np.full(
+                len(CONNECTIONS),
+                ConnectionStatus.WRONG if is_wrong else ConnectionStatus.CORRECT,
+                dtype=np.int8,
+            ),
+        )
+        for is_wrong in wrong
+    ]
+
+
+def test_recording_round_trip(tmp_path: Path, rng: np.random.Generator) -> None:
+    recorder = SessionRecorder(tmp_path, "day1", "default", flush_interval=0)
+    two_people = random_people(rng, count=2)
+    one_person = random_people(rng)
+    recorder.record(1000, "tadasana", two_people, scores(True, False), FRAME_SIZE)
+    recorder.record(1033, "tadasana", [], [], FRAME_SIZE)
+    recorder.record(1066, "triangle_pose", one_person, scores(False), FRAME_SIZE)
+    recorder.close()
+
+    recording = Recording(tmp_path, "day1")
+
+    assert len(recording) == 3
+    assert recording.session_id == "default"
+    assert recording.poses == ["tadasana", "triangle_pose"]
+    assert recording.frame_size == FRAME_SIZE
+    assert recording.duration_ms == 66
+    assert recording.records["is_wrong"].tolist() == [True, False, False, False]
+    assert recording.records["person"].tolist() == [0, 1, 0, 0]
+    # The empty frame does not count towards the ratio.
+    assert recording.info()["wrong_person_ratio"] == 1 / 3
+
+    first = recording.frame(0)
+    assert first.timestamp_ms == 1000
+    assert first.pose == "tadasana"
+    np.testing.assert_array_equal(first.landmarks, np.stack(two_people))
+    assert recording.frame(1).landmarks.shape == (0, 33, 4)
+    assert recording.frame(2).pose == "triangle_pose"
+    np.testing.assert_array_equal(recording.frame(2).landmarks[0], one_person[0])
+
+
+def test_records_after_close_are_ignored(
+    tmp_path: Path,
+    rng: np.random.Generator,
+) -> None:
+    recorder = SessionRecorder(tmp_path, "closed", "default")
+    recorder.record(0, "tadasana", random_people(rng), scores(False), FRAME_SIZE)
+    recorder.close()
+    recorder.record(33, "tadasana", random_people(rng), scores(False), FRAME_SIZE)
+
+    assert len(Recording(tmp_path, "closed")) == 1
+
+
+def test_torn_record_at_the_end_is_ignored(
+    tmp_path: Path,
+    rng: np.random.Generator,
+) -> None:
+    recorder = SessionRecorder(tmp_path, "torn", "default")
+    recorder.record(0, "tadasana", random_people(rng), scores(False), FRAME_SIZE)
+    recorder.close()
+    with recorder.path.open("ab") as f:
+        f.write(b"\0" * 100)
+
+    assert len(Recording(tmp_path, "torn")) == 1
+
+
+def test_existing_recording_is_not_overwritten(tmp_path: Path) -> None:
+    SessionRecorder(tmp_path, "once", "default").close()
+
+    with pytest.raises(FileExistsError):
+        SessionRecorder(tmp_path, "once", "default")
+
+
+def test_invalid_name_is_rejected(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="Invalid recording name"):
+        Recording(tmp_path, "../etc/passwd")
+
+
+def test_player_keeps_the_original_schedule(
+    tmp_path: Path,
+    rng: np.random.Generator,
+) -> None:
+    recorder = SessionRecorder(tmp_path, "paced", "default")
+    for timestamp_ms in (500, 600, 800):
+        recorder.record(
+            timestamp_ms,
+            "tadasana",
+            random_people(rng),
+            scores(False),
+            FRAME_SIZE,
+        )
+    recorder.close()
+    player = RecordingPlayer(Recording(tmp_path, "paced"), speed=2.0)
+
+    due = [player.next(10_000)[0] for _ in range(4)]
+
+    assert due == [10_000, 10_050, 10_150, 10_000]
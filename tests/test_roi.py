@@ -0,0 +1,104 @@
+import numpy as np
+
+from tests.conftest import random_people
+from yoga_pose_recognition.detection.roi import Roi, RoiTracker
+
+FRAME_SIZE = (1280, 720)
+
+
+def test_to_frame_maps_crop_coordinates(rng: np.random.Generator) -> None:
+    roi = Roi(x=300, y=100, width=400, height=500)
+    landmarks = random_people(rng)[0].astype(np.float64)
+    in_crop = landmarks.copy()
+
+    roi.to_frame([landmarks], FRAME_SIZE)
+
+    np.testing.assert_allclose(
+        landmarks[:, 0] * FRAME_SIZE[0],
+        in_crop[:, 0] * roi.width + roi.x,
+    )
+    np.testing.assert_allclose(
+        landmarks[:, 1] * FRAME_SIZE[1],
+        in_crop[:, 1] * roi.height + roi.y,
+    )
+    np.testing.assert_allclose(landmarks[:, 2], in_crop[:, 2] * 400 / 1280)
+    np.testing.assert_array_equal(landmarks[:, 3], in_crop[:, 3])
+
+
+def test_paste_mask_fills_only_the_crop() -> None:
+    roi = Roi(x=10, y=20, width=40, height=30)
+    mask = np.ones((15, 20), dtype=np.float32)
+
+    full = roi.paste_mask(mask, (100, 80))
+
+    assert full.shape == (80, 100)
+    assert full[20:50, 10:50].all()
+    assert full.sum() == 40 * 30
+
+
+def test_tracker_starts_with_the_full_frame() -> None:
+    assert RoiTracker().next_roi(FRAME_SIZE) is None
+
+
+def test_tracker_crops_around_the_person() -> None:
+    tracker = RoiTracker(padding=0.25)
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    landmarks[:, 0] = np.linspace(0.4, 0.5, 33)
+    landmarks[:, 1] = np.linspace(0.3, 0.7, 33)
+    landmarks[:, 3] = 1.0
+
+    tracker.update([landmarks])
+    roi = tracker.next_roi(FRAME_SIZE)
+
+    assert roi is not None
+    frame_w, frame_h = FRAME_SIZE
+    assert roi.x <= 0.4 * frame_w
+    assert roi.y <= 0.3 * frame_h
+    assert roi.x + roi.width >= 0.5 * frame_w
+    assert roi.y + roi.height >= 0.7 * frame_h
+    assert roi.x >= 0
+    assert roi.y >= 0
+    assert roi.x + roi.width <= frame_w
+    assert roi.y + roi.height <= frame_h
+
+
+def test_tracker_ignores_people_it_cannot_see() -> None:
+    tracker = RoiTracker()
+    landmarks = np.full((33, 4), 0.5, dtype=np.float32)
+    landmarks[:, 3] = 0.1
+
+    tracker.update([landmarks])
+
+    assert tracker.next_roi(FRAME_SIZE) is None
+
+
+def standing_person(x0: float, x1: float) -> np.ndarray:
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    landmarks[:, 0] = np.linspace(x0, x1, 33)
+    landmarks[:, 1] = np.linspace(0.3, 0.7, 33)
+    landmarks[:, 3] = 1.0
+    return landmarks
+
+
+def test_tracker_holds_the_crop_while_the_person_stays_inside() -> None:
+    tracker = RoiTracker(padding=0.25)
+    tracker.update([standing_person(0.40, 0.50)])
+    roi = tracker.next_roi(FRAME_SIZE)
+
+    tracker.update([standing_person(0.41, 0.51)])
+
+    assert tracker.next_roi(FRAME_SIZE) == roi
+
+
+def test_tracker_moves_the_crop_when_the_person_nears_its_edge() -> None:
+    tracker = RoiTracker(padding=0.25)
+    tracker.update([standing_person(0.40, 0.50)])
+    roi = tracker.next_roi(FRAME_SIZE)
+    assert roi is not None
+
+    tracker.update([standing_person(0.50, 0.60)])
+    moved = tracker.next_roi(FRAME_SIZE)
+
+    assert moved is not None
+    assert moved.x > roi.x
+    assert moved.x + moved.width >= 0.6 * FRAME_SIZE[0]
@@ -0,0 +1,47 @@
+import threading
+from typing import Any, List
+
+import pytest
+
+from yoga_pose_recognition.detection import session_manager
+from yoga_pose_recognition.detection.session_manager import SessionManager
+
+
+def test_session_opened_during_close_is_closed(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    opening = threading.Event()
+    closed = threading.Event()
+    closed_sessions: List[str] = []
+
+    class SlowDetector:
+        def __init__(self, session_id: str, **_: Any) -> None:
+            self.session_id = session_id
+            opening.set()
+            closed.wait(timeout=5)
+
+        def close(self) -> None:
+            closed_sessions.append(self.session_id)
+
+    monkeypatch.setattr(session_manager, "YogaPoseDetector", SlowDetector)
+    sessions = SessionManager()
+    errors: List[Exception] = []
+
+    def create() -> None:
+        try:
+            sessions.create("mat2")
+        except ValueError as e:
+            errors.append(e)
+
+    creating = threading.Thread(target=create)
+    creating.start()
+    opening.wait(timeout=5)
+    sessions.close()
+    closed.set()
+    creating.join(timeout=5)
+
+    assert closed_sessions == ["mat2"]
+    assert len(errors) == 1
+    assert "mat2" not in sessions
+    with pytest.raises(ValueError):
+        sessions.create("mat3")
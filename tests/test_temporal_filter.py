@@ -0,0 +1,70 @@
+import numpy as np
+
+from tests.conftest import random_people
+from yoga_pose_recognition.detection.temporal_filter import (
+    PersonFilters,
+    TemporalPoseFilter,
+)
+
+
+def create_filter() -> TemporalPoseFilter:
+    return TemporalPoseFilter(33, min_cutoff=1.0, beta=5.0)
+
+
+def at(landmarks: np.ndarray, x: float, y: float) -> np.ndarray:
+    moved = landmarks.copy()
+    moved[:, 0] = x
+    moved[:, 1] = y
+    return moved
+
+
+def test_filters_follow_people_when_the_order_changes(
+    rng: np.random.Generator,
+) -> None:
+    person = random_people(rng)[0]
+    filters = PersonFilters(create_filter)
+    left, right = filters.match([at(person, 0.2, 0.5), at(person, 0.8, 0.5)])
+
+    swapped = filters.match([at(person, 0.79, 0.5), at(person, 0.21, 0.5)])
+
+    assert swapped[0] is right
+    assert swapped[1] is left
+
+
+def test_large_jump_gets_a_fresh_filter(rng: np.random.Generator) -> None:
+    person = random_people(rng)[0]
+    filters = PersonFilters(create_filter, max_jump=0.15)
+    (first,) = filters.match([at(person, 0.2, 0.5)])
+    first.smooth(at(person, 0.2, 0.5), 0)
+
+    elsewhere = at(person, 0.7, 0.5)
+    (jumped,) = filters.match([elsewhere])
+    smoothed = elsewhere.copy()
+    jumped.smooth(smoothed, 33)
+
+    # The only filter is reused, but starts over instead of smoothing
+    # towards where the last person stood.
+    assert jumped is first
+    np.testing.assert_array_equal(smoothed, elsewhere)
+
+
+def test_new_people_get_new_filters(rng: np.random.Generator) -> None:
+    person = random_people(rng)[0]
+    filters = PersonFilters(create_filter)
+    (first,) = filters.match([at(person, 0.2, 0.5)])
+
+    both = filters.match([at(person, 0.8, 0.5), at(person, 0.21, 0.5)])
+
+    assert both[1] is first
+    assert both[0] is not first
+
+
+def test_smoothing_lags_behind_a_small_move(rng: np.random.Generator) -> None:
+    person = random_people(rng)[0]
+    temporal_filter = create_filter()
+    temporal_filter.smooth(at(person, 0.5, 0.5), 0)
+
+    moved = at(person, 0.52, 0.5)
+    temporal_filter.smooth(moved, 33)
+
+    assert 0.5 < moved[0, 0] < 0.52
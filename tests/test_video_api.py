@@ -0,0 +1,72 @@
+import asyncio
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from yoga_pose_recognition.detection import session_manager
+from yoga_pose_recognition.web.application import get_app
+
+
+class FakeDetector:
+    def __init__(self, session_id: str, **_: Any) -> None:
+        self.session_id = session_id
+        self.pipeline_stats = {"session": session_id}
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def app(monkeypatch: pytest.MonkeyPatch) -> FastAPI:
+    monkeypatch.setattr(session_manager, "YogaPoseDetector", FakeDetector)
+    # Without the lifespan, so the default session never starts.
+    app = get_app()
+    app.state.sessions.create("mat2")
+    return app
+
+
+def request(app: FastAPI, method: str, url: str, **kwargs: Any) -> httpx.Response:
+    async def send() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await c.request(method, url, **kwargs)
+
+    return asyncio.run(send())
+
+
+def test_session_routes_take_the_id_from_the_path(app: FastAPI) -> None:
+    response = request(app, "GET", "/api/video/mat2/stats")
+
+    assert response.status_code == 200
+    assert response.json() == {"session": "mat2"}
+
+
+def test_default_routes_ignore_a_session_id_query(app: FastAPI) -> None:
+    response = request(app, "GET", "/api/video/stats", params={"session_id": "mat2"})
+
+    # Still the default session, which has not started.
+    assert response.status_code == 503
+
+
+def test_replay_pose_must_be_a_known_pose(app: FastAPI) -> None:
+    session = {"session_id": "replay", "replay": "missing"}
+
+    unknown = request(
+        app,
+        "POST",
+        "/api/video/sessions",
+        json={**session, "replay_pose": "no_such_pose"},
+    )
+    known = request(
+        app,
+        "POST",
+        "/api/video/sessions",
+        json={**session, "replay_pose": "tadasana"},
+    )
+
+    assert unknown.status_code == 400
+    assert unknown.json() == {"message": "Pose no_such_pose not found in pose data."}
+    # Past the pose check, on to the missing recording
+    assert known.status_code == 404
@@ -1,10 +1,13 @@
+import argparse
+import sys
+
 import uvicorn
 
+from yoga_pose_recognition.batch import add_batch_parser, run_batch
 from yoga_pose_recognition.settings import settings
 
 
-def main() -> None:
-    """Entrypoint of the application."""
+def serve() -> None:
     uvicorn.run(
         "yoga_pose_recognition.web.application:get_app",
         workers=settings.workers_count,
@@ -16,5 +19,18 @@ def main() -> None:
     )
 
 
+def main() -> None:
+    """Entrypoint of the application."""
+    parser = argparse.ArgumentParser(prog="yoga_pose_recognition")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("serve", help="Run the API server (default).")
+    add_batch_parser(subparsers)
+    args = parser.parse_args()
+
+    if args.command == "batch":
+        sys.exit(run_batch(args))
+    serve()
+
+
 if __name__ == "__main__":
     main()
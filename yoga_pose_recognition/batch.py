@@ -0,0 +1,203 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from yoga_pose_recognition.detection.landmarker import (
+    PoseLandmarker,
+    VisionRunningMode,
+    landmarker_options,
+    to_image,
+    worker_context,
+)
+from yoga_pose_recognition.detection.landmarks import (
+    LANDMARK_FIELDS,
+    NUM_LANDMARKS,
+    LandmarkBuffer,
+)
+from yoga_pose_recognition.detection.pose_rules import CONNECTIONS, ConnectionStatus
+from yoga_pose_recognition.detection.utils.drawing_utils import DrawingUtils
+from yoga_pose_recognition.settings import settings
+
+VIDEO_SUFFIXES = {".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v"}
+
+
+def find_videos(paths: Iterable[str]) -> List[Path]:
+    videos = []
+    for raw_path in paths:
+        path = Path(raw_path)
+        if path.is_dir():
+            videos.extend(
+                sorted(
+                    p
+                    for p in path.rglob("*")
+                    if p.is_file() and p.suffix.lower() in VIDEO_SUFFIXES
+                ),
+            )
+        elif path.is_file():
+            videos.append(path)
+        else:
+            logger.warning(f"Skipping {path}: not a file or directory.")
+    return videos
+
+
+def score_video(
+    video_path: Path,
+    pose_name: str,
+    output_dir: Path,
+    model_asset_path: str,
+) -> Dict[str, float]:
+    """
+    Runs the landmarker over every frame of one video and scores it.
+
+    The result is written as one ``.npz`` file of column arrays
+    (timestamp_ms, detected, landmarks, angles, connection_status, is_wrong),
+    one row per frame. Frames without a person have ``detected`` False, NaN
+    landmarks and angles, and every connection NORMAL.
+
+    :return: summary with frame count and processing speed.
+    """
+    drawing_utils = DrawingUtils()
+    landmark_buffer = LandmarkBuffer()
+    options = landmarker_options(model_asset_path, VisionRunningMode.VIDEO)
+
+    capture = cv2.VideoCapture(str(video_path))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    timestamps: List[int] = []
+    detected: List[bool] = []
+    landmarks_rows: List[np.ndarray] = []
+    angle_rows: List[np.ndarray] = []
+    status_rows: List[np.ndarray] = []
+    empty_landmarks = np.full((NUM_LANDMARKS, LANDMARK_FIELDS), np.nan, np.float32)
+    compiled_pose = drawing_utils.pose_rule_engine.compiled_poses[pose_name]
+    empty_angles = np.full(len(compiled_pose.targets), np.nan, np.float32)
+    empty_status = np.full(len(CONNECTIONS), ConnectionStatus.NORMAL, np.int8)
+
+    started = time.perf_counter()
+    with PoseLandmarker.create_from_options(options) as landmarker:
+        frame_index = 0
+        while True:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            timestamp_ms = int(frame_index * 1000 / fps)
+            result = landmarker.detect_for_video(to_image(frame), timestamp_ms)
+            people = landmark_buffer.update(result)
+
+            if people:
+                landmarks = people[0]
+                angles, status = compiled_pose.evaluate(landmarks)
+                landmarks_rows.append(landmarks.copy())
+            else:
+                angles, status = empty_angles, empty_status
+                landmarks_rows.append(empty_landmarks)
+
+            timestamps.append(timestamp_ms)
+            detected.append(bool(people))
+            angle_rows.append(angles.astype(np.float32))
+            status_rows.append(status)
+            frame_index += 1
+    capture.release()
+    elapsed = time.perf_counter() - started
+
+    status_array = np.array(status_rows, dtype=np.int8).reshape(frame_index, -1)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"{video_path.stem}.{pose_name}.npz"
+    np.savez_compressed(
+        output_path,
+        timestamp_ms=np.array(timestamps, dtype=np.int64),
+        detected=np.array(detected, dtype=bool),
+        landmarks=np.array(landmarks_rows, dtype=np.float32).reshape(
+            frame_index,
+            NUM_LANDMARKS,
+            LANDMARK_FIELDS,
+        ),
+        angles=np.array(angle_rows, dtype=np.float32).reshape(frame_index, -1),
+        connection_status=status_array,
+        is_wrong=np.any(status_array == ConnectionStatus.WRONG, axis=1),
+    )
+
+    return {
+        "frames": frame_index,
+        "seconds": elapsed,
+        "fps": frame_index / elapsed if elapsed > 0 else 0.0,
+        "realtime_factor": (frame_index / fps) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def add_batch_parser(subparsers: argparse._SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "batch",
+        help="Score recorded videos against a pose template.",
+    )
+    parser.add_argument("paths", nargs="+", help="Video files or directories.")
+    parser.add_argument("--pose", required=True, help="Pose name in data/pose.json.")
+    parser.add_argument(
+        "--output-dir",
+        default="output",
+        help="Directory for the per-video .npz results.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of videos processed in parallel.",
+    )
+    parser.add_argument(
+        "--model",
+        default=settings.model_asset_path,
+        help="Path to the pose landmarker .task model.",
+    )
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    pose_data = DrawingUtils().pose_data
+    if args.pose not in pose_data:
+        logger.error(f"Pose {args.pose} not found in pose data.")
+        return 1
+
+    videos = find_videos(args.paths)
+    if not videos:
+        logger.error("No video files found.")
+        return 1
+
+    output_dir = Path(args.output_dir)
+    workers = max(1, min(args.workers, len(videos)))
+    logger.info(f"Scoring {len(videos)} videos with {workers} workers.")
+
+    failed = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=worker_context(),
+    ) as executor:
+        futures = {
+            executor.submit(
+                score_video,
+                video,
+                args.pose,
+                output_dir,
+                args.model,
+            ): video
+            for video in videos
+        }
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                summary = future.result()
+            except Exception:
+                logger.exception(f"Failed to score {video}.")
+                failed += 1
+                continue
+            logger.info(
+                f"{video}: {summary['frames']} frames "
+                f"in {summary['seconds']:.1f}s ({summary['fps']:.1f} fps, "
+                f"{summary['realtime_factor']:.1f}x realtime)",
+            )
+
+    return 1 if failed else 0
@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Tuple, Type
+
+from loguru import logger
+from pydantic import BaseModel
+
+from yoga_pose_recognition.detection.models.background import BackgroundData
+from yoga_pose_recognition.detection.models.course import CourseData
+from yoga_pose_recognition.detection.models.pose import Pose, PoseData
+from yoga_pose_recognition.detection.pose_classifier import PoseClassifier
+from yoga_pose_recognition.detection.pose_rules import PoseRuleEngine
+
+DATA_DIR = Path("data")
+
+POSE = "pose"
+COURSE = "course"
+BACKGROUND = "background"
+
+_DOCUMENT_FILES: Dict[str, Tuple[str, Type[BaseModel]]] = {
+    POSE: ("pose.json", PoseData),
+    COURSE: ("course.json", CourseData),
+    BACKGROUND: ("background.json", BackgroundData),
+}
+
+
+class Document(NamedTuple):
+    data: BaseModel
+    # Compact JSON of the file, served as is
+    body: bytes
+    etag: str
+    # (mtime_ns, size) of the file it was loaded from
+    version: Tuple[int, int]
+
+
+class PoseIndex(NamedTuple):
+    poses: Dict[str, Pose]
+    engine: PoseRuleEngine
+    classifier: PoseClassifier
+
+
+class DataStore:
+    """
+    Parsed, validated and precompiled copies of the JSON files in ``data/``.
+
+    Each file is parsed once into its model, and the response body and ETag
+    are prepared at the same time. Pose templates are also compiled into a
+    ``PoseRuleEngine`` and a ``PoseClassifier``. ``reload`` re-reads only the
+    files whose mtime or size changed and swaps the new objects in with a
+    single assignment, so readers (including the frame pipeline) never see a
+    half-updated state. A file that fails to parse or validate is logged and
+    the previous version kept.
+    """
+
+    def __init__(self, data_dir: Path = DATA_DIR) -> None:
+        self.data_dir = data_dir
+        self.__documents: Dict[str, Document] = {}
+        self.__pose_index: PoseIndex | None = None
+        # Version of each file that last failed, so it is reported only once
+        self.__failed_versions: Dict[str, Tuple[int, int]] = {}
+        self.__listeners: List[Callable[[List[str]], None]] = []
+        self.__reload_lock = threading.Lock()
+        self.reload()
+
+    def document(self, name: str) -> Document:
+        return self.__documents[name]
+
+    @property
+    def pose_index(self) -> PoseIndex:
+        if self.__pose_index is None:
+            raise ValueError("Pose data is not loaded.")
+        return self.__pose_index
+
+    def add_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """Calls ``listener`` with the names of the documents after each reload."""
+        self.__listeners.append(listener)
+
+    def reload(self) -> List[str]:
+        """
+        Reloads the files that changed on disk.
+
+        :raises OSError, ValueError: if a file cannot be loaded the first time.
+        :return: names of the documents that were replaced.
+        """
+        changed = []
+        with self.__reload_lock:
+            for name, (file_name, model) in _DOCUMENT_FILES.items():
+                previous = self.__documents.get(name)
+                path = self.data_dir / file_name
+                version = None
+                try:
+                    stat = path.stat()
+                    version = (stat.st_mtime_ns, stat.st_size)
+                    if previous is not None and version in (
+                        previous.version,
+                        self.__failed_versions.get(name),
+                    ):
+                        continue
+                    document = self.__load(path, model, version)
+                    if name == POSE:
+                        poses = {pose.name: pose for pose in document.data.poses}
+                        engine = PoseRuleEngine(poses)
+                        pose_index = PoseIndex(
+                            poses,
+                            engine,
+                            PoseClassifier(engine.compiled_poses),
+                        )
+                except (OSError, ValueError) as e:
+                    if previous is None:
+                        raise
+                    if version is not None:
+                        self.__failed_versions[name] = version
+                    logger.error(f"Keeping the previous {file_name}: {e}")
+                    continue
+
+                if name == POSE:
+                    self.__pose_index = pose_index
+                self.__documents = {**self.__documents, name: document}
+                changed.append(name)
+
+        if changed:
+            logger.info(f"Loaded {', '.join(changed)} data.")
+            for listener in self.__listeners:
+                listener(changed)
+        return changed
+
+    @staticmethod
+    def __load(
+        path: Path,
+        model: Type[BaseModel],
+        version: Tuple[int, int],
+    ) -> Document:
+        raw = json.loads(path.read_bytes())
+        data = model.model_validate(raw)
+        body = json.dumps(raw, ensure_ascii=False, separators=(",", ":")).encode()
+        etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        return Document(data=data, body=body, etag=etag, version=version)
+
+    async def watch(self, interval: float) -> None:
+        """Polls the data files for changes until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception:
+                logger.exception("Data reload failed.")
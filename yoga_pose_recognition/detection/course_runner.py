@@ -0,0 +1,150 @@
+import bisect
+from itertools import accumulate
+from typing import List, Tuple
+
+import numpy as np
+
+from yoga_pose_recognition.detection.models.course import (
+    Course,
+    CoursePose,
+    CoursePoseStats,
+    CourseProgress,
+)
+from yoga_pose_recognition.detection.pose_rules import CompiledPose, ConnectionStatus
+
+# Longer gaps between scored frames (e.g. a stalled camera) count only this much.
+MAX_FRAME_GAP_MS = 500
+
+
+class _StepStats:
+    def __init__(self) -> None:
+        self.scored_ms = 0
+        self.correct_ms = 0
+        self.error_sum: np.ndarray | None = None
+        self.error_count = 0
+
+    def angle_errors(self) -> List[float]:
+        if self.error_sum is None or self.error_count == 0:
+            return []
+        return np.round(self.error_sum / self.error_count, 1).tolist()
+
+
+class CourseRunner:
+    """
+    Plays a course on the frame timeline of one detector.
+
+    Pose ``i`` covers frames whose timestamp falls in
+    ``[start + sum(durations[:i]), start + sum(durations[:i + 1]))``, so the
+    switch happens between two frames, not whenever a client asks, and every
+    frame is scored against exactly one pose. Accuracy is accumulated as
+    frames are recorded: time in which nobody was wrong and the running mean
+    error of each angle.
+    """
+
+    def __init__(self, course: Course, start_ms: int) -> None:
+        self.course = course
+        self.start_ms = start_ms
+        self.step = -1
+        self.__step_ends = [
+            start_ms + end
+            for end in accumulate(pose.duration * 1000 for pose in course.poses)
+        ]
+        self.__stats = [_StepStats() for _ in course.poses]
+        self.__last_recorded_ms: int | None = None
+        self.__reported_step: int | None = None
+        self.__reported_ms = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.step >= len(self.course.poses)
+
+    @property
+    def current(self) -> CoursePose | None:
+        return None if self.finished or self.step < 0 else self.course.poses[self.step]
+
+    @property
+    def next(self) -> CoursePose | None:
+        step = self.step + 1
+        return self.course.poses[step] if step < len(self.course.poses) else None
+
+    def advance(self, timestamp_ms: int) -> bool:
+        """
+        Moves to the pose that covers ``timestamp_ms``.
+
+        :return: True if the pose changed.
+        """
+        step = bisect.bisect_right(self.__step_ends, timestamp_ms)
+        if step == self.step:
+            return False
+        self.step = step
+        self.__last_recorded_ms = None
+        return True
+
+    def record(
+        self,
+        timestamp_ms: int,
+        compiled_pose: CompiledPose,
+        scores: List[Tuple[np.ndarray, np.ndarray]],
+    ) -> None:
+        """Adds a scored frame to the statistics of the current pose."""
+        if self.current is None:
+            return
+        stats = self.__stats[self.step]
+        elapsed = 0
+        if self.__last_recorded_ms is not None:
+            elapsed = min(timestamp_ms - self.__last_recorded_ms, MAX_FRAME_GAP_MS)
+        self.__last_recorded_ms = timestamp_ms
+
+        stats.scored_ms += elapsed
+        if scores and not any(
+            np.any(status == ConnectionStatus.WRONG) for _, status in scores
+        ):
+            stats.correct_ms += elapsed
+
+        targets = compiled_pose.targets
+        if stats.error_sum is None or stats.error_sum.shape != targets.shape:
+            # First frame, or the template was reloaded with other rules.
+            stats.error_sum = np.zeros_like(targets, dtype=np.float64)
+            stats.error_count = 0
+        for angles, _ in scores:
+            stats.error_sum += np.abs(angles - targets)
+            stats.error_count += 1
+
+    def progress_due(self, timestamp_ms: int, interval_ms: int) -> bool:
+        """
+        Whether to push progress now.
+
+        True on every pose change and every ``interval_ms`` while a pose
+        runs; a finished course is reported once.
+        """
+        if self.step == self.__reported_step and (
+            self.finished or timestamp_ms - self.__reported_ms < interval_ms
+        ):
+            return False
+        self.__reported_step = self.step
+        self.__reported_ms = timestamp_ms
+        return True
+
+    def progress(self, session_id: str, timestamp_ms: int) -> CourseProgress:
+        current = self.current
+        remaining = 0
+        if current is not None:
+            remaining = max(self.__step_ends[self.step] - timestamp_ms, 0)
+        return CourseProgress(
+            session_id=session_id,
+            course_id=self.course.id,
+            step=max(self.step, 0),
+            pose=current.server_id if current is not None else "no_pose",
+            step_remaining_ms=remaining,
+            finished=self.finished,
+            poses=[
+                CoursePoseStats(
+                    pose=pose.server_id,
+                    name=pose.name,
+                    scored_ms=stats.scored_ms,
+                    correct_ms=stats.correct_ms,
+                    angle_errors=stats.angle_errors(),
+                )
+                for pose, stats in zip(self.course.poses, self.__stats, strict=True)
+            ],
+        )
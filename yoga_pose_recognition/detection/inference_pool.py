@@ -0,0 +1,359 @@
+import ctypes
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.process import BaseProcess
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+from loguru import logger
+
+from yoga_pose_recognition.detection.landmarker import (
+    PoseLandmarker,
+    VisionRunningMode,
+    landmarker_options,
+    to_image,
+    worker_context,
+)
+from yoga_pose_recognition.detection.landmarks import (
+    LANDMARK_FIELDS,
+    NUM_LANDMARKS,
+    LandmarkBuffer,
+)
+
+# A result this late is given up on (e.g. its worker died) so later frames
+# are not held back behind it. Only applies once a worker has loaded the model.
+RESULT_TIMEOUT_S = 1.0
+# Sent by a worker once its landmarker is ready
+_READY = -1
+# A worker's current sequence while it has no task
+_IDLE = -1
+
+ResultCallback = Callable[[List[np.ndarray], np.ndarray | None, int], None]
+
+
+class _RingLayout(NamedTuple):
+    slots: int
+    # Largest frame in pixels; smaller (downscaled) frames use a prefix.
+    max_pixels: int
+    num_poses: int
+    frame_name: str
+    mask_name: str
+    landmarks_name: str
+
+
+def _ring_views(
+    layout: _RingLayout,
+    buffers: List[shared_memory.SharedMemory],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    frames = np.ndarray(
+        (layout.slots, layout.max_pixels * 3),
+        dtype=np.uint8,
+        buffer=buffers[0].buf,
+    )
+    masks = np.ndarray(
+        (layout.slots, layout.max_pixels),
+        dtype=np.float32,
+        buffer=buffers[1].buf,
+    )
+    landmarks = np.ndarray(
+        (layout.slots, layout.num_poses, NUM_LANDMARKS, LANDMARK_FIELDS),
+        dtype=np.float32,
+        buffer=buffers[2].buf,
+    )
+    return frames, masks, landmarks
+
+
+def _worker_main(
+    model_asset_path: str,
+    layout: _RingLayout,
+    tasks: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    current: ctypes.c_longlong,
+) -> None:
+    """
+    Runs one landmarker over frames handed in through the shared ring.
+
+    Each task is (sequence, slot, height, width, timestamp_ms). Landmarks and
+    the segmentation mask are written back into the same slot, and only
+    (sequence, person count, mask shape) goes through the result queue. A
+    person count of -1 means the frame failed. ``current`` holds the
+    sequence being worked on, so the pool knows what a dead worker lost.
+    """
+    buffers = [
+        shared_memory.SharedMemory(name=name)
+        for name in (layout.frame_name, layout.mask_name, layout.landmarks_name)
+    ]
+    frames, masks, landmarks = _ring_views(layout, buffers)
+    landmark_buffer = LandmarkBuffer(layout.num_poses)
+    options = landmarker_options(
+        model_asset_path,
+        VisionRunningMode.VIDEO,
+        num_poses=layout.num_poses,
+        output_segmentation_masks=True,
+    )
+    try:
+        with PoseLandmarker.create_from_options(options) as landmarker:
+            results.put((_READY, 0, None))
+            while (task := tasks.get()) is not None:
+                sequence, slot, height, width, timestamp_ms = task
+                current.value = sequence
+                count, mask_shape = -1, None
+                try:
+                    image = to_image(
+                        frames[slot, : height * width * 3].reshape(height, width, 3),
+                    )
+                    result = landmarker.detect_for_video(image, timestamp_ms)
+                    people = landmark_buffer.update(result)[: layout.num_poses]
+                    for person, person_landmarks in enumerate(people):
+                        landmarks[slot, person] = person_landmarks
+                    if result.segmentation_masks:
+                        mask = result.segmentation_masks[0].numpy_view()
+                        mask_shape = mask.shape[:2]
+                        masks[slot, : mask.size] = mask.reshape(-1)
+                    count = len(people)
+                except Exception:
+                    logger.exception(f"Inference failed on frame {sequence}.")
+                results.put((sequence, count, mask_shape))
+                current.value = _IDLE
+    finally:
+        del frames, masks, landmarks
+        for buffer in buffers:
+            buffer.close()
+
+
+class InferencePool:
+    """
+    Pose landmarkers in worker processes fed through shared memory.
+
+    Frames are copied into a ring of shared-memory slots and only the slot
+    index is queued, so no frame is pickled. Workers take tasks from one
+    queue, which spreads the load over idle processes, and write landmarks
+    and masks back into the slot. Results are handed to ``on_result`` in
+    submission order from a collector thread; the landmark and mask arrays
+    are views into the ring and are only valid during the callback.
+
+    A frame given up on keeps its slot until its worker answers or dies, so
+    a late result never lands in the slot of a newer frame. Workers that
+    exit are replaced.
+    """
+
+    def __init__(
+        self,
+        model_asset_path: str,
+        frame_shape: Tuple[int, ...],
+        on_result: ResultCallback,
+        *,
+        workers: int,
+        num_poses: int = 1,
+        slots_per_worker: int = 2,
+    ) -> None:
+        height, width = frame_shape[:2]
+        slots = workers * slots_per_worker
+        sizes = (
+            slots * height * width * 3,
+            slots * height * width * np.dtype(np.float32).itemsize,
+            slots
+            * num_poses
+            * NUM_LANDMARKS
+            * LANDMARK_FIELDS
+            * np.dtype(np.float32).itemsize,
+        )
+        self.__buffers = [
+            shared_memory.SharedMemory(create=True, size=size) for size in sizes
+        ]
+        layout = _RingLayout(
+            slots=slots,
+            max_pixels=height * width,
+            num_poses=num_poses,
+            frame_name=self.__buffers[0].name,
+            mask_name=self.__buffers[1].name,
+            landmarks_name=self.__buffers[2].name,
+        )
+        self.__frames, self.__masks, self.__landmarks = _ring_views(
+            layout,
+            self.__buffers,
+        )
+        self.__on_result = on_result
+        self.__model_asset_path = model_asset_path
+        self.__layout = layout
+
+        self.__context = worker_context()
+        self.__tasks = self.__context.Queue()
+        self.__results = self.__context.Queue()
+        # (process, sequence it is working on)
+        self.__workers: List[Tuple[BaseProcess, ctypes.c_longlong]] = [
+            self.__start_worker(i) for i in range(workers)
+        ]
+
+        self.__lock = threading.Lock()
+        self.__free_slots = list(range(slots))
+        # sequence -> (slot, timestamp_ms, submitted at)
+        self.__pending: Dict[int, Tuple[int, int, float]] = {}
+        # sequence -> (person count, mask shape)
+        self.__finished: Dict[int, Tuple[int, Tuple[int, int] | None]] = {}
+        # sequence -> slot of frames given up on that a worker may still write
+        self.__quarantined: Dict[int, int] = {}
+        self.__submit_sequence = 0
+        self.__emit_sequence = 0
+        self.__ready_workers = 0
+        self.__ready_at = 0.0
+        self.__closed = threading.Event()
+        self.__collector = threading.Thread(
+            target=self.__collect,
+            name="yoga-inference-collector",
+            daemon=True,
+        )
+        self.__collector.start()
+        logger.info(f"Inference pool started with {workers} workers.")
+
+    def __start_worker(self, index: int) -> Tuple[BaseProcess, ctypes.c_longlong]:
+        current = self.__context.Value("q", _IDLE, lock=False)
+        process = self.__context.Process(
+            target=_worker_main,
+            args=(
+                self.__model_asset_path,
+                self.__layout,
+                self.__tasks,
+                self.__results,
+                current,
+            ),
+            name=f"yoga-inference-{index}",
+            daemon=True,
+        )
+        process.start()
+        return process, current
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.__pending)
+
+    def fits(self, frame: np.ndarray) -> bool:
+        """Whether ``frame`` fits the slots, which are sized on creation."""
+        return frame.size <= self.__frames.shape[1]
+
+    def submit(self, frame: np.ndarray, timestamp_ms: int) -> bool:
+        """
+        Queues a frame for inference.
+
+        :return: False if every slot is busy and the frame was dropped.
+        :raises ValueError: if the frame does not fit, see ``fits``.
+        """
+        if not self.fits(frame):
+            raise ValueError(f"Frame of shape {frame.shape} does not fit the pool.")
+        with self.__lock:
+            if not self.__free_slots:
+                return False
+            slot = self.__free_slots.pop()
+            sequence = self.__submit_sequence
+            self.__submit_sequence += 1
+            self.__pending[sequence] = (slot, timestamp_ms, time.monotonic())
+
+        height, width = frame.shape[:2]
+        self.__frames[slot, : frame.size] = frame.reshape(-1)
+        self.__tasks.put((sequence, slot, height, width, timestamp_ms))
+        return True
+
+    def __collect(self) -> None:
+        while not self.__closed.is_set():
+            try:
+                sequence, count, mask_shape = self.__results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            else:
+                if sequence == _READY:
+                    self.__ready_workers += 1
+                    self.__ready_at = time.monotonic()
+                elif sequence >= self.__emit_sequence:
+                    self.__finished[sequence] = (count, mask_shape)
+                else:
+                    # Given up on earlier, its slot can be reused now.
+                    self.__release_quarantined(sequence)
+            self.__emit_ready()
+            self.__replace_dead_workers()
+
+    def __release_quarantined(self, sequence: int) -> None:
+        slot = self.__quarantined.pop(sequence, None)
+        if slot is not None:
+            with self.__lock:
+                self.__free_slots.append(slot)
+
+    def __replace_dead_workers(self) -> None:
+        for index, (process, current) in enumerate(self.__workers):
+            if process.is_alive() or self.__closed.is_set():
+                continue
+            logger.error(
+                f"Inference worker {index} exited with {process.exitcode}, "
+                "starting another.",
+            )
+            # Its task will never be answered.
+            lost = current.value
+            if lost != _IDLE:
+                if lost >= self.__emit_sequence:
+                    self.__finished.setdefault(lost, (-1, None))
+                else:
+                    self.__release_quarantined(lost)
+            self.__workers[index] = self.__start_worker(index)
+
+    def __emit_ready(self) -> None:
+        while True:
+            sequence = self.__emit_sequence
+            with self.__lock:
+                pending = self.__pending.get(sequence)
+            if pending is None:
+                return
+            slot, timestamp_ms, submitted_at = pending
+
+            finished = self.__finished.pop(sequence, None)
+            if finished is None:
+                waited = time.monotonic() - max(submitted_at, self.__ready_at)
+                if not self.__ready_workers or waited < RESULT_TIMEOUT_S:
+                    return
+                logger.warning(f"Gave up waiting for inference of frame {sequence}.")
+                self.__quarantined[sequence] = slot
+            elif finished[0] >= 0:
+                count, mask_shape = finished
+                mask = None
+                if mask_shape is not None:
+                    mask = self.__masks[
+                        slot,
+                        : mask_shape[0] * mask_shape[1],
+                    ].reshape(mask_shape)
+                try:
+                    self.__on_result(
+                        list(self.__landmarks[slot, :count]),
+                        mask,
+                        timestamp_ms,
+                    )
+                except Exception:
+                    logger.exception("Inference result callback failed.")
+
+            with self.__lock:
+                del self.__pending[sequence]
+                if finished is not None:
+                    self.__free_slots.append(slot)
+                self.__emit_sequence += 1
+
+    def close(self) -> None:
+        if self.__closed.is_set():
+            return
+        self.__closed.set()
+        # First, so no worker is replaced while they are being stopped.
+        self.__collector.join(timeout=1)
+        for _ in self.__workers:
+            self.__tasks.put(None)
+        for process, _ in self.__workers:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        # The names go now; the mappings stay until nothing can read them.
+        for buffer in self.__buffers:
+            buffer.unlink()
+        if self.__collector.is_alive():
+            logger.warning("Inference collector still running, keeping its buffers.")
+            return
+        del self.__frames, self.__masks, self.__landmarks
+        for buffer in self.__buffers:
+            buffer.close()
@@ -0,0 +1,91 @@
+"""
+Compact binary messages for clients that draw the skeleton themselves.
+
+All values are little-endian. Every message starts with a one-byte type.
+
+Landmarks (type 1), one per scored frame::
+
+    uint8  type, person count, connection count, flags (bit 0: any wrong)
+    int64  timestamp_ms
+    then per person:
+        float16[33 * 4]           x, y, z, visibility of each landmark
+        uint8[connection count]   ConnectionStatus of each CONNECTIONS entry
+
+Mask (type 2), optional, sent right after the landmarks of the same frame::
+
+    uint8  type, padding
+    uint16 width, height
+    int64  timestamp_ms
+    uint32 run count
+    uint16[run count]  run lengths of the row-major binary mask, alternating
+                       background and person, starting with background
+"""
+
+import struct
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from yoga_pose_recognition.detection.landmarks import LANDMARK_FIELDS, NUM_LANDMARKS
+from yoga_pose_recognition.detection.pose_rules import CONNECTIONS, ConnectionStatus
+
+MESSAGE_LANDMARKS = 1
+MESSAGE_MASK = 2
+
+_LANDMARKS_HEADER = struct.Struct("<BBBBq")
+_MASK_HEADER = struct.Struct("<BxHHqI")
+_MAX_RUN = np.iinfo(np.uint16).max
+FLAG_WRONG = 1
+
+
+def encode_landmarks(
+    timestamp_ms: int,
+    people: List[Tuple[np.ndarray, np.ndarray]],
+) -> bytes:
+    """:param people: (landmarks, connection status) of each scored person."""
+    is_wrong = any(np.any(status == ConnectionStatus.WRONG) for _, status in people)
+    parts = [
+        _LANDMARKS_HEADER.pack(
+            MESSAGE_LANDMARKS,
+            len(people),
+            len(CONNECTIONS),
+            FLAG_WRONG if is_wrong else 0,
+            timestamp_ms,
+        ),
+    ]
+    for landmarks, status in people:
+        parts.append(
+            landmarks[:NUM_LANDMARKS, :LANDMARK_FIELDS].astype("<f2").tobytes(),
+        )
+        parts.append(status.astype(np.uint8).tobytes())
+    return b"".join(parts)
+
+
+def run_lengths(binary: np.ndarray) -> np.ndarray:
+    """Run lengths of a boolean array, background first, as uint16."""
+    flat = binary.ravel()
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    runs = np.diff(np.concatenate(([0], changes, [flat.size])))
+    if flat.size and flat[0]:
+        runs = np.concatenate(([0], runs))
+    if runs.size and runs.max() > _MAX_RUN:
+        # Split long runs with empty runs of the other value in between.
+        split: List[int] = []
+        for run in runs.tolist():
+            full, rest = divmod(run, _MAX_RUN)
+            split.extend((_MAX_RUN, 0) * full)
+            split.append(rest)
+        runs = np.array(split)
+    return runs.astype("<u2")
+
+
+def encode_mask(timestamp_ms: int, mask: np.ndarray, width: int) -> bytes:
+    """Downscales a float segmentation mask to ``width`` and run-length codes it."""
+    height = max(1, round(mask.shape[0] * width / mask.shape[1]))
+    small = cv2.resize(mask, (width, height), interpolation=cv2.INTER_AREA)
+    runs = run_lengths(small > 0.5)
+    return (
+        _MASK_HEADER.pack(MESSAGE_MASK, width, height, timestamp_ms, runs.size)
+        + runs.tobytes()
+    )
@@ -0,0 +1,51 @@
+import multiprocessing
+from multiprocessing.context import SpawnContext
+from typing import Callable
+
+import mediapipe as mp
+import numpy as np
+from mediapipe.tasks.python.vision.pose_landmarker import PoseLandmarkerResult
+
+BaseOptions = mp.tasks.BaseOptions
+PoseLandmarker = mp.tasks.vision.PoseLandmarker
+PoseLandmarkerOptions = mp.tasks.vision.PoseLandmarkerOptions
+VisionRunningMode = mp.tasks.vision.RunningMode
+
+
+def landmarker_options(
+    model_asset_path: str,
+    running_mode: VisionRunningMode,
+    *,
+    num_poses: int = 1,
+    output_segmentation_masks: bool = False,
+    result_callback: (
+        Callable[[PoseLandmarkerResult, mp.Image, int], None] | None
+    ) = None,
+) -> PoseLandmarkerOptions:
+    """Options of a CPU pose landmarker, ``result_callback`` for LIVE_STREAM."""
+    return PoseLandmarkerOptions(
+        base_options=BaseOptions(
+            model_asset_path=model_asset_path,
+            delegate=BaseOptions.Delegate.CPU,
+        ),
+        running_mode=running_mode,
+        num_poses=num_poses,
+        output_segmentation_masks=output_segmentation_masks,
+        result_callback=result_callback,
+    )
+
+
+def to_image(frame: np.ndarray) -> mp.Image:
+    """
+    Wraps a frame, as OpenCV delivers it, for the landmarker.
+
+    The channels stay in OpenCV's BGR order, as the live pipeline has always
+    sent them, so offline and live scores come from the same pixels.
+    """
+    return mp.Image(image_format=mp.ImageFormat.SRGB, data=frame)
+
+
+def worker_context() -> SpawnContext:
+    """Multiprocessing context for processes that run a landmarker."""
+    # MediaPipe is not fork-safe, so workers start from a clean interpreter.
+    return multiprocessing.get_context("spawn")
@@ -0,0 +1,49 @@
+from typing import List
+
+import numpy as np
+from mediapipe.tasks.python.vision.pose_landmarker import PoseLandmarkerResult
+
+NUM_LANDMARKS = 33
+# x, y, z, visibility
+LANDMARK_FIELDS = 4
+
+
+class LandmarkBuffer:
+    """
+    Reusable landmark arrays for ``PoseLandmarkerResult``.
+
+    Each detected person gets one (33, 4) float32 array holding
+    x, y, z and visibility. The arrays are allocated once and overwritten
+    on every frame, so callers must copy them if they need to keep a frame
+    around.
+    """
+
+    def __init__(self, num_poses: int = 1) -> None:
+        self.__arrays: List[np.ndarray] = [
+            np.zeros((NUM_LANDMARKS, LANDMARK_FIELDS), dtype=np.float32)
+            for _ in range(num_poses)
+        ]
+
+    def update(self, result: PoseLandmarkerResult) -> List[np.ndarray]:
+        pose_landmarks_list = result.pose_landmarks
+        while len(self.__arrays) < len(pose_landmarks_list):
+            self.__arrays.append(
+                np.zeros((NUM_LANDMARKS, LANDMARK_FIELDS), dtype=np.float32),
+            )
+
+        for landmarks, pose_landmarks in zip(
+            self.__arrays,
+            pose_landmarks_list,
+            strict=False,
+        ):
+            landmarks[:] = [
+                (
+                    landmark.x,
+                    landmark.y,
+                    landmark.z,
+                    landmark.visibility or 0.0,
+                )
+                for landmark in pose_landmarks
+            ]
+
+        return self.__arrays[: len(pose_landmarks_list)]
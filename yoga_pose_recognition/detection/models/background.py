@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from typing import List
+
+from pydantic import BaseModel
+
+
+class BackgroundImage(BaseModel):
+    id: int
+    name: str
+    path: str
+
+
+class BackgroundData(BaseModel):
+    backgrounds: List[BackgroundImage]
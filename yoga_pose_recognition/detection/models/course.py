@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import List
+
+from pydantic import BaseModel
+
+
+class CoursePose(BaseModel):
+    id: int
+    # Pose name in data/pose.json
+    server_id: str
+    name: str
+    # Seconds
+    duration: int
+    # Background image shown during this pose, prefetched one pose ahead
+    background: str | None = None
+
+
+class Course(BaseModel):
+    id: int
+    name: str
+    description: str = ""
+    poses: List[CoursePose]
+
+
+class CourseData(BaseModel):
+    courses: List[Course]
+
+
+class CoursePoseStats(BaseModel):
+    pose: str
+    name: str
+    # Milliseconds of scored frames, and of those where nobody was wrong
+    scored_ms: int
+    correct_ms: int
+    # Mean absolute error in degrees of each angle rule
+    angle_errors: List[float]
+
+
+class CourseProgress(BaseModel):
+    session_id: str
+    course_id: int
+    # Index into the course poses, equal to their count once finished
+    step: int
+    pose: str
+    step_remaining_ms: int
+    finished: bool
+    poses: List[CoursePoseStats]
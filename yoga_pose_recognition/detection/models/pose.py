@@ -1,19 +1,68 @@
 from __future__ import annotations
 
-from typing import List
+from enum import Enum
+from typing import List, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+
+# Degrees an angle may differ from its target and still count as correct
+DEFAULT_ANGLE_TOLERANCE = 20.0
+# Extra degrees a correct angle may drift before it flips back to wrong
+DEFAULT_ANGLE_HYSTERESIS = 5.0
+
+
+class AngleMode(str, Enum):
+    # In the image plane
+    TWO_D = "2d"
+    # With the landmarker's depth estimate
+    THREE_D = "3d"
 
 
 class Angle(BaseModel):
-    connection1: str
-    connection2: str
-    value: int
+    """
+    One angle rule of a pose.
+
+    Either the angle between two connections that share a landmark, or the
+    angle at the middle one of three landmarks. Unset options fall back to
+    the pose's.
+    """
+
+    connection1: str | None = None
+    connection2: str | None = None
+    # (end, vertex, end) as landmark names (e.g. "LEFT_WRIST") or indices
+    points: Tuple[str | int, str | int, str | int] | None = None
+    value: float
+    tolerance: float | None = Field(default=None, gt=0)
+    # Share in the pose match; 0 only measures the angle, it is never wrong
+    weight: float = Field(default=1.0, ge=0)
+    mode: AngleMode | None = None
+    # Landmarks less visible than this make the angle unjudged
+    min_visibility: float | None = Field(default=None, ge=0, le=1)
+    # Also applies the rule to the other side of the body
+    symmetric: bool = False
+
+    @model_validator(mode="after")
+    def check_definition(self) -> Angle:
+        connections = (self.connection1, self.connection2)
+        if self.points is None:
+            if None in connections:
+                raise ValueError("Give either connection1 and connection2, or points.")
+        elif connections != (None, None):
+            raise ValueError("Give either connection1 and connection2, or points.")
+        elif len(set(self.points)) != len(self.points):
+            raise ValueError(f"Points must be three different landmarks: {self.points}")
+        return self
 
 
 class Pose(BaseModel):
     name: str
     angles: List[Angle]
+    tolerance: float = Field(default=DEFAULT_ANGLE_TOLERANCE, gt=0)
+    hysteresis: float = Field(default=DEFAULT_ANGLE_HYSTERESIS, ge=0)
+    mode: AngleMode = AngleMode.TWO_D
+    min_visibility: float = Field(default=0.0, ge=0, le=1)
+    # The pose may also be done mirrored, e.g. standing on the other leg
+    mirror: bool = False
 
 
 class PoseData(BaseModel):
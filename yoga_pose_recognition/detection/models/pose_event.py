@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import List
+
+from pydantic import BaseModel
+
+
+class RecognizedPose(BaseModel):
+    pose: str
+    confidence: float
+    mean_error: float
+    # Matched the mirrored side of a mirror pose
+    mirrored: bool = False
+
+
+class PersonScore(BaseModel):
+    # Template this person was scored against
+    pose: str = ""
+    is_wrong: bool
+    # Measured angles in the order they are listed in data/pose.json, a
+    # symmetric angle followed by its mirror
+    angles: List[float]
+    wrong_connections: List[str]
+    # Best matching templates, only in recognition ("auto") mode
+    matches: List[RecognizedPose] = []
+
+
+class PoseEvent(BaseModel):
+    session_id: str
+    timestamp_ms: int
+    pose: str
+    # True if any detected person is wrong
+    is_wrong: bool
+    # Same as people[0], kept for single-person clients
+    angles: List[float]
+    wrong_connections: List[str]
+    people: List[PersonScore]
@@ -0,0 +1,133 @@
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from yoga_pose_recognition.detection.pose_rules import (
+    CompiledPose,
+    best_side,
+    joint_angles,
+)
+
+# current_pose that scores everyone against the template they match best
+AUTO_POSE = "auto"
+
+
+class PoseMatch(NamedTuple):
+    pose: str
+    # 1 when every angle hits its target, about 0.6 at one tolerance off
+    confidence: float
+    # Mean absolute angle error in degrees
+    mean_error: float
+    # 0 as written, 1 mirrored; pass to CompiledPose.measure when judging
+    side: int
+
+
+class PoseClassifier:
+    """
+    Scores landmarks against every template at once.
+
+    All angle triples used by any template are collected into one feature
+    vector (triples differing only in the order of their end points share
+    a slot, 2D and 3D angles do not), and the templates into (sides x
+    poses x slots) target, tolerance and weight matrices; a weight of 0
+    marks a slot the pose does not use. Mirror poses fill the second side
+    with their mirrored triples, the others repeat the first. A frame costs
+    one ``joint_angles`` over the unique slots plus a few matrix
+    operations, however many poses there are. Templates without angles
+    (e.g. no_pose) are not candidates.
+    """
+
+    def __init__(self, compiled_poses: Dict[str, CompiledPose]) -> None:
+        candidates = [pose for pose in compiled_poses.values() if len(pose.targets)]
+        sides = 2 if any(pose.mirror for pose in candidates) else 1
+        slots: Dict[Tuple[int, int, int, float], int] = {}
+        columns = []
+        for pose in candidates:
+            pose_columns = []
+            for side in range(sides):
+                side_points = pose.side_points[min(side, len(pose.side_points) - 1)]
+                pose_columns.append(
+                    [
+                        slots.setdefault((min(x, z), y, max(x, z), depth), len(slots))
+                        for (x, y, z), depth in zip(
+                            side_points.tolist(),
+                            pose.axes[:, 2].tolist(),
+                            strict=True,
+                        )
+                    ],
+                )
+            columns.append(pose_columns)
+
+        self.names = [pose.name for pose in candidates]
+        self.points = np.array([slot[:3] for slot in slots], dtype=np.intp)
+        self.points = self.points.reshape(-1, 3)
+        depth = np.array([slot[3] for slot in slots], dtype=np.float32)
+        self.axes = (
+            np.stack([np.ones_like(depth), np.ones_like(depth), depth], 1)
+            if depth.any()
+            else None
+        )
+        shape = (sides, len(candidates), len(slots))
+        self.targets = np.zeros(shape, dtype=np.float32)
+        # 1 where unused, so the similarity never divides by zero
+        self.tolerances = np.ones(shape, dtype=np.float32)
+        self.weights = np.zeros(shape, dtype=np.float32)
+        for row, (pose, pose_columns) in enumerate(
+            zip(candidates, columns, strict=True),
+        ):
+            for side, side_columns in enumerate(pose_columns):
+                # A pose listing the same triple twice keeps the last rule.
+                self.targets[side, row, side_columns] = pose.targets
+                self.tolerances[side, row, side_columns] = pose.tolerances
+                self.weights[side, row, side_columns] = pose.weights
+        self.__weight_sums = np.maximum(self.weights.sum(axis=2), 1e-6)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def scores(
+        self,
+        landmarks: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Confidence, mean angle error and side of every candidate pose.
+
+        Both scores are weighted by the rules' weights, and taken from the
+        side ``best_side`` picks for mirror poses, the same one
+        ``CompiledPose.measure`` judges.
+
+        :param landmarks: (N, >=2) array of normalized landmark coordinates,
+            with depth if a template has 3D rules.
+        :return: three arrays in the order of ``names``.
+        """
+        angles = joint_angles(landmarks, self.points, self.axes)
+        errors = np.abs(angles - self.targets)
+        mean_errors = (errors * self.weights).sum(axis=2) / self.__weight_sums
+        # Gaussian per angle, scaled by each rule's tolerance
+        similarity = np.exp(-0.5 * (errors / self.tolerances) ** 2)
+        confidences = (similarity * self.weights).sum(axis=2) / self.__weight_sums
+        sides = best_side(angles, self.targets, self.weights)
+        side = sides[np.newaxis]
+        return (
+            np.take_along_axis(confidences, side, axis=0)[0],
+            np.take_along_axis(mean_errors, side, axis=0)[0],
+            sides,
+        )
+
+    def classify(self, landmarks: np.ndarray, top_k: int = 3) -> List[PoseMatch]:
+        """The ``top_k`` best matching poses, most confident first."""
+        if not self.names:
+            return []
+        confidences, mean_errors, sides = self.scores(landmarks)
+        top_k = min(top_k, len(self.names))
+        best = np.argpartition(-confidences, top_k - 1)[:top_k]
+        best = best[np.argsort(-confidences[best])]
+        return [
+            PoseMatch(
+                self.names[i],
+                round(float(confidences[i]), 3),
+                round(float(mean_errors[i]), 1),
+                int(sides[i]),
+            )
+            for i in best
+        ]
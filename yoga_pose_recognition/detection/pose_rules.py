@@ -0,0 +1,383 @@
+import re
+from enum import IntEnum
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+from loguru import logger
+from mediapipe.python.solutions.pose import PoseLandmark
+
+from yoga_pose_recognition.detection.body_connections import BodyConnections
+from yoga_pose_recognition.detection.models.pose import AngleMode, Pose
+
+CONNECTIONS = [connection.value for connection in BodyConnections]
+CONNECTION_NAMES = [connection.name for connection in BodyConnections]
+CONNECTION_INDEX = {connection.name: i for i, connection in enumerate(BodyConnections)}
+_CONNECTION_BY_ENDS = {
+    frozenset(connection): i for i, connection in enumerate(CONNECTIONS)
+}
+
+LANDMARK_INDEX = {landmark.name: landmark.value for landmark in PoseLandmark}
+# The same landmark on the other side of the body, e.g. LEFT_KNEE -> RIGHT_KNEE
+MIRRORED_LANDMARKS = np.array(
+    [
+        LANDMARK_INDEX[
+            re.sub(
+                "LEFT|RIGHT",
+                lambda side: "RIGHT" if side.group() == "LEFT" else "LEFT",
+                landmark.name,
+            )
+        ]
+        for landmark in PoseLandmark
+    ],
+    dtype=np.intp,
+)
+
+
+class ConnectionStatus(IntEnum):
+    NORMAL = 0
+    CORRECT = 1
+    WRONG = 2
+
+
+def extract_xyz(
+    tuple1: Tuple[int, int],
+    tuple2: Tuple[int, int],
+) -> Tuple[int, int, int]:
+    # 找出重複的值
+    common_value_set = set(tuple1).intersection(set(tuple2))
+
+    if not common_value_set:
+        raise ValueError("No common value found between the two tuples.")
+
+    if len(common_value_set) != 1:
+        raise ValueError("More than one common value found between the two tuples.")
+
+    common_value = common_value_set.pop()
+
+    # 去除重複的值
+    unique_values = list(set(tuple1).union(set(tuple2)) - {common_value})
+
+    if len(unique_values) != 2:
+        raise ValueError("The unique values count is not equal to 2.")
+
+    x, z = unique_values
+    y = common_value
+
+    return x, y, z
+
+
+def joint_angles(
+    landmarks: np.ndarray,
+    points: np.ndarray,
+    axes: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Angles at the vertex ``y`` of every (x, y, z) landmark triple at once.
+
+    :param landmarks: (N, >=2) array of normalized landmark coordinates,
+        (N, >=3) if ``axes`` is given.
+    :param points: (K, 3) landmark index triples.
+    :param axes: (K, 3) weights of x, y and depth per triple, e.g. (1, 1, 0)
+        for an angle in the image plane. x and y only if None.
+    :return: K angles in degrees, 0 where a vector has zero length.
+    """
+    # 立體空間的角度比較難定義姿勢, 所以預設只用 x, y
+    coords = landmarks[:, :2] if axes is None else landmarks[:, :3]
+    vertex = coords[points[:, 1]]
+    vector1 = coords[points[:, 0]] - vertex
+    vector2 = coords[points[:, 2]] - vertex
+    if axes is not None:
+        vector1 *= axes
+        vector2 *= axes
+    norm = np.linalg.norm(vector1, axis=1) * np.linalg.norm(vector2, axis=1)
+    valid = norm != 0
+    dot = np.einsum("ij,ij->i", vector1, vector2)
+    cosine_angle = np.divide(dot, norm, out=np.zeros_like(norm), where=valid)
+    angles = np.degrees(np.arccos(np.clip(cosine_angle, -1.0, 1.0)))
+    return np.where(valid, angles, 0.0)
+
+
+def _landmark_index(landmark: str | int) -> int:
+    if isinstance(landmark, int):
+        if not 0 <= landmark < len(LANDMARK_INDEX):
+            raise ValueError(f"Landmark index out of range: {landmark}")
+        return landmark
+    try:
+        return LANDMARK_INDEX[landmark]
+    except KeyError:
+        raise ValueError(f"Unknown landmark: {landmark}") from None
+
+
+def _connection_ends(name: str) -> Tuple[int, int]:
+    try:
+        return BodyConnections[name].value
+    except KeyError:
+        raise ValueError(f"Unknown connection: {name}") from None
+
+
+def _rule_connections(x: int, y: int, z: int) -> List[int]:
+    """
+    Connections coloured by the verdict of the angle at ``y``.
+
+    Its two arms, or every connection at the vertex if the arms are not
+    body connections.
+    """
+    arms = [
+        _CONNECTION_BY_ENDS[ends]
+        for ends in (frozenset((x, y)), frozenset((y, z)))
+        if ends in _CONNECTION_BY_ENDS
+    ]
+    return arms or [i for i, connection in enumerate(CONNECTIONS) if y in connection]
+
+
+def best_side(
+    angles: np.ndarray,
+    targets: np.ndarray,
+    weights: np.ndarray,
+) -> np.ndarray:
+    """
+    Which side of a mirror pose the angles match, by weighted absolute error.
+
+    :param angles: (sides, ..., rules) measured angles.
+    :param targets: target angles broadcastable to ``angles``.
+    :param weights: rule weights broadcastable to ``angles``.
+    :return: index of the best side, per entry of the middle axes; the
+        side as written wins ties.
+    """
+    return np.argmin((np.abs(angles - targets) * weights).sum(axis=-1), axis=0)
+
+
+class Measurement(NamedTuple):
+    # One angle per rule, of the side that matched better for a mirror pose
+    angles: np.ndarray
+    # 0 as written, 1 mirrored
+    side: int
+    # Rules whose landmarks were visible enough, None if not checked
+    visible: np.ndarray | None
+
+
+class CompiledPose:
+    """
+    A pose whose angle rules are flattened into NumPy arrays.
+
+    ``points`` holds one (x, y, z) landmark index triple per rule, where
+    ``y`` is the vertex, and ``targets``, ``tolerances``, ``weights``,
+    ``min_visibility`` and ``axes`` the options of each rule. A symmetric
+    angle becomes two rules, the mirrored one right after it. A mirror pose
+    keeps the mirrored triples of every rule as a second side; both sides
+    are measured in one ``joint_angles`` call and the one with the smaller
+    weighted error is judged (see ``best_side``, which ``PoseClassifier``
+    uses as well).
+
+    ``connection_rule`` maps every ``BodyConnections`` member to the index
+    of the last rule that touches it (``-1`` if none), one row per side, so
+    later rules win over earlier ones exactly like the old per-angle loop.
+    """
+
+    name: str
+    points: np.ndarray
+    targets: np.ndarray
+    tolerances: np.ndarray
+    weights: np.ndarray
+    min_visibility: np.ndarray
+    axes: np.ndarray
+    connection_rule: np.ndarray
+    tolerance: float
+    hysteresis: float
+
+    def __init__(self, pose: Pose) -> None:
+        """:raises ValueError: if a rule names an unknown connection or landmark."""
+        self.name = pose.name
+        self.tolerance = pose.tolerance
+        self.hysteresis = pose.hysteresis
+        self.mirror = pose.mirror
+        points = []
+        options = []
+
+        for angle in pose.angles:
+            if angle.points is not None:
+                triple = tuple(_landmark_index(landmark) for landmark in angle.points)
+                # A name and an index can name the same landmark.
+                if len(set(triple)) != len(triple):
+                    raise ValueError(f"Repeated landmark in {angle.points}")
+            else:
+                connection1 = _connection_ends(angle.connection1)
+                connection2 = _connection_ends(angle.connection2)
+                try:
+                    triple = extract_xyz(connection1, connection2)
+                except ValueError:
+                    logger.warning(f"Common point not found for {angle}")
+                    continue
+
+            mode = angle.mode or pose.mode
+            rule = (
+                angle.value,
+                angle.tolerance or pose.tolerance,
+                angle.weight,
+                (
+                    pose.min_visibility
+                    if angle.min_visibility is None
+                    else angle.min_visibility
+                ),
+                1.0 if mode == AngleMode.THREE_D else 0.0,
+            )
+            points.append(triple)
+            options.append(rule)
+            mirrored = tuple(MIRRORED_LANDMARKS[list(triple)].tolist())
+            if angle.symmetric and mirrored != triple:
+                points.append(mirrored)
+                options.append(rule)
+
+        self.points = np.array(points, dtype=np.intp).reshape(-1, 3)
+        (
+            self.targets,
+            self.tolerances,
+            self.weights,
+            self.min_visibility,
+            depth,
+        ) = (
+            np.array(options, dtype=np.float32).reshape(-1, 5).T.copy()
+        )
+        self.axes = np.stack([np.ones_like(depth), np.ones_like(depth), depth], 1)
+
+        # Triples of every side, shaped like (sides, rules, 3)
+        self.side_points = np.stack(
+            (
+                [self.points, MIRRORED_LANDMARKS[self.points]]
+                if self.mirror
+                else [self.points]
+            ),
+        )
+        self.__flat_points = self.side_points.reshape(-1, 3)
+        self.__side_axes = self.axes if depth.any() else None
+        self.__flat_axes = (
+            np.tile(self.axes, (len(self.side_points), 1)) if depth.any() else None
+        )
+        self.__checks_visibility = bool(np.any(self.min_visibility > 0))
+        self.__judged = self.weights > 0
+
+        connection_rule = np.full(
+            (len(self.side_points), len(CONNECTIONS)),
+            -1,
+            dtype=np.intp,
+        )
+        for side, side_points in enumerate(self.side_points.tolist()):
+            for rule, triple in enumerate(side_points):
+                connection_rule[side, _rule_connections(*triple)] = rule
+        self.connection_rule = connection_rule
+        self.__has_rule = connection_rule >= 0
+        self.__rule_index = np.where(self.__has_rule, connection_rule, 0)
+
+    def measure(self, landmarks: np.ndarray, side: int | None = None) -> Measurement:
+        """
+        Measures every rule of the pose at once.
+
+        :param landmarks: (N, >=2) array of normalized landmark coordinates,
+            with depth for 3D rules and visibility for visibility thresholds.
+        :param side: side of a mirror pose to measure, e.g. the one the
+            classifier matched; the better one if None.
+        """
+        if side is not None and self.mirror:
+            angles = joint_angles(landmarks, self.side_points[side], self.__side_axes)
+        elif self.mirror:
+            angles = joint_angles(landmarks, self.__flat_points, self.__flat_axes)
+            angles = angles.reshape(2, -1)
+            side = int(best_side(angles, self.targets, self.weights))
+            angles = angles[side]
+        else:
+            angles = joint_angles(landmarks, self.points, self.__side_axes)
+            side = 0
+        visible = None
+        if self.__checks_visibility and landmarks.shape[1] > 3:
+            visibility = landmarks[self.side_points[side], 3].min(axis=1)
+            visible = visibility >= self.min_visibility
+        return Measurement(angles, side, visible)
+
+    def calculate_angles(self, landmarks: np.ndarray) -> np.ndarray:
+        """
+        Evaluates every angle of the pose at once.
+
+        :param landmarks: (N, >=2) array of normalized landmark coordinates.
+        :return: angles in degrees, one per rule.
+        """
+        return self.measure(landmarks).angles
+
+    def judge(
+        self,
+        angles: np.ndarray,
+        previously_correct: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Decides which angles are within their tolerance.
+
+        :param angles: measured angles, one per rule.
+        :param previously_correct: last verdict per rule. Angles that were
+            correct get ``hysteresis`` extra degrees before they flip back,
+            so a value hovering at the threshold does not flicker.
+        :return: boolean array, one per rule.
+        """
+        threshold = self.tolerances
+        if previously_correct is not None and len(previously_correct) == len(angles):
+            threshold = self.tolerances + self.hysteresis * previously_correct
+        return np.abs(angles - self.targets) < threshold
+
+    def connection_status(
+        self,
+        is_correct: np.ndarray,
+        measurement: Measurement | None = None,
+    ) -> np.ndarray:
+        """
+        Spreads the verdict of each rule over the connections it touches.
+
+        Rules with weight 0 or with landmarks below their visibility
+        threshold leave their connections ``NORMAL``.
+        """
+        if len(self.targets) == 0:
+            return np.zeros(len(CONNECTIONS), dtype=np.int8)
+        side = 0
+        judged = self.__judged
+        if measurement is not None:
+            side = measurement.side
+            if measurement.visible is not None:
+                judged = judged & measurement.visible
+        rule_status = np.where(
+            judged,
+            np.where(is_correct, ConnectionStatus.CORRECT, ConnectionStatus.WRONG),
+            ConnectionStatus.NORMAL,
+        )
+        status = rule_status[self.__rule_index[side]]
+        status[~self.__has_rule[side]] = ConnectionStatus.NORMAL
+        return status.astype(np.int8)
+
+    def evaluate(
+        self,
+        landmarks: np.ndarray,
+        side: int | None = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores one person against the pose.
+
+        :param landmarks: (N, >=2) array of normalized landmark coordinates.
+        :param side: side of a mirror pose to judge, the better one if None.
+        :return: measured angles and a ``ConnectionStatus`` code per connection.
+        """
+        measurement = self.measure(landmarks, side)
+        is_correct = self.judge(measurement.angles)
+        return measurement.angles, self.connection_status(is_correct, measurement)
+
+
+class PoseRuleEngine:
+    compiled_poses: Dict[str, CompiledPose]
+
+    def __init__(self, poses: Dict[str, Pose]) -> None:
+        self.compiled_poses = {name: CompiledPose(pose) for name, pose in poses.items()}
+
+    def __contains__(self, pose_name: str) -> bool:
+        return pose_name in self.compiled_poses
+
+    def evaluate(
+        self,
+        pose_name: str,
+        landmarks: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self.compiled_poses[pose_name].evaluate(landmarks)
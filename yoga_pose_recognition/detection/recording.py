@@ -0,0 +1,302 @@
+"""
+Append-only landmark logs of a session.
+
+A recording is two files next to each other:
+
+``<name>.yrec``
+    A 16-byte header (magic ``YOGAREC1``, uint32 version, uint32 record
+    size) followed by fixed-size records of ``RECORD_DTYPE``, one per scored
+    person and frame (one with ``people == 0`` for a frame without anyone).
+    Records are only ever appended, so the file can be memory-mapped as a
+    structured array while it is still being written; a torn record at the
+    end is ignored.
+
+``<name>.json``
+    The index: session id, start time, frame size and the pose name table
+    that the ``pose`` field points into.
+"""
+
+import json
+import re
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+from loguru import logger
+
+from yoga_pose_recognition.detection.landmarks import LANDMARK_FIELDS, NUM_LANDMARKS
+from yoga_pose_recognition.detection.pose_rules import ConnectionStatus
+
+RECORDING_SUFFIX = ".yrec"
+INDEX_SUFFIX = ".json"
+# Also used in URLs, so keep recording names to safe characters
+RECORDING_NAME_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+
+_MAGIC = b"YOGAREC1"
+_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+
+# Landmarks first so every field is naturally aligned; 544 bytes per record.
+RECORD_DTYPE = np.dtype(
+    [
+        ("landmarks", "<f4", (NUM_LANDMARKS, LANDMARK_FIELDS)),
+        ("timestamp_ms", "<i8"),
+        # Index into the pose name table of the index file
+        ("pose", "<u2"),
+        # Index of this person in the frame, and people in the frame
+        ("person", "u1"),
+        ("people", "u1"),
+        ("is_wrong", "?"),
+        ("reserved", "u1", (3,)),
+    ],
+)
+
+
+def recording_paths(directory: Path, name: str) -> Tuple[Path, Path]:
+    """:raises ValueError: if ``name`` is not a valid recording name."""
+    if not re.fullmatch(RECORDING_NAME_PATTERN, name):
+        raise ValueError(f"Invalid recording name: {name}")
+    return directory / f"{name}{RECORDING_SUFFIX}", directory / f"{name}{INDEX_SUFFIX}"
+
+
+class SessionRecorder:
+    """
+    Writes the scored frames of a session to a recording.
+
+    ``record`` is called on the result thread, so records are collected in
+    memory and written in one ``write`` about once per ``flush_interval``.
+    The index is rewritten (atomically) only when a new pose name appears.
+    Frames recorded after ``close`` are ignored.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        name: str,
+        session_id: str,
+        flush_interval: float = 1.0,
+    ) -> None:
+        """:raises FileExistsError: if the recording already exists."""
+        self.name = name
+        self.path, self.index_path = recording_paths(directory, name)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.__file = self.path.open("xb")
+        self.__file.write(_HEADER.pack(_MAGIC, _VERSION, RECORD_DTYPE.itemsize))
+        self.__index: Dict[str, Any] = {
+            "version": _VERSION,
+            "session_id": session_id,
+            "started_at": datetime.now().astimezone().isoformat(),
+            "frame_size": None,
+            "poses": [],
+        }
+        self.__pose_ids: Dict[str, int] = {}
+        self.__pending: List[np.ndarray] = []
+        self.__flush_interval = flush_interval
+        self.__last_flush = time.monotonic()
+        self.records = 0
+        self.__lock = threading.Lock()
+        self.__write_index()
+
+    def record(
+        self,
+        timestamp_ms: int,
+        pose: str,
+        people: List[np.ndarray],
+        scores: List[Tuple[np.ndarray, np.ndarray]],
+        frame_size: Tuple[int, int],
+    ) -> None:
+        """Appends one frame: every person's landmarks and verdict."""
+        with self.__lock:
+            if not self.__file.closed:
+                self.__record(timestamp_ms, pose, people, scores, frame_size)
+
+    def __record(
+        self,
+        timestamp_ms: int,
+        pose: str,
+        people: List[np.ndarray],
+        scores: List[Tuple[np.ndarray, np.ndarray]],
+        frame_size: Tuple[int, int],
+    ) -> None:
+        pose_id = self.__pose_ids.get(pose)
+        if pose_id is None:
+            # The first frame always lands here, which also sets the size.
+            pose_id = self.__pose_ids[pose] = len(self.__index["poses"])
+            self.__index["poses"].append(pose)
+            self.__index["frame_size"] = list(frame_size)
+            self.__write_index()
+
+        rows = np.zeros(max(len(people), 1), dtype=RECORD_DTYPE)
+        rows["timestamp_ms"] = timestamp_ms
+        rows["pose"] = pose_id
+        rows["people"] = len(people)
+        for person, (landmarks, (_, status)) in enumerate(
+            zip(people, scores, strict=True),
+        ):
+            rows["landmarks"][person] = landmarks[:NUM_LANDMARKS, :LANDMARK_FIELDS]
+            rows["person"][person] = person
+            rows["is_wrong"][person] = np.any(status == ConnectionStatus.WRONG)
+        self.__pending.append(rows)
+        self.records += len(rows)
+
+        if time.monotonic() - self.__last_flush >= self.__flush_interval:
+            self.__flush()
+
+    def __flush(self) -> None:
+        if self.__pending:
+            self.__file.write(np.concatenate(self.__pending).tobytes())
+            self.__pending = []
+            self.__file.flush()
+        self.__last_flush = time.monotonic()
+
+    def __write_index(self) -> None:
+        temporary = self.index_path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self.__index, ensure_ascii=False))
+        temporary.replace(self.index_path)
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__file.closed:
+                return
+            self.__flush()
+            self.__file.close()
+        logger.info(f"Recording {self.name} closed with {self.records} records.")
+
+
+class ReplayFrame(NamedTuple):
+    timestamp_ms: int
+    pose: str
+    # (people, 33, 4), empty if nobody was detected
+    landmarks: np.ndarray
+
+
+class Recording:
+    """
+    A recording opened for reading.
+
+    ``records`` is a read-only memory map of every record, so analytics can
+    run vectorized over a whole day without loading it, e.g.
+    ``records["is_wrong"][records["pose"] == 1].mean()``.
+    """
+
+    def __init__(self, directory: Path, name: str) -> None:
+        """:raises FileNotFoundError, ValueError: if it is missing or invalid."""
+        self.name = name
+        self.path, self.index_path = recording_paths(directory, name)
+        index = json.loads(self.index_path.read_text())
+        self.session_id: str = index["session_id"]
+        self.started_at: str = index["started_at"]
+        self.poses: List[str] = index["poses"]
+        frame_size = index["frame_size"]
+        self.frame_size: Tuple[int, int] | None = (
+            (frame_size[0], frame_size[1]) if frame_size else None
+        )
+
+        with self.path.open("rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{self.path} is not a recording.")
+        magic, version, record_size = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{self.path} is not a version {_VERSION} recording.")
+        if record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{self.path} has records of {record_size} bytes.")
+
+        count = (self.path.stat().st_size - _HEADER.size) // record_size
+        self.records: np.ndarray = (
+            np.memmap(
+                self.path,
+                dtype=RECORD_DTYPE,
+                mode="r",
+                offset=_HEADER.size,
+                shape=(count,),
+            )
+            if count
+            else np.zeros(0, dtype=RECORD_DTYPE)
+        )
+        timestamps = self.records["timestamp_ms"]
+        # First record of each frame, plus the end
+        self.__frame_starts = (
+            np.concatenate(
+                ([0], np.flatnonzero(timestamps[1:] != timestamps[:-1]) + 1, [count]),
+            )
+            if count
+            else np.zeros(1, dtype=np.intp)
+        )
+
+    def __len__(self) -> int:
+        """Number of frames."""
+        return len(self.__frame_starts) - 1
+
+    @property
+    def duration_ms(self) -> int:
+        if len(self.records) == 0:
+            return 0
+        timestamps = self.records["timestamp_ms"]
+        return int(timestamps[-1] - timestamps[0])
+
+    def frame(self, index: int) -> ReplayFrame:
+        start, end = self.__frame_starts[index], self.__frame_starts[index + 1]
+        rows = self.records[start:end]
+        people = int(rows["people"][0])
+        return ReplayFrame(
+            timestamp_ms=int(rows["timestamp_ms"][0]),
+            pose=self.poses[rows["pose"][0]],
+            landmarks=np.array(rows["landmarks"][:people]),
+        )
+
+    def info(self) -> Dict[str, Any]:
+        # Frames without anyone are neither right nor wrong.
+        is_wrong = self.records["is_wrong"][self.records["people"] > 0]
+        return {
+            "name": self.name,
+            "session_id": self.session_id,
+            "started_at": self.started_at,
+            "frames": len(self),
+            "duration_ms": self.duration_ms,
+            # Share of detected people, per frame, whose pose was wrong
+            "wrong_person_ratio": float(is_wrong.mean()) if len(is_wrong) else 0.0,
+        }
+
+
+class RecordingPlayer:
+    """
+    Hands out the frames of a recording on their original schedule.
+
+    Loops forever; every pass starts at the time of its first ``next``.
+    """
+
+    def __init__(
+        self,
+        recording: Recording,
+        speed: float = 1.0,
+        pose: str | None = None,
+    ) -> None:
+        """
+        Prepares ``recording`` for playback.
+
+        :param speed: playback rate, 2.0 plays twice as fast.
+        :param pose: re-score every frame against this pose instead of the
+            one that was active while recording.
+        """
+        if len(recording) == 0:
+            raise ValueError(f"Recording {recording.name} is empty.")
+        self.recording = recording
+        self.speed = speed
+        self.pose = pose
+        self.__index = 0
+        self.__started_ms = 0
+        self.__first_ms = recording.frame(0).timestamp_ms
+
+    def next(self, now_ms: int) -> Tuple[int, ReplayFrame]:
+        """:return: when the frame is due (monotonic ms) and the frame."""
+        if self.__index == 0:
+            self.__started_ms = now_ms
+        frame = self.recording.frame(self.__index)
+        self.__index = (self.__index + 1) % len(self.recording)
+        due_ms = self.__started_ms + (frame.timestamp_ms - self.__first_ms) / self.speed
+        return round(due_ms), frame
@@ -0,0 +1,156 @@
+from typing import List, NamedTuple, Tuple
+
+import cv2
+import numpy as np
+
+# A landmark counts towards the body's box from this visibility on
+_MIN_VISIBILITY = 0.5
+# A person with fewer visible landmarks is not tracked
+_MIN_VISIBLE_LANDMARKS = 8
+# Crops are at least this fraction of the frame's shorter side
+_MIN_SIZE = 0.25
+# A crop is kept while the body stays this fraction of the padding inside it
+_EDGE_MARGIN = 0.5
+# and the crop it needs keeps at least this fraction of the kept one's area
+_SHRINK_RATIO = 0.5
+
+
+def _span(start: float, end: float, min_length: float, limit: int) -> Tuple[int, int]:
+    """Widens [start, end) to ``min_length`` and moves it inside [0, limit)."""
+    grow = max(min_length - (end - start), 0) / 2
+    start, end = start - grow, end + grow
+    shift = max(-start, 0) - max(end - limit, 0)
+    return max(0, int(start + shift)), min(limit, int(np.ceil(end + shift)))
+
+
+class Roi(NamedTuple):
+    """Region of a frame, in pixels, that inference ran on."""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        return frame[self.y : self.y + self.height, self.x : self.x + self.width]
+
+    def contains(self, box: Tuple[float, float, float, float], margin: float) -> bool:
+        """Whether the (x0, y0, x1, y1) pixel box lies ``margin`` inside."""
+        x0, y0, x1, y1 = box
+        return (
+            x0 - margin >= self.x
+            and y0 - margin >= self.y
+            and x1 + margin <= self.x + self.width
+            and y1 + margin <= self.y + self.height
+        )
+
+    def to_frame(self, people: List[np.ndarray], frame_size: Tuple[int, int]) -> None:
+        """Maps landmarks normalized to the crop to the full frame, in place."""
+        frame_w, frame_h = frame_size
+        for landmarks in people:
+            landmarks[:, 0] = (landmarks[:, 0] * self.width + self.x) / frame_w
+            landmarks[:, 1] = (landmarks[:, 1] * self.height + self.y) / frame_h
+            # z is on the same scale as x.
+            landmarks[:, 2] *= self.width / frame_w
+
+    def paste_mask(self, mask: np.ndarray, frame_size: Tuple[int, int]) -> np.ndarray:
+        """:return: a full-frame mask, empty outside the crop."""
+        frame_w, frame_h = frame_size
+        full = np.zeros((frame_h, frame_w), dtype=mask.dtype)
+        region = self.crop(full)
+        region[:] = (
+            mask
+            if mask.shape[:2] == region.shape
+            else cv2.resize(mask, (self.width, self.height))
+        )
+        return full
+
+
+class RoiTracker:
+    """
+    Picks the part of the next frame to run inference on.
+
+    The box around everyone visible in the last result, padded by
+    ``padding`` times its longer side on every side, so the landmarker
+    gets a larger, better framed person for fewer pixels. Falls back to the
+    full frame when nobody was found, and every ``refresh_interval``
+    submissions while fewer than ``num_poses`` people are tracked, so
+    someone stepping onto the mat is still picked up. Boxes covering more
+    than ``max_area`` of the frame are not worth cropping.
+
+    A crop is held while the body stays clear of its edges and does not
+    shrink to much less of it, since the landmarker's output jitters with
+    every change of its input framing.
+    """
+
+    def __init__(
+        self,
+        num_poses: int = 1,
+        padding: float = 0.25,
+        refresh_interval: int = 30,
+        max_area: float = 0.8,
+    ) -> None:
+        self.num_poses = num_poses
+        self.padding = padding
+        self.refresh_interval = refresh_interval
+        self.max_area = max_area
+        # (x0, y0, x1, y1) normalized to the frame, None for the full frame
+        self.__box: Tuple[float, float, float, float] | None = None
+        # Crop handed out last and the frame size it was made for
+        self.__held: Tuple[Roi, Tuple[int, int]] | None = None
+        self.__tracked = 0
+        self.__submissions = 0
+
+    def next_roi(self, frame_size: Tuple[int, int]) -> Roi | None:
+        """:return: the crop for the next submission, None for the full frame."""
+        self.__submissions += 1
+        box = self.__box
+        if box is None or (
+            self.__tracked < self.num_poses
+            and self.__submissions % self.refresh_interval == 0
+        ):
+            self.__held = None
+            return None
+
+        frame_w, frame_h = frame_size
+        x0, y0, x1, y1 = box
+        pad = self.padding * max((x1 - x0) * frame_w, (y1 - y0) * frame_h)
+        min_length = _MIN_SIZE * min(frame_w, frame_h)
+        left, right = _span(x0 * frame_w - pad, x1 * frame_w + pad, min_length, frame_w)
+        top, bottom = _span(y0 * frame_h - pad, y1 * frame_h + pad, min_length, frame_h)
+        width, height = right - left, bottom - top
+        if width * height > self.max_area * frame_w * frame_h:
+            self.__held = None
+            return None
+
+        if self.__held is not None:
+            held, held_frame_size = self.__held
+            body = (x0 * frame_w, y0 * frame_h, x1 * frame_w, y1 * frame_h)
+            if (
+                held_frame_size == frame_size
+                and held.contains(body, _EDGE_MARGIN * pad)
+                and width * height >= _SHRINK_RATIO * held.width * held.height
+            ):
+                return held
+        roi = Roi(left, top, width, height)
+        self.__held = (roi, frame_size)
+        return roi
+
+    def update(self, people: List[np.ndarray]) -> None:
+        """Tracks the people of a result, in full-frame coordinates."""
+        boxes = []
+        for landmarks in people:
+            visible = landmarks[landmarks[:, 3] >= _MIN_VISIBILITY, :2]
+            if len(visible) >= _MIN_VISIBLE_LANDMARKS:
+                boxes.append((*visible.min(axis=0), *visible.max(axis=0)))
+        self.__tracked = len(boxes)
+        if not boxes:
+            self.__box = None
+            return
+        x0, y0, x1, y1 = np.array(boxes).T
+        self.__box = (
+            max(float(x0.min()), 0.0),
+            max(float(y0.min()), 0.0),
+            min(float(x1.max()), 1.0),
+            min(float(y1.max()), 1.0),
+        )
@@ -0,0 +1,139 @@
+import time
+from pathlib import Path
+from typing import List, NamedTuple
+
+from loguru import logger
+
+# Cheapest first
+MODEL_VARIANTS = ("lite", "full", "heavy")
+# (scale, stride) steps tried for each model, best quality first
+_SCALE_STRIDE_STEPS = ((1.0, 1), (0.75, 1), (0.5, 1), (0.5, 2), (0.5, 3))
+
+
+class InferenceLevel(NamedTuple):
+    model_asset_path: str
+    # Inference input size relative to the captured frame
+    scale: float
+    # Submit every n-th captured frame
+    stride: int
+
+
+def model_variant_path(model_asset_path: str, variant: str) -> Path:
+    """Maps models/pose_landmarker_full.task to pose_landmarker_<variant>.task."""
+    path = Path(model_asset_path)
+    stem = path.stem
+    for known in MODEL_VARIANTS:
+        if stem.endswith(f"_{known}"):
+            stem = stem[: -len(known)] + variant
+            break
+    return path.with_name(f"{stem}{path.suffix}")
+
+
+def build_levels(
+    model_asset_path: str,
+    switch_models: bool = True,
+) -> List[InferenceLevel]:
+    """
+    Orders every available (model, scale, stride) from best to cheapest.
+
+    Heavier models are only tried at full resolution; once the cheapest
+    model is reached, resolution and then stride are reduced.
+    """
+    available = [
+        str(model_variant_path(model_asset_path, variant))
+        for variant in reversed(MODEL_VARIANTS)
+        if switch_models and model_variant_path(model_asset_path, variant).exists()
+    ] or [model_asset_path]
+
+    levels = [InferenceLevel(model, 1.0, 1) for model in available[:-1]]
+    levels.extend(
+        InferenceLevel(available[-1], scale, stride)
+        for scale, stride in _SCALE_STRIDE_STEPS
+    )
+    return levels
+
+
+class AdaptiveInferenceScheduler:
+    """
+    Trades inference quality for speed to hold a target callback latency.
+
+    The detector reports every submission and every result. Once per
+    ``decision_interval`` the scheduler looks at the smoothed
+    submit-to-callback latency and at how many submitted frames MediaPipe
+    dropped, and moves one level cheaper when overloaded or one level
+    better when there is plenty of headroom.
+    """
+
+    def __init__(
+        self,
+        model_asset_path: str,
+        target_latency_ms: float,
+        decision_interval: float = 2.0,
+        latency_smoothing: float = 0.1,
+        switch_models: bool = True,
+    ) -> None:
+        self.levels = build_levels(model_asset_path, switch_models)
+        self.target_latency_ms = target_latency_ms
+        self.decision_interval = decision_interval
+        self.__latency_smoothing = latency_smoothing
+        self.__index = next(
+            (
+                i
+                for i, level in enumerate(self.levels)
+                if level.model_asset_path == model_asset_path
+            ),
+            0,
+        )
+        self.latency_ms = 0.0
+        self.__frame_count = 0
+        self.__submitted = 0
+        self.__received = 0
+        self.__last_decision = time.monotonic()
+
+    @property
+    def level(self) -> InferenceLevel:
+        return self.levels[self.__index]
+
+    def should_submit(self) -> bool:
+        self.__frame_count += 1
+        return self.__frame_count % self.level.stride == 0
+
+    def record_submit(self) -> None:
+        self.__submitted += 1
+
+    def record_result(self, latency_ms: float) -> None:
+        self.__received += 1
+        if self.latency_ms == 0:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += self.__latency_smoothing * (latency_ms - self.latency_ms)
+
+    def update(self) -> InferenceLevel | None:
+        """
+        Re-evaluates the level if the decision interval has passed.
+
+        :return: the new level if it changed, else ``None``.
+        """
+        now = time.monotonic()
+        if now - self.__last_decision < self.decision_interval or not self.__submitted:
+            return None
+
+        drop_ratio = max(0.0, 1 - self.__received / self.__submitted)
+        self.__submitted = 0
+        self.__received = 0
+        self.__last_decision = now
+
+        index = self.__index
+        if self.latency_ms > self.target_latency_ms or drop_ratio > 0.2:
+            index = min(index + 1, len(self.levels) - 1)
+        elif self.latency_ms < self.target_latency_ms / 2 and drop_ratio < 0.02:
+            index = max(index - 1, 0)
+        if index == self.__index:
+            return None
+
+        self.__index = index
+        logger.info(
+            f"Inference level -> {self.level} "
+            f"(latency {self.latency_ms:.0f} ms, dropped {drop_ratio:.0%})",
+        )
+        return self.level
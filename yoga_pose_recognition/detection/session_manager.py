@@ -0,0 +1,152 @@
+import threading
+from typing import Dict, List, Set
+
+from loguru import logger
+
+from yoga_pose_recognition.data_store import BACKGROUND, POSE, DataStore
+from yoga_pose_recognition.detection.recording import RecordingPlayer
+from yoga_pose_recognition.detection.utils.background_cache import BackgroundCache
+from yoga_pose_recognition.detection.utils.camera import DEFAULT_RESOLUTION
+from yoga_pose_recognition.detection.utils.drawing_utils import DrawingUtils
+from yoga_pose_recognition.detection.yoga_pose_detector import YogaPoseDetector
+from yoga_pose_recognition.settings import settings
+
+DEFAULT_SESSION_ID = "default"
+
+
+class SessionManager:
+    """
+    Independent detector pipelines addressed by session id.
+
+    Every session has its own camera, landmarker, pose target and
+    background, and runs its own capture/inference/encode threads. Pose data
+    and decoded backgrounds are loaded once and shared, and ``max_sessions``
+    bounds how many pipelines (three threads plus a MediaPipe graph each)
+    the box runs.
+    """
+
+    def __init__(
+        self,
+        data_store: DataStore | None = None,
+        max_sessions: int = settings.max_sessions,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.__drawing_utils = DrawingUtils(data_store)
+        self.__drawing_utils.data_store.add_listener(self.__on_data_reloaded)
+        self.__background_cache = BackgroundCache()
+        self.__preload_backgrounds()
+        self.__sessions: Dict[str, YogaPoseDetector] = {}
+        # Ids of sessions whose camera and model are still being opened
+        self.__reserved: Set[str] = set()
+        self.__lock = threading.Lock()
+        self.__closed = False
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.__sessions
+
+    @property
+    def sessions(self) -> Dict[str, YogaPoseDetector]:
+        return dict(self.__sessions)
+
+    def create(
+        self,
+        session_id: str,
+        camera_source: int | str = 0,
+        num_poses: int = 1,
+        replay: RecordingPlayer | None = None,
+    ) -> YogaPoseDetector:
+        """
+        Opens the camera and landmarker of a new session.
+
+        With ``replay`` the session plays a recording instead. Opening a
+        camera and loading the model take a while, so only the id is
+        reserved under the lock and other sessions are not held up.
+
+        :raises ValueError: if the id is taken, ``max_sessions`` is reached or
+            the manager was closed.
+        """
+        with self.__lock:
+            if self.__closed:
+                raise ValueError("Sessions are shutting down.")
+            if session_id in self.__sessions or session_id in self.__reserved:
+                raise ValueError(f"Session {session_id} already exists.")
+            if len(self.__sessions) + len(self.__reserved) >= self.max_sessions:
+                raise ValueError(
+                    f"At most {self.max_sessions} sessions can run at once.",
+                )
+            self.__reserved.add(session_id)
+        try:
+            detector = YogaPoseDetector(
+                session_id=session_id,
+                camera_source=camera_source,
+                num_poses=num_poses,
+                drawing_utils=self.__drawing_utils,
+                background_cache=self.__background_cache,
+                replay=replay,
+            )
+        except BaseException:
+            with self.__lock:
+                self.__reserved.discard(session_id)
+            raise
+        with self.__lock:
+            self.__reserved.discard(session_id)
+            closed = self.__closed
+            if not closed:
+                self.__sessions[session_id] = detector
+        if closed:
+            # Closed while the camera and model were being opened.
+            detector.close()
+            raise ValueError("Sessions are shutting down.")
+        source = (
+            f"recording {replay.recording.name}"
+            if replay is not None
+            else f"camera {camera_source}"
+        )
+        logger.info(f"Session {session_id} created on {source}.")
+        return detector
+
+    def get(self, session_id: str) -> YogaPoseDetector:
+        """:raises KeyError: if there is no such session."""
+        try:
+            return self.__sessions[session_id]
+        except KeyError:
+            raise KeyError(f"Session {session_id} not found.") from None
+
+    def remove(self, session_id: str) -> None:
+        """:raises KeyError: if there is no such session."""
+        with self.__lock:
+            detector = self.__sessions.pop(session_id, None)
+        if detector is None:
+            raise KeyError(f"Session {session_id} not found.")
+        detector.close()
+        logger.info(f"Session {session_id} removed.")
+
+    def __preload_backgrounds(self) -> None:
+        # Cameras usually deliver the requested size, others are fitted lazily.
+        document = self.__drawing_utils.data_store.document(BACKGROUND)
+        self.__background_cache.preload(
+            (background.path for background in document.data.backgrounds),
+            DEFAULT_RESOLUTION,
+        )
+
+    def __on_data_reloaded(self, changed: List[str]) -> None:
+        if BACKGROUND in changed:
+            self.__preload_backgrounds()
+        if POSE not in changed:
+            return
+        pose_data = self.__drawing_utils.pose_data
+        for session_id, detector in self.sessions.items():
+            if detector.current_pose not in pose_data:
+                logger.warning(
+                    f"Pose {detector.current_pose} of session {session_id} was "
+                    "removed from pose data.",
+                )
+                detector.current_pose = "no_pose"
+
+    def close(self) -> None:
+        """Removes every session; no new ones can be created afterwards."""
+        with self.__lock:
+            self.__closed = True
+        for session_id in list(self.__sessions):
+            self.remove(session_id)
+        self.__background_cache.close()
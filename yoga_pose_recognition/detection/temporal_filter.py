@@ -0,0 +1,184 @@
+import math
+from typing import Callable, List, Set, Tuple
+
+import numpy as np
+
+from yoga_pose_recognition.detection.pose_rules import CompiledPose
+
+# A gap this long (person left the frame, stream paused) restarts the filter
+# instead of smoothing across it.
+RESET_GAP_MS = 500
+# Shoulders and hips, whose mean follows a person from frame to frame
+_TORSO = [11, 12, 23, 24]
+# A torso that moved further than this (normalized) between two results is
+# someone else, or a misdetection, and starts with a fresh filter.
+MAX_TORSO_JUMP = 0.15
+
+
+def _smoothing_factor(cutoff: np.ndarray | float, dt: float) -> np.ndarray | float:
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """
+    One Euro filter over a whole array of coordinates at once.
+
+    Slow movement is smoothed heavily (``min_cutoff``) while fast movement
+    raises the cutoff through ``beta`` so the skeleton does not lag behind.
+    Only the previous value and derivative are kept, so each update is O(1)
+    in the length of the history.
+    """
+
+    def __init__(
+        self,
+        shape: Tuple[int, ...],
+        min_cutoff: float,
+        beta: float,
+        d_cutoff: float = 1.0,
+    ) -> None:
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.__value = np.zeros(shape, dtype=np.float32)
+        self.__derivative = np.zeros(shape, dtype=np.float32)
+        self.__last_ms: int | None = None
+
+    def reset(self) -> None:
+        self.__last_ms = None
+
+    def __call__(self, value: np.ndarray, timestamp_ms: int) -> np.ndarray:
+        if (
+            self.__last_ms is None
+            or timestamp_ms <= self.__last_ms
+            or timestamp_ms - self.__last_ms > RESET_GAP_MS
+        ):
+            self.__value[:] = value
+            self.__derivative[:] = 0
+            self.__last_ms = timestamp_ms
+            return self.__value
+
+        dt = (timestamp_ms - self.__last_ms) / 1000
+        self.__last_ms = timestamp_ms
+
+        derivative = (value - self.__value) / dt
+        self.__derivative += _smoothing_factor(self.d_cutoff, dt) * (
+            derivative - self.__derivative
+        )
+        cutoff = self.min_cutoff + self.beta * np.abs(self.__derivative)
+        self.__value += _smoothing_factor(cutoff, dt) * (value - self.__value)
+        return self.__value
+
+
+class TemporalPoseFilter:
+    """
+    Stateful stage between the landmarker result and pose scoring.
+
+    Landmarks are smoothed with a One Euro filter, and each angle verdict
+    goes through enter/exit hysteresis (see ``CompiledPose.judge``). The
+    verdicts start over when the target pose changes or its template is
+    reloaded.
+    """
+
+    def __init__(
+        self,
+        num_landmarks: int,
+        min_cutoff: float,
+        beta: float,
+        smooth_landmarks: bool = True,
+    ) -> None:
+        self.__landmark_filter = OneEuroFilter((num_landmarks, 3), min_cutoff, beta)
+        self.__smooth_landmarks = smooth_landmarks
+        self.__compiled_pose: CompiledPose | None = None
+        self.__is_correct: np.ndarray | None = None
+        self.__side = 0
+
+    def reset(self) -> None:
+        self.__landmark_filter.reset()
+        self.__compiled_pose = None
+        self.__is_correct = None
+        self.__side = 0
+
+    def smooth(self, landmarks: np.ndarray, timestamp_ms: int) -> None:
+        """Smooths ``landmarks`` in place, before they are classified or scored."""
+        if self.__smooth_landmarks:
+            landmarks[:, :3] = self.__landmark_filter(landmarks[:, :3], timestamp_ms)
+
+    def update(
+        self,
+        compiled_pose: CompiledPose,
+        landmarks: np.ndarray,
+        side: int | None = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores smoothed ``landmarks``.
+
+        :param side: side of a mirror pose to judge, the better one if None.
+        :return: measured angles and a ``ConnectionStatus`` code per connection.
+        """
+        measurement = compiled_pose.measure(landmarks, side)
+        angles = measurement.angles
+        # A reloaded template is a new object and may have other rules.
+        if compiled_pose is not self.__compiled_pose:
+            self.__compiled_pose = compiled_pose
+            self.__is_correct = None
+        if measurement.side != self.__side:
+            # Switched to the mirrored side, whose verdicts start over.
+            self.__side = measurement.side
+            self.__is_correct = None
+
+        self.__is_correct = compiled_pose.judge(angles, self.__is_correct)
+        return angles, compiled_pose.connection_status(self.__is_correct, measurement)
+
+
+class PersonFilters:
+    """
+    A ``TemporalPoseFilter`` per person, following people across results.
+
+    The landmarker does not keep people in the same order, so every result
+    is matched to the filters by torso centre, closest pair first. People
+    without a match within ``max_jump`` get a reset filter, either a free
+    one or a new one from ``create_filter``.
+    """
+
+    def __init__(
+        self,
+        create_filter: Callable[[], TemporalPoseFilter],
+        max_jump: float = MAX_TORSO_JUMP,
+    ) -> None:
+        self.__create_filter = create_filter
+        self.max_jump = max_jump
+        self.__filters: List[TemporalPoseFilter] = []
+        self.__centroids: List[np.ndarray] = []
+
+    def match(self, people: List[np.ndarray]) -> List[TemporalPoseFilter]:
+        """:return: the filter of each person, in the order of ``people``."""
+        centroids = [landmarks[_TORSO, :2].mean(axis=0) for landmarks in people]
+        pairs = sorted(
+            (float(np.linalg.norm(centroid - tracked)), person, index)
+            for person, centroid in enumerate(centroids)
+            for index, tracked in enumerate(self.__centroids)
+        )
+        assigned: List[int | None] = [None] * len(people)
+        taken: Set[int] = set()
+        for distance, person, index in pairs:
+            if distance > self.max_jump:
+                break
+            if assigned[person] is None and index not in taken:
+                assigned[person] = index
+                taken.add(index)
+
+        free = [i for i in range(len(self.__filters)) if i not in taken]
+        filters = []
+        for person, centroid in enumerate(centroids):
+            index = assigned[person]
+            if index is None and free:
+                index = free.pop(0)
+                self.__filters[index].reset()
+            elif index is None:
+                index = len(self.__filters)
+                self.__filters.append(self.__create_filter())
+                self.__centroids.append(centroid)
+            self.__centroids[index] = centroid
+            filters.append(self.__filters[index])
+        return filters
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from yoga_pose_recognition.settings import settings
+
+# Image path, its mtime in ns and the output width and height
+_Key = Tuple[str, int, Tuple[int, int]]
+
+
+def letterbox(image: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """Scales ``image`` to fit ``size`` (width, height) and pads it with black."""
+    target_w, target_h = size
+    h, w = image.shape[:2]
+    scale = min(target_w / w, target_h / h)
+    new_w = max(1, min(target_w, round(w * scale)))
+    new_h = max(1, min(target_h, round(h * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    resized = cv2.resize(image, (new_w, new_h), interpolation=interpolation)
+
+    top = (target_h - new_h) // 2
+    left = (target_w - new_w) // 2
+    return cv2.copyMakeBorder(
+        resized,
+        top,
+        target_h - new_h - top,
+        left,
+        target_w - new_w - left,
+        cv2.BORDER_CONSTANT,
+        value=(0, 0, 0),
+    )
+
+
+def _load(path: str, size: Tuple[int, int]) -> np.ndarray:
+    image = cv2.imread(path)
+    if image is None:
+        raise FileNotFoundError(f"Image not found: {path}")
+    background = letterbox(image, size)
+    # Shared by every session that shows it
+    background.flags.writeable = False
+    return background
+
+
+class BackgroundCache:
+    """
+    Decoded and letterboxed background images, shared by all sessions.
+
+    Entries are keyed by path, file mtime and output size, so an edited
+    image or a camera with another resolution gets a new entry. Decoding
+    runs in a small thread pool; concurrent requests for the same key share
+    one future. Least recently used entries are evicted once the cache holds
+    more than ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = settings.background_cache_mb * 1024 * 1024,
+        max_workers: int = 2,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.__executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="yoga-background",
+        )
+        self.__entries: OrderedDict[_Key, np.ndarray] = OrderedDict()
+        self.__loading: Dict[_Key, Future[np.ndarray]] = {}
+        self.__size_bytes = 0
+        # Reentrant: a future that is already done runs its callback at once
+        self.__lock = threading.RLock()
+
+    @property
+    def size_bytes(self) -> int:
+        return self.__size_bytes
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, path: str, size: Tuple[int, int]) -> Future[np.ndarray]:
+        """
+        Background of ``path`` letterboxed to ``size`` (width, height).
+
+        :raises FileNotFoundError: if the file does not exist. An image that
+            cannot be decoded fails the returned future the same way.
+        """
+        key = (path, Path(path).stat().st_mtime_ns, size)
+        with self.__lock:
+            background = self.__entries.get(key)
+            if background is not None:
+                self.__entries.move_to_end(key)
+                future: Future[np.ndarray] = Future()
+                future.set_result(background)
+                return future
+            future = self.__loading.get(key)
+            if future is None:
+                future = self.__executor.submit(_load, path, size)
+                self.__loading[key] = future
+                future.add_done_callback(lambda f: self.__on_loaded(key, f))
+            return future
+
+    async def load(self, path: str, size: Tuple[int, int]) -> np.ndarray:
+        """Like ``get``, without blocking the event loop while decoding."""
+        return await asyncio.wrap_future(self.get(path, size))
+
+    def preload(self, paths: Iterable[str], size: Tuple[int, int]) -> None:
+        """Starts decoding ``paths`` in the background, skipping missing files."""
+        for path in paths:
+            try:
+                self.get(path, size)
+            except OSError as e:
+                logger.warning(f"Cannot preload background {path}: {e}")
+
+    def __on_loaded(self, key: _Key, future: Future[np.ndarray]) -> None:
+        with self.__lock:
+            self.__loading.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            background = future.result()
+            self.__entries[key] = background
+            self.__size_bytes += background.nbytes
+            # The newest entry is kept even if it alone exceeds the budget.
+            while self.__size_bytes > self.max_bytes and len(self.__entries) > 1:
+                _, evicted = self.__entries.popitem(last=False)
+                self.__size_bytes -= evicted.nbytes
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=False, cancel_futures=True)
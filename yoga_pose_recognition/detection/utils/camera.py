@@ -1,37 +1,332 @@
+"""
+Frame sources of a session.
+
+Every source runs a grabber thread that keeps only the newest frame, so a
+slow pipeline never works through a backlog of stale frames. ``get_frame``
+waits for a frame newer than the last one it returned. Frames are written
+into a ring of reused buffers, so a returned frame stays valid until
+``RING_SIZE`` newer frames were grabbed.
+"""
+
+import re
 import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Protocol, Tuple
 
 import cv2
 import numpy as np
 from loguru import logger
 
+from yoga_pose_recognition.detection.utils.pipeline import FpsCounter, LatestFrameSlot
+from yoga_pose_recognition.settings import settings
+
+# Requested capture size, the camera may deliver another one
+DEFAULT_RESOLUTION = (1280, 720)
+# About a quarter second at 30 fps; inference copies the frames it holds on to
+RING_SIZE = 8
+# How long get_frame waits before reporting that there is no frame
+FRAME_TIMEOUT_S = 1.0
+# Wait after a failed grab, doubled while the source stays down
+RETRY_DELAY_S = 0.1
+MAX_RETRY_DELAY_S = 2.0
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+_SYNTHETIC = re.compile(r"^synthetic(?::(\d+)x(\d+))?(?:@(\d+(?:\.\d+)?))?$")
+
+
+class FrameSource(Protocol):
+    fps: float
+    dropped: int
+
+    def get_frame(self) -> np.ndarray: ...
+
+    def release(self) -> None: ...
+
+
+class _Pacer:
+    """Sleeps until the next tick of a fixed frame rate."""
+
+    def __init__(self, fps: float) -> None:
+        self.interval = 1 / fps
+        self.__next = time.monotonic()
+
+    def wait(self) -> None:
+        delay = self.__next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        # Fell behind by more than a frame: restart instead of bursting.
+        self.__next = max(self.__next + self.interval, time.monotonic())
 
-class Camera:
 
-    def __init__(self, id: int = 0) -> None:
+class ThreadedSource(ABC):
+    """
+    Runs ``_grab`` on a background thread and hands out the newest frame.
+
+    The thread starts on the first ``get_frame``, so an idle session does
+    not decode frames nobody looks at. Failed grabs are retried with a
+    growing delay, so a source that is gone does not keep a core busy.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.__frames: LatestFrameSlot[np.ndarray] = LatestFrameSlot()
+        self.__read_sequence = 0
+        self.__ring: List[np.ndarray | None] = [None] * RING_SIZE
+        self.__fps = FpsCounter()
+        self.__stop_event = threading.Event()
+        self.__thread: threading.Thread | None = None
+        self.__start_lock = threading.Lock()
+
+    @property
+    def fps(self) -> float:
+        """Frames per second actually grabbed."""
+        return self.__fps.fps
+
+    @property
+    def dropped(self) -> int:
+        """Frames grabbed but replaced before anyone read them."""
+        return self.__frames.dropped
+
+    def get_frame(self) -> np.ndarray:
+        """:return: the next frame, or an empty array if none arrived in time."""
+        self.__start()
+        item = self.__frames.get(self.__read_sequence, timeout=FRAME_TIMEOUT_S)
+        if item is None:
+            return np.array([])
+        self.__read_sequence, frame = item
+        return frame
+
+    def __start(self) -> None:
+        with self.__start_lock:
+            if self.__thread is not None or self.__stop_event.is_set():
+                return
+            self.__thread = threading.Thread(
+                target=self.__run,
+                name=f"yoga-grab-{self.name}",
+                daemon=True,
+            )
+            self.__thread.start()
+
+    def __run(self) -> None:
+        index = 0
+        retry_delay = RETRY_DELAY_S
+        while not self.__stop_event.is_set():
+            try:
+                frame = self._grab(self.__ring[index])
+            except Exception:
+                logger.exception(f"Grabbing from {self.name} failed.")
+                frame = None
+            if frame is None:
+                self.__stop_event.wait(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY_S)
+                continue
+            retry_delay = RETRY_DELAY_S
+            self.__ring[index] = frame
+            index = (index + 1) % RING_SIZE
+            self.__fps.tick()
+            self.__frames.put(frame)
+
+    @abstractmethod
+    def _grab(self, out: np.ndarray | None) -> np.ndarray | None:
+        """
+        Produces the next frame, written into ``out`` if it has the right shape.
+
+        :return: the frame, or None if there was none (retried shortly).
+        """
+
+    def _close(self) -> None:
+        """Frees what the source opened, once the grabber thread stopped."""
+        return
+
+    def release(self) -> None:
+        self.__stop_event.set()
+        with self.__start_lock:
+            if self.__thread is not None:
+                self.__thread.join(timeout=2)
+        self._close()
 
-        self.cam = self.__init_cam(id)
-        self.lock = threading.Lock()
 
-    def __init_cam(self, id: int) -> cv2.VideoCapture:
+class Camera(ThreadedSource):
+    """
+    A camera index or stream URL opened with OpenCV.
+
+    The driver queue is kept at ``buffer_size`` frames so a read never
+    returns a stale frame, and MJPEG is requested by default since most USB
+    cameras cannot deliver 720p30 uncompressed. Frames from a local camera
+    are mirrored, like looking into a mirror, into the ring buffer in place
+    of allocating a new array per frame.
+    """
+
+    def __init__(
+        self,
+        id: int | str = 0,
+        resolution: Tuple[int, int] = DEFAULT_RESOLUTION,
+        fourcc: str = settings.camera_fourcc,
+        buffer_size: int = settings.camera_buffer_size,
+    ) -> None:
+        super().__init__(f"camera-{id}")
+        self.mirror = isinstance(id, int)
+        self.__raw: np.ndarray | None = None
+        # Reads are failing, logged once until the camera comes back
+        self.__disconnected = False
+        self.cam = self.__init_cam(id, resolution, fourcc, buffer_size)
+
+    def __init_cam(
+        self,
+        id: int | str,
+        resolution: Tuple[int, int],
+        fourcc: str,
+        buffer_size: int,
+    ) -> cv2.VideoCapture:
         cam = cv2.VideoCapture(id)
+        # V4L2 only accepts a pixel format before the size is set.
+        if fourcc:
+            cam.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc(*fourcc))
+        cam.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
         cam.set(cv2.CAP_PROP_AUTOFOCUS, 1)
         cam.set(cv2.CAP_PROP_FOCUS, 360)
         cam.set(cv2.CAP_PROP_BRIGHTNESS, 130)
         cam.set(cv2.CAP_PROP_SHARPNESS, 125)
-        cam.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cam.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        cam.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+        cam.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
         return cam
 
-    def get_frame(self) -> cv2.typing.MatLike:
-        with self.lock:
-            ret, frame = self.cam.read()
-            if not ret:
-                logger.error("Failed to read frame from camera.")
-                return np.array([])
+    def _grab(self, out: np.ndarray | None) -> np.ndarray | None:
+        target = self.__raw if self.mirror else out
+        ret, frame = self.cam.read(target)
+        if not ret:
+            if not self.__disconnected:
+                self.__disconnected = True
+                logger.error(f"Failed to read frame from {self.name}, retrying.")
+            return None
+        if self.__disconnected:
+            self.__disconnected = False
+            logger.info(f"Reading from {self.name} again.")
+        if not self.mirror:
+            return frame
+        self.__raw = frame
+        if out is None or out.shape != frame.shape:
+            out = np.empty_like(frame)
+        return cv2.flip(frame, 1, dst=out)
 
-            return cv2.flip(frame, 1)
+    def _close(self) -> None:
+        if self.cam.isOpened():
+            self.cam.release()
 
-    def release(self) -> None:
-        with self.lock:
-            if self.cam.isOpened():
-                self.cam.release()
+
+class VideoFileSource(ThreadedSource):
+    """A video file played in a loop at its own frame rate."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(Path(path).name)
+        self.cam = cv2.VideoCapture(path)
+        if not self.cam.isOpened():
+            raise FileNotFoundError(f"Cannot open video {path}")
+        self.__pacer = _Pacer(self.cam.get(cv2.CAP_PROP_FPS) or 30.0)
+
+    def _grab(self, out: np.ndarray | None) -> np.ndarray | None:
+        self.__pacer.wait()
+        ret, frame = self.cam.read(out)
+        if not ret:
+            # End of file, start over.
+            self.cam.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cam.read(out)
+        return frame if ret else None
+
+    def _close(self) -> None:
+        self.cam.release()
+
+
+class ImageSequenceSource(ThreadedSource):
+    """Still images shown one per frame in a loop, e.g. extracted frames."""
+
+    def __init__(self, paths: List[Path], fps: float = 30.0) -> None:
+        if not paths:
+            raise FileNotFoundError("No images in the image sequence.")
+        super().__init__(paths[0].parent.name or "images")
+        self.paths = paths
+        self.__index = 0
+        self.__pacer = _Pacer(fps)
+
+    def _grab(self, out: np.ndarray | None) -> np.ndarray | None:
+        self.__pacer.wait()
+        path = self.paths[self.__index]
+        self.__index = (self.__index + 1) % len(self.paths)
+        image = cv2.imread(str(path))
+        if image is None:
+            logger.error(f"Cannot read image {path}")
+            return None
+        if out is None or out.shape != image.shape:
+            return image
+        # imread has no destination, copy so the ring keeps its buffers.
+        np.copyto(out, image)
+        return out
+
+
+class SyntheticSource(ThreadedSource):
+    """
+    Generated frames for running the pipeline without any camera.
+
+    A gradient with a moving block, drawn into the ring buffers without
+    allocating, so the source itself costs almost nothing in load tests.
+    """
+
+    def __init__(
+        self,
+        resolution: Tuple[int, int] = DEFAULT_RESOLUTION,
+        fps: float = 30.0,
+    ) -> None:
+        super().__init__("synthetic")
+        width, height = resolution
+        gradient = np.linspace(0, 255, width, dtype=np.float32)
+        self.__base = np.empty((height, width, 3), dtype=np.uint8)
+        self.__base[:] = gradient.astype(np.uint8)[np.newaxis, :, np.newaxis]
+        self.__pacer = _Pacer(fps)
+        self.__frame_index = 0
+
+    def _grab(self, out: np.ndarray | None) -> np.ndarray | None:
+        self.__pacer.wait()
+        if out is None or out.shape != self.__base.shape:
+            out = np.empty_like(self.__base)
+        np.copyto(out, self.__base)
+        height, width = out.shape[:2]
+        size = height // 4
+        x = self.__frame_index * 8 % max(width - size, 1)
+        cv2.rectangle(out, (x, size), (x + size, 2 * size), (255, 255, 255), -1)
+        self.__frame_index += 1
+        return out
+
+
+def open_source(source: int | str) -> FrameSource:
+    """
+    Opens a frame source from its settings string.
+
+    - a camera index, e.g. ``0``
+    - ``synthetic``, optionally with size and rate: ``synthetic:640x480@60``
+    - a directory of images, or a glob pattern such as ``frames/*.png``
+    - a video file
+    - anything else OpenCV can open, e.g. an RTSP URL
+
+    :raises FileNotFoundError: if a file, directory or pattern has nothing
+        to play.
+    """
+    if isinstance(source, int) or source.isdigit():
+        return Camera(int(source))
+
+    synthetic = _SYNTHETIC.match(source)
+    if synthetic is not None:
+        width, height, fps = synthetic.groups()
+        resolution = (int(width), int(height)) if width else DEFAULT_RESOLUTION
+        return SyntheticSource(resolution, float(fps) if fps else 30.0)
+
+    path = Path(source)
+    if path.is_dir() or any(c in source for c in "*?["):
+        paths = path.iterdir() if path.is_dir() else Path().glob(source)
+        return ImageSequenceSource(
+            sorted(p for p in paths if p.suffix.lower() in IMAGE_SUFFIXES),
+        )
+    if path.is_file():
+        return VideoFileSource(source)
+    return Camera(source)
@@ -0,0 +1,118 @@
+import threading
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+# One being composited, one waiting for the encoder and one being encoded
+_OUTPUT_POOL_SIZE = 3
+
+
+class MaskCompositor:
+    """
+    Replaces everything outside the person with the background image.
+
+    Hard mode truncates the mask to uint8 and, where it is not zero, writes
+    the frame ANDed with it over the background, pixel for pixel what the
+    per-frame ``np.repeat`` and ``cv2.bitwise_and`` version drew. Soft mode
+    alpha-blends frame and background with ``cv2.blendLinear`` using the
+    float mask as weights. All buffers are allocated once per frame size
+    and reused.
+
+    Outputs are leased from a pool: ``composite`` hands a buffer to the
+    caller, who gives it back with ``release`` once nothing reads it any
+    more, e.g. after encoding. A leased buffer is never written, so a slow
+    reader makes the pool grow instead of seeing its frame overwritten.
+    """
+
+    def __init__(self, soft_blend: bool = False) -> None:
+        self.soft_blend = soft_blend
+        self.__shape: Tuple[int, ...] | None = None
+        self.__free_outputs: List[np.ndarray] = []
+        # Outputs handed out by composite, by id
+        self.__leased: Dict[int, np.ndarray] = {}
+        self.__pool_lock = threading.Lock()
+        self.__mask = np.zeros(0, dtype=np.uint8)
+        self.__scaled_mask = np.zeros(0, dtype=np.float32)
+        self.__inverse_mask = np.zeros(0, dtype=np.float32)
+        self.__black = np.zeros(0, dtype=np.uint8)
+        self.__mask_bgr = np.zeros(0, dtype=np.uint8)
+        self.has_mask = False
+
+    def __allocate(self, shape: Tuple[int, ...]) -> None:
+        self.__shape = shape
+        with self.__pool_lock:
+            # Outputs of the old size still leased are dropped on release.
+            self.__free_outputs = [
+                np.empty(shape, dtype=np.uint8) for _ in range(_OUTPUT_POOL_SIZE)
+            ]
+            self.__leased = {}
+        self.__mask = np.zeros(shape[:2], dtype=np.uint8)
+        self.__scaled_mask = np.zeros(shape[:2], dtype=np.float32)
+        self.__inverse_mask = np.zeros(shape[:2], dtype=np.float32)
+        self.__black = np.zeros(shape, dtype=np.uint8)
+        self.__mask_bgr = np.zeros(shape, dtype=np.uint8)
+
+    @property
+    def mask(self) -> np.ndarray | None:
+        """Latest segmentation mask as a single-channel uint8 image."""
+        return self.__mask if self.has_mask else None
+
+    def mask_bgr(self) -> np.ndarray | None:
+        """Latest mask as 3-channel image."""
+        if not self.has_mask:
+            return None
+        cv2.cvtColor(self.__mask, cv2.COLOR_GRAY2BGR, dst=self.__mask_bgr)
+        return self.__mask_bgr
+
+    def composite(
+        self,
+        frame: np.ndarray,
+        segmentation_mask: np.ndarray,
+        background: np.ndarray | None,
+    ) -> np.ndarray:
+        if frame.shape != self.__shape:
+            self.__allocate(frame.shape)
+        if background is None or background.shape != frame.shape:
+            background = self.__black
+
+        segmentation_mask = segmentation_mask.reshape(frame.shape[:2])
+        output = self.__lease_output(frame.shape)
+
+        # Truncated like astype(np.uint8), not rounded. Through a float
+        # buffer, since a casting ufunc allocates a scratch buffer per call.
+        np.multiply(segmentation_mask, 255, out=self.__scaled_mask)
+        np.copyto(self.__mask, self.__scaled_mask, casting="unsafe")
+        self.has_mask = True
+
+        if self.soft_blend:
+            np.subtract(1.0, segmentation_mask, out=self.__inverse_mask)
+            cv2.blendLinear(
+                frame,
+                background,
+                segmentation_mask,
+                self.__inverse_mask,
+                dst=output,
+            )
+        else:
+            cv2.cvtColor(self.__mask, cv2.COLOR_GRAY2BGR, dst=self.__mask_bgr)
+            np.copyto(output, background)
+            cv2.bitwise_and(frame, self.__mask_bgr, dst=output, mask=self.__mask)
+
+        return output
+
+    def __lease_output(self, shape: Tuple[int, ...]) -> np.ndarray:
+        with self.__pool_lock:
+            output = (
+                self.__free_outputs.pop()
+                if self.__free_outputs
+                else np.empty(shape, dtype=np.uint8)
+            )
+            self.__leased[id(output)] = output
+        return output
+
+    def release(self, output: np.ndarray) -> None:
+        """Returns an output of ``composite`` to the pool; others are ignored."""
+        with self.__pool_lock:
+            if self.__leased.pop(id(output), None) is not None:
+                self.__free_outputs.append(output)
@@ -1,16 +1,22 @@
-import json
 from enum import Enum
-from pathlib import Path
-from typing import Dict, Tuple
+from typing import Tuple
 
 import cv2
 import numpy as np
-from loguru import logger
-from mediapipe.framework.formats import landmark_pb2
-from mediapipe.python.solutions.drawing_utils import DrawingSpec
-
-from yoga_pose_recognition.detection.body_connections import BodyConnections
-from yoga_pose_recognition.detection.models.pose import Pose, PoseData
+from mediapipe.python.solutions.drawing_styles import (
+    get_default_pose_landmarks_style,
+)
+from mediapipe.python.solutions.drawing_utils import WHITE_COLOR, DrawingSpec
+
+from yoga_pose_recognition.data_store import DataStore
+from yoga_pose_recognition.detection.models.pose import Pose
+from yoga_pose_recognition.detection.pose_classifier import PoseClassifier
+from yoga_pose_recognition.detection.pose_rules import (
+    CONNECTIONS,
+    ConnectionStatus,
+    PoseRuleEngine,
+)
+from yoga_pose_recognition.detection.temporal_filter import TemporalPoseFilter
 
 _RED = (48, 48, 255)
 _GREEN = (48, 255, 48)
@@ -38,158 +44,127 @@ _BODY_CONNECTION_STYLE = {
     ),
 }
 
+_STATUS_STYLE = {
+    ConnectionStatus.NORMAL: _BODY_CONNECTION_STYLE[ConnectionsStyleAttribute.NORMAL],
+    ConnectionStatus.CORRECT: _BODY_CONNECTION_STYLE[ConnectionsStyleAttribute.CORRECT],
+    ConnectionStatus.WRONG: _BODY_CONNECTION_STYLE[ConnectionsStyleAttribute.WRONG],
+}
 
-class DrawingUtils:
-    pose_data: dict[str, Pose] | None
+_POSE_LANDMARK_STYLE = get_default_pose_landmarks_style()
+
+
+class SkeletonRenderer:
+    """
+    Draws a pose skeleton straight from a (33, >=2) landmark array.
+
+    Connection endpoints and the landmark palette are resolved once from
+    ``BodyConnections`` and the default MediaPipe pose style. Each frame the
+    pixel coordinates are computed in one NumPy pass and every connection of
+    the same status is drawn with a single ``cv2.polylines`` call.
+    """
 
     def __init__(self) -> None:
-        self.pose_data = None
-        self.load_pose_data()
+        connections = np.array(CONNECTIONS, dtype=np.intp)
+        self.__connection_start = connections[:, 0]
+        self.__connection_end = connections[:, 1]
+        self.__connection_palette = [
+            (status, _STATUS_STYLE[status].color, _STATUS_STYLE[status].thickness)
+            for status in ConnectionStatus
+        ]
+        self.__landmark_palette = [
+            (
+                max(spec.circle_radius + 1, int(spec.circle_radius * 1.2)),
+                spec.circle_radius,
+                spec.color,
+                spec.thickness,
+            )
+            for _, spec in sorted(_POSE_LANDMARK_STYLE.items())
+        ]
 
-    def load_pose_data(self) -> None:
-        if self.pose_data is not None:
-            logger.info("Pose data already loaded.")
-        with Path("data/pose.json").open(mode="r") as f:
-            contents = f.read()
-            json_data = json.loads(contents)
-            pose_data_raw = PoseData(**json_data)
-            self.pose_data = {}
-            for pose in pose_data_raw.poses:
-                self.pose_data[pose.name] = pose
-
-    def load_background_image(self, image_path: str) -> np.ndarray:
-        image = cv2.imread(image_path)
-        if image is None:
-            raise FileNotFoundError(f"Image not found: {image_path}")
-        h, w = image.shape[:2]
-        target_w, target_h = 1280, 720
-        aspect_ratio = w / h
-        target_ratio = target_w / target_h
-
-        if aspect_ratio > target_ratio:
-            new_w = target_w
-            new_h = int(new_w / aspect_ratio)
-        else:
-            new_h = target_h
-            new_w = int(new_h * aspect_ratio)
-
-        resized = cv2.resize(image, (new_w, new_h))
-
-        bg = np.zeros((target_h, target_w, 3), dtype=np.uint8)
-        start_x = (target_w - new_w) // 2
-        start_y = (target_h - new_h) // 2
-        bg[start_y : start_y + new_h, start_x : start_x + new_w] = resized
-
-        return bg
-
-    def extract_xyz(
+    def to_pixel_coordinates(
+        self,
+        landmarks: np.ndarray,
+        image_cols: int,
+        image_rows: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        coords = landmarks[:, :2]
+        visible = np.all((coords >= 0) & (coords <= 1), axis=1)
+        pixels = (coords * (image_cols, image_rows)).astype(np.int32)
+        np.minimum(pixels, (image_cols - 1, image_rows - 1), out=pixels)
+        return pixels, visible
+
+    def draw(
         self,
-        tuple1: Tuple[int, int],
-        tuple2: Tuple[int, int],
-    ) -> Tuple[int, int, int]:
-        # 找出重複的值
-        common_value_set = set(tuple1).intersection(set(tuple2))
+        image: np.ndarray,
+        landmarks: np.ndarray,
+        connection_status: np.ndarray,
+    ) -> None:
+        image_rows, image_cols = image.shape[:2]
+        pixels, visible = self.to_pixel_coordinates(landmarks, image_cols, image_rows)
+
+        drawable = visible[self.__connection_start] & visible[self.__connection_end]
+        for status, color, thickness in self.__connection_palette:
+            selected = drawable & (connection_status == status)
+            if not selected.any():
+                continue
+            segments = np.stack(
+                (
+                    pixels[self.__connection_start[selected]],
+                    pixels[self.__connection_end[selected]],
+                ),
+                axis=1,
+            )
+            cv2.polylines(image, list(segments), False, color, thickness)
 
-        if not common_value_set:
-            raise ValueError("No common value found between the two tuples.")
+        # Draws landmark points after the connection lines, same as MediaPipe.
+        for idx in np.flatnonzero(visible).tolist():
+            border_radius, radius, color, thickness = self.__landmark_palette[idx]
+            landmark_px = (int(pixels[idx, 0]), int(pixels[idx, 1]))
+            cv2.circle(image, landmark_px, border_radius, WHITE_COLOR, thickness)
+            cv2.circle(image, landmark_px, radius, color, thickness)
 
-        if len(common_value_set) != 1:
-            raise ValueError("More than one common value found between the two tuples.")
 
-        common_value = common_value_set.pop()
+class DrawingUtils:
+    skeleton_renderer: SkeletonRenderer
 
-        # 去除重複的值
-        unique_values = list(set(tuple1).union(set(tuple2)) - {common_value})
+    def __init__(self, data_store: DataStore | None = None) -> None:
+        self.data_store = data_store or DataStore()
+        self.skeleton_renderer = SkeletonRenderer()
 
-        if len(unique_values) != 2:
-            raise ValueError("The unique values count is not equal to 2.")
+    @property
+    def pose_data(self) -> dict[str, Pose]:
+        return self.data_store.pose_index.poses
 
-        x, z = unique_values
-        y = common_value
+    @property
+    def pose_rule_engine(self) -> PoseRuleEngine:
+        return self.data_store.pose_index.engine
 
-        return x, y, z
+    @property
+    def pose_classifier(self) -> PoseClassifier:
+        return self.data_store.pose_index.classifier
 
-    def calculate_angle(
-        self,
-        point1: np.ndarray,
-        point2: np.ndarray,
-        point3: np.ndarray,
-    ) -> float:
-        vector1 = point1 - point2
-        vector2 = point3 - point2
-        norm1 = np.linalg.norm(vector1)
-        norm2 = np.linalg.norm(vector2)
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        cosine_angle = np.dot(vector1, vector2) / (norm1 * norm2)
-        angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
-        return np.degrees(angle)
-
-    def get_pose_connections_style(
+    def load_pose_data(self) -> None:
+        """Reloads data/pose.json if it changed on disk."""
+        self.data_store.reload()
+
+    def evaluate_pose(
         self,
         pose_name: str,
-        pose_landmarks_proto: landmark_pb2.NormalizedLandmarkList,
-    ) -> Dict[Tuple[int, int], DrawingSpec]:
-        connections_style = {}
-        if self.pose_data is None:
-            raise ValueError("Pose data is not loaded.")
-
-        for angle in self.pose_data[pose_name].angles:
-            connection1 = BodyConnections[angle.connection1].value
-            connection2 = BodyConnections[angle.connection2].value
-
-            try:
-                x, y, z = self.extract_xyz(connection1, connection2)
-            except ValueError:
-                logger.warning(f"Common point not found for {angle}")
-                continue
-
-            point1 = np.array(
-                [
-                    pose_landmarks_proto.landmark[x].x,
-                    pose_landmarks_proto.landmark[x].y,
-                    # pose_landmarks_proto.landmark[x].z, # 立體空間的角度比較難定義姿勢，所以先關閉
-                ],
-            )
-            point2 = np.array(
-                [
-                    pose_landmarks_proto.landmark[y].x,
-                    pose_landmarks_proto.landmark[y].y,
-                    # pose_landmarks_proto.landmark[y].z,
-                ],
-            )
-            point3 = np.array(
-                [
-                    pose_landmarks_proto.landmark[z].x,
-                    pose_landmarks_proto.landmark[z].y,
-                    # pose_landmarks_proto.landmark[z].z,
-                ],
-            )
-            calculated_angle = self.calculate_angle(point1, point2, point3)
-
-            if abs(calculated_angle - angle.value) < 20:  # Allow some tolerance
-                connections_style[connection1] = _BODY_CONNECTION_STYLE[
-                    ConnectionsStyleAttribute.CORRECT
-                ]
-                connections_style[connection2] = _BODY_CONNECTION_STYLE[
-                    ConnectionsStyleAttribute.CORRECT
-                ]
-            else:
-                connections_style[connection1] = _BODY_CONNECTION_STYLE[
-                    ConnectionsStyleAttribute.WRONG
-                ]
-                connections_style[connection2] = _BODY_CONNECTION_STYLE[
-                    ConnectionsStyleAttribute.WRONG
-                ]
-                # logger.info(f"angle.connection1: {angle.connection1}")
-                # logger.info(f"angle.connection2: {angle.connection2}")
-                # logger.info(f"Calculated angle: {calculated_angle}")
-                # logger.info(f"Expected angle: {angle.value}")
-
-        for connection in BodyConnections:
-            if connection.value not in connections_style:
-                connections_style[connection.value] = _BODY_CONNECTION_STYLE[
-                    ConnectionsStyleAttribute.NORMAL
-                ]
-
-        return connections_style
+        landmarks: np.ndarray,
+        temporal_filter: TemporalPoseFilter | None = None,
+        side: int | None = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """:param side: side of a mirror pose to judge, see ``CompiledPose.measure``."""
+        # One lookup, so a concurrent reload cannot mix old and new rules.
+        compiled_pose = self.pose_rule_engine.compiled_poses[pose_name]
+        if temporal_filter is not None:
+            return temporal_filter.update(compiled_pose, landmarks, side)
+        return compiled_pose.evaluate(landmarks, side)
+
+    def draw_pose_landmarks(
+        self,
+        image: np.ndarray,
+        landmarks: np.ndarray,
+        connection_status: np.ndarray,
+    ) -> None:
+        self.skeleton_renderer.draw(image, landmarks, connection_status)
@@ -0,0 +1,175 @@
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+# Upper bounds in seconds, tuned for a 30 fps pipeline (33 ms per frame).
+DEFAULT_BUCKETS = (
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.033,
+    0.05,
+    0.075,
+    0.1,
+    0.15,
+    0.25,
+    0.5,
+    1.0,
+)
+DEFAULT_WINDOW = 512
+
+
+class LatencyHistogram:
+    """
+    Cumulative Prometheus-style histogram plus a rolling sample window.
+
+    ``observe`` only bumps a bucket counter and writes one slot of a ring
+    buffer; percentiles over the window are computed when someone asks for
+    a snapshot. Each histogram is written by a single pipeline thread, so no
+    lock is taken on the hot path.
+    """
+
+    def __init__(
+        self,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        window: int = DEFAULT_WINDOW,
+    ) -> None:
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.__window = np.zeros(window, dtype=np.float64)
+
+    def observe(self, seconds: float) -> None:
+        self.bucket_counts[bisect_left(self.buckets, seconds)] += 1
+        self.__window[self.count % len(self.__window)] = seconds
+        self.count += 1
+        self.sum += seconds
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def snapshot(self) -> Dict[str, float]:
+        samples = self.__window[: min(self.count, len(self.__window))]
+        if len(samples) == 0:
+            return {
+                "count": 0,
+                "mean_ms": 0.0,
+                "p50_ms": 0.0,
+                "p90_ms": 0.0,
+                "p99_ms": 0.0,
+            }
+        p50, p90, p99 = np.percentile(samples, (50, 90, 99)) * 1000
+        return {
+            "count": self.count,
+            "mean_ms": float(samples.mean() * 1000),
+            "p50_ms": float(p50),
+            "p90_ms": float(p90),
+            "p99_ms": float(p99),
+        }
+
+
+class _Timer:
+    def __init__(self, histogram: LatencyHistogram) -> None:
+        self.__histogram = histogram
+        self.__started = 0.0
+
+    def __enter__(self) -> None:
+        self.__started = time.perf_counter()
+
+    def __exit__(self, *args: object) -> None:
+        self.__histogram.observe(time.perf_counter() - self.__started)
+
+
+class PipelineMetrics:
+    """
+    Latency histograms of one detector plus gauges read at scrape time.
+
+    Gauges and counters are callables, so nothing is computed unless the
+    metrics endpoint is actually scraped. ``labels`` are added to every
+    sample, e.g. the session id when several detectors are exported.
+    """
+
+    def __init__(
+        self,
+        stages: Tuple[str, ...],
+        labels: Dict[str, str] | None = None,
+    ) -> None:
+        self.labels = labels or {}
+        self.latency = {stage: LatencyHistogram() for stage in stages}
+        self.gauges: Dict[str, Tuple[str, str, Callable[[], Dict[str, float]]]] = {}
+
+    def add_gauge(
+        self,
+        name: str,
+        metric_type: str,
+        label: str,
+        read: Callable[[], Dict[str, float]],
+    ) -> None:
+        """
+        Registers a labelled gauge or counter.
+
+        :param name: metric name without the ``yoga_`` prefix.
+        :param metric_type: ``gauge`` or ``counter``.
+        :param label: label name, e.g. ``stage``.
+        :param read: returns {label value: metric value}.
+        """
+        self.gauges[name] = (metric_type, label, read)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "latency": {
+                stage: histogram.snapshot() for stage, histogram in self.latency.items()
+            },
+            **{name: read() for name, (_, _, read) in self.gauges.items()},
+        }
+
+    def to_prometheus(self) -> str:
+        return prometheus_text([self])
+
+
+def prometheus_text(metrics: Iterable[PipelineMetrics]) -> str:
+    """Renders several detectors as one exposition, one family per metric."""
+    return "\n".join(_prometheus_lines(list(metrics))) + "\n"
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def _prometheus_lines(metrics_list: List[PipelineMetrics]) -> Iterator[str]:
+    name = "yoga_stage_latency_seconds"
+    yield f"# HELP {name} Time spent per frame in each pipeline stage."
+    yield f"# TYPE {name} histogram"
+    for metrics in metrics_list:
+        for stage, histogram in metrics.latency.items():
+            labels = {**metrics.labels, "stage": stage}
+            cumulative = 0
+            bounds: List[str] = [f"{b:g}" for b in histogram.buckets] + ["+Inf"]
+            for bound, bucket_count in zip(
+                bounds,
+                histogram.bucket_counts,
+                strict=True,
+            ):
+                cumulative += bucket_count
+                bucket_labels = _format_labels({**labels, "le": bound})
+                yield f"{name}_bucket{{{bucket_labels}}} {cumulative}"
+            yield f"{name}_sum{{{_format_labels(labels)}}} {histogram.sum:.6f}"
+            yield f"{name}_count{{{_format_labels(labels)}}} {histogram.count}"
+
+    gauge_names = dict.fromkeys(
+        gauge_name for metrics in metrics_list for gauge_name in metrics.gauges
+    )
+    for gauge_name in gauge_names:
+        full_name = f"yoga_{gauge_name}"
+        exporters = [m for m in metrics_list if gauge_name in m.gauges]
+        yield f"# TYPE {full_name} {exporters[0].gauges[gauge_name][0]}"
+        for metrics in exporters:
+            _, label, read = metrics.gauges[gauge_name]
+            for label_value, value in read().items():
+                labels = _format_labels({**metrics.labels, label: label_value})
+                yield f"{full_name}{{{labels}}} {value:g}"
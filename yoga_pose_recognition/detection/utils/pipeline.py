@@ -0,0 +1,189 @@
+import asyncio
+import threading
+import time
+from typing import (
+    AsyncGenerator,
+    Callable,
+    Generic,
+    NamedTuple,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class LatestFrameSlot(Generic[T]):
+    """
+    Single-slot buffer between two pipeline stages.
+
+    The producer never blocks: a new item replaces the previous one even if
+    nobody has read it yet ("latest frame wins"), and the overwrite is
+    counted in ``dropped``. Consumers remember the last sequence number they
+    saw and wait for a newer one.
+
+    :param on_drop: called with every item replaced before anyone read it,
+        e.g. to give a pooled buffer back.
+    """
+
+    def __init__(self, on_drop: Callable[[T], None] | None = None) -> None:
+        self.__on_drop = on_drop
+        self.__condition = threading.Condition()
+        self.__item: T | None = None
+        self.__sequence = 0
+        self.__read_sequence = 0
+        self.dropped = 0
+
+    @property
+    def sequence(self) -> int:
+        return self.__sequence
+
+    @property
+    def pending(self) -> int:
+        """1 if an item is waiting to be read, else 0."""
+        return int(self.__sequence > self.__read_sequence)
+
+    def put(self, item: T) -> int:
+        replaced = None
+        with self.__condition:
+            if self.__sequence > self.__read_sequence:
+                self.dropped += 1
+                replaced = self.__item
+            self.__item = item
+            self.__sequence += 1
+            sequence = self.__sequence
+            self.__condition.notify_all()
+        if replaced is not None and self.__on_drop is not None:
+            self.__on_drop(replaced)
+        return sequence
+
+    def latest(self) -> Tuple[int, T] | None:
+        with self.__condition:
+            if self.__item is None:
+                return None
+            return self.__sequence, self.__item
+
+    def get(
+        self,
+        last_sequence: int,
+        timeout: float | None = None,
+    ) -> Tuple[int, T] | None:
+        """
+        Waits for an item newer than ``last_sequence``.
+
+        :param last_sequence: sequence number of the last item the caller saw.
+        :param timeout: seconds to wait, ``None`` waits forever.
+        :return: (sequence, item) or ``None`` on timeout.
+        """
+        with self.__condition:
+            if not self.__condition.wait_for(
+                lambda: self.__sequence > last_sequence,
+                timeout,
+            ):
+                return None
+            self.__read_sequence = self.__sequence
+            return self.__sequence, self.__item  # type: ignore
+
+
+class FpsCounter:
+    """Smoothed rate of a pipeline stage, updated once per processed item."""
+
+    def __init__(self, smoothing: float = 0.9) -> None:
+        self.__smoothing = smoothing
+        self.__last_tick: float | None = None
+        self.__interval = 0.0
+
+    def tick(self) -> None:
+        now = time.perf_counter()
+        if self.__last_tick is not None:
+            interval = now - self.__last_tick
+            if self.__interval == 0:
+                self.__interval = interval
+            else:
+                self.__interval = (
+                    self.__smoothing * self.__interval
+                    + (1 - self.__smoothing) * interval
+                )
+        self.__last_tick = now
+
+    @property
+    def fps(self) -> float:
+        if self.__last_tick is None or self.__interval == 0:
+            return 0.0
+        # A stalled stage should read as slow, not as its last known rate.
+        idle = time.perf_counter() - self.__last_tick
+        return 1 / max(self.__interval, idle)
+
+
+class EncodedFrame(NamedTuple):
+    jpeg: bytes
+    # The same JPEG already wrapped as one multipart/x-mixed-replace part.
+    multipart: bytes
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.event = asyncio.Event()
+
+
+class FrameBroadcaster(Generic[T]):
+    """
+    Fans one producer thread out to any number of asyncio subscribers.
+
+    The producer publishes an immutable item once; every subscriber reads
+    the same object. A slow subscriber simply skips to the newest item when
+    it wakes up, so it never holds back the producer or other subscribers.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__latest: Tuple[int, T] | None = None
+        self.__sequence = 0
+        self.__subscribers: Set[_Subscriber] = set()
+        self.skipped = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self.__subscribers)
+
+    def publish(self, item: T) -> int:
+        with self.__lock:
+            self.__sequence += 1
+            self.__latest = (self.__sequence, item)
+            subscribers = list(self.__subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.event.set)
+            except RuntimeError:
+                # The subscriber's event loop is closed.
+                self.__remove(subscriber)
+        return self.__sequence
+
+    def __remove(self, subscriber: _Subscriber) -> None:
+        with self.__lock:
+            self.__subscribers.discard(subscriber)
+
+    async def subscribe(self) -> AsyncGenerator[Tuple[int, T], None]:
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self.__lock:
+            self.__subscribers.add(subscriber)
+            if self.__latest is not None:
+                subscriber.event.set()
+
+        last_sequence = 0
+        try:
+            while True:
+                await subscriber.event.wait()
+                subscriber.event.clear()
+                latest = self.__latest
+                if latest is None or latest[0] <= last_sequence:
+                    continue
+                if last_sequence:
+                    self.skipped += latest[0] - last_sequence - 1
+                last_sequence = latest[0]
+                yield latest
+        finally:
+            self.__remove(subscriber)
@@ -0,0 +1,169 @@
+import threading
+import time
+from contextlib import aclosing
+from fractions import Fraction
+from typing import AsyncGenerator, NamedTuple, Protocol, Tuple
+
+import cv2
+import numpy as np
+
+from yoga_pose_recognition.detection.utils.pipeline import FrameBroadcaster
+
+try:
+    import av
+except ImportError:  # PyAV is optional, only the h264 codec needs it
+    av = None
+
+JPEG = "jpeg"
+H264 = "h264"
+
+
+def available_codecs() -> Tuple[str, ...]:
+    return (H264, JPEG) if av is not None else (JPEG,)
+
+
+class StreamProfile(NamedTuple):
+    codec: str = JPEG
+    # Output size relative to the annotated frame
+    scale: float = 1.0
+    # JPEG quality, 1-100
+    quality: int = 80
+    # Target bitrate of the h264 stream
+    bitrate_kbps: int = 1500
+
+
+class EncodedChunk(NamedTuple):
+    data: bytes
+    # A client can start decoding from this chunk
+    keyframe: bool
+
+
+class _Encoder(Protocol):
+    def encode(self, frame: np.ndarray) -> EncodedChunk | None: ...
+
+    def request_keyframe(self) -> None: ...
+
+
+class JpegEncoder:
+    def __init__(self, quality: int) -> None:
+        self.__params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+
+    def encode(self, frame: np.ndarray) -> EncodedChunk | None:
+        success, buffer = cv2.imencode(".jpg", frame, self.__params)
+        if not success:
+            return None
+        return EncodedChunk(buffer.tobytes(), keyframe=True)
+
+    def request_keyframe(self) -> None:
+        pass
+
+
+class H264Encoder:
+    """
+    Annex-B H.264 through PyAV's libx264, tuned for latency.
+
+    SPS/PPS are repeated in-band on every keyframe so a client can join at
+    any keyframe, and one can be forced when a new client subscribes.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        bitrate_kbps: int,
+        keyframe_interval: int = 60,
+    ) -> None:
+        if av is None:
+            raise RuntimeError("PyAV is not installed, h264 is unavailable.")
+        self.__codec = av.CodecContext.create("libx264", "w")
+        self.__codec.width = width
+        self.__codec.height = height
+        self.__codec.pix_fmt = "yuv420p"
+        self.__codec.time_base = Fraction(1, 1000)
+        self.__codec.bit_rate = bitrate_kbps * 1000
+        self.__codec.gop_size = keyframe_interval
+        self.__codec.options = {
+            "preset": "ultrafast",
+            "tune": "zerolatency",
+            "repeat-headers": "1",
+        }
+        self.__started = time.monotonic()
+        self.__force_keyframe = True
+
+    def encode(self, frame: np.ndarray) -> EncodedChunk | None:
+        video_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
+        video_frame.pts = int((time.monotonic() - self.__started) * 1000)
+        if self.__force_keyframe:
+            self.__force_keyframe = False
+            video_frame.pict_type = av.video.frame.PictureType.I
+        packets = self.__codec.encode(video_frame)
+        if not packets:
+            return None
+        return EncodedChunk(
+            b"".join(bytes(packet) for packet in packets),
+            keyframe=any(packet.is_keyframe for packet in packets),
+        )
+
+    def request_keyframe(self) -> None:
+        self.__force_keyframe = True
+
+
+class EncodedStream:
+    """
+    One encoded variant of the annotated frames, shared by its subscribers.
+
+    The encoder is created on the first frame, once the size is known.
+    Inter-frame codecs cannot drop chunks, so a subscriber that fell behind
+    waits for the next keyframe instead of decoding garbage.
+    """
+
+    def __init__(self, profile: StreamProfile) -> None:
+        if profile.codec not in available_codecs():
+            raise ValueError(f"Codec {profile.codec} is not available.")
+        self.profile = profile
+        self.broadcaster: FrameBroadcaster[EncodedChunk] = FrameBroadcaster()
+        self.__encoder: _Encoder | None = None
+        self.__size: Tuple[int, int] | None = None
+        self.__lock = threading.Lock()
+
+    def publish(self, frame: np.ndarray) -> None:
+        with self.__lock:
+            if self.__encoder is None:
+                self.__size, self.__encoder = self.__create_encoder(frame.shape)
+            if self.__size != (frame.shape[1], frame.shape[0]):
+                frame = cv2.resize(frame, self.__size, interpolation=cv2.INTER_AREA)
+            chunk = self.__encoder.encode(frame)
+        if chunk is not None:
+            self.broadcaster.publish(chunk)
+
+    def __create_encoder(
+        self,
+        frame_shape: Tuple[int, ...],
+    ) -> Tuple[Tuple[int, int], _Encoder]:
+        # yuv420p needs even dimensions
+        width = max(2, int(frame_shape[1] * self.profile.scale) // 2 * 2)
+        height = max(2, int(frame_shape[0] * self.profile.scale) // 2 * 2)
+        if self.profile.codec == H264:
+            return (width, height), H264Encoder(
+                width,
+                height,
+                self.profile.bitrate_kbps,
+            )
+        return (width, height), JpegEncoder(self.profile.quality)
+
+    async def subscribe(self) -> AsyncGenerator[bytes, None]:
+        if self.__encoder is not None:
+            self.__encoder.request_keyframe()
+        last_sequence = None
+        waiting_for_keyframe = True
+        async with aclosing(self.broadcaster.subscribe()) as items:
+            async for sequence, chunk in items:
+                if last_sequence is not None and sequence != last_sequence + 1:
+                    waiting_for_keyframe = True
+                    if self.__encoder is not None:
+                        self.__encoder.request_keyframe()
+                last_sequence = sequence
+                if waiting_for_keyframe and not chunk.keyframe:
+                    continue
+                waiting_for_keyframe = False
+                yield chunk.data
@@ -1,115 +1,421 @@
 import asyncio
+import threading
 import time
-from typing import Any, AsyncGenerator
+from concurrent.futures import Future
+from contextlib import aclosing
+from typing import AsyncGenerator, Callable, Dict, List, Sequence, Tuple
 
 import cv2
 import mediapipe as mp
 import numpy as np
 from loguru import logger
-from mediapipe import solutions
-from mediapipe.framework.formats import landmark_pb2
 from mediapipe.tasks.python.vision.pose_landmarker import PoseLandmarkerResult
 
-from yoga_pose_recognition.detection.body_connections import BodyConnections
-from yoga_pose_recognition.detection.utils.camera import Camera
-from yoga_pose_recognition.detection.utils.drawing_utils import (
-    _BODY_CONNECTION_STYLE,
-    ConnectionsStyleAttribute,
-    DrawingUtils,
+from yoga_pose_recognition.detection.course_runner import CourseRunner
+from yoga_pose_recognition.detection.inference_pool import InferencePool
+from yoga_pose_recognition.detection.landmark_packets import (
+    encode_landmarks,
+    encode_mask,
 )
+from yoga_pose_recognition.detection.landmarker import (
+    PoseLandmarker,
+    VisionRunningMode,
+    landmarker_options,
+    to_image,
+)
+from yoga_pose_recognition.detection.landmarks import NUM_LANDMARKS, LandmarkBuffer
+from yoga_pose_recognition.detection.models.course import Course, CourseProgress
+from yoga_pose_recognition.detection.models.pose_event import (
+    PersonScore,
+    PoseEvent,
+    RecognizedPose,
+)
+from yoga_pose_recognition.detection.pose_classifier import AUTO_POSE, PoseMatch
+from yoga_pose_recognition.detection.pose_rules import (
+    CONNECTION_NAMES,
+    ConnectionStatus,
+)
+from yoga_pose_recognition.detection.recording import RecordingPlayer, SessionRecorder
+from yoga_pose_recognition.detection.roi import Roi, RoiTracker
+from yoga_pose_recognition.detection.scheduler import AdaptiveInferenceScheduler
+from yoga_pose_recognition.detection.temporal_filter import (
+    PersonFilters,
+    TemporalPoseFilter,
+)
+from yoga_pose_recognition.detection.utils.background_cache import BackgroundCache
+from yoga_pose_recognition.detection.utils.camera import (
+    DEFAULT_RESOLUTION,
+    FrameSource,
+    open_source,
+)
+from yoga_pose_recognition.detection.utils.compositing import MaskCompositor
+from yoga_pose_recognition.detection.utils.drawing_utils import DrawingUtils
+from yoga_pose_recognition.detection.utils.metrics import PipelineMetrics
+from yoga_pose_recognition.detection.utils.pipeline import (
+    EncodedFrame,
+    FpsCounter,
+    FrameBroadcaster,
+    LatestFrameSlot,
+)
+from yoga_pose_recognition.detection.utils.stream_encoding import (
+    EncodedStream,
+    StreamProfile,
+)
+from yoga_pose_recognition.settings import settings
+
+PIPELINE_STAGES = ("capture", "inference", "result", "encode")
+# "inference" is the submit-to-callback lag, the rest are time spent in-stage.
+LATENCY_STAGES = ("capture", "inference_submit", "inference", "result", "encode")
+
+# Course progress is pushed on every pose change and at this interval
+COURSE_EVENT_INTERVAL_MS = 1000
 
-BaseOptions = mp.tasks.BaseOptions
-PoseLandmarker = mp.tasks.vision.PoseLandmarker
-PoseLandmarkerOptions = mp.tasks.vision.PoseLandmarkerOptions
-VisionRunningMode = mp.tasks.vision.RunningMode
+_MULTIPART_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
 
 
 class YogaPoseDetector:
-    _instance = None
+    """
+    One camera, one landmarker and one pose target.
+
+    Several detectors can run side by side (see ``SessionManager``) and
+    share one ``DrawingUtils``, which is read-only after loading.
+    """
+
     __drawing_utils: DrawingUtils
+    __landmark_buffer: LandmarkBuffer
+    __compositor: MaskCompositor
     current_frame = None
-    current_mask_frame = None
     current_pose: str
     is_current_frame_wrong: bool
     background_image: np.ndarray | None
+    __recorder: SessionRecorder | None = None
+    # Recognized pose and best matches of each person, in "auto" mode
+    __last_recognition: Sequence[Tuple[str, List[PoseMatch]]] = ()
+    # Black frame and empty mask the replayed skeletons are drawn on
+    __replay_canvas: Tuple[np.ndarray, np.ndarray] | None = None
+    # Timestamp of the warm-up inference and the event its result sets
+    __warm_up: Tuple[int, threading.Event] | None = None
+    # Landmark clients that also want the mask
+    __mask_subscribers = 0
+    # Copy of the raw frame streamed until the first result is ready
+    __preview_frame: np.ndarray | None = None
 
-    def __new__(
-        cls,
-        *args: tuple[Any, ...],
-        **kwargs: dict[str, Any],
-    ) -> "YogaPoseDetector":
-        if cls._instance is None:
-            cls._instance = super(YogaPoseDetector, cls).__new__(
-                cls,
-                *args,
-                **kwargs,
-            )
-            logger.warning("YogaPoseDetector instance created")
-        return cls._instance
-
-    def __init__(self) -> None:
-        self.cam = Camera(0)
-        self.options = PoseLandmarkerOptions(
-            base_options=BaseOptions(
-                model_asset_path="models/pose_landmarker_full.task",
-                delegate=BaseOptions.Delegate.CPU,
-            ),
-            running_mode=VisionRunningMode.LIVE_STREAM,
-            result_callback=self.on_get_result,
-            output_segmentation_masks=True,
+    def __init__(
+        self,
+        session_id: str = "default",
+        camera_source: int | str = 0,
+        num_poses: int = 1,
+        *,
+        drawing_utils: DrawingUtils | None = None,
+        background_cache: BackgroundCache | None = None,
+        replay: RecordingPlayer | None = None,
+    ) -> None:
+        """
+        Opens the camera and the landmarker of one session.
+
+        :param session_id: name used in logs, metrics and pose events.
+        :param camera_source: camera index, video file, image directory or
+            glob, ``synthetic[:WxH@fps]`` or a URL, see ``open_source``.
+        :param num_poses: maximum number of people scored per frame.
+        :param drawing_utils: shared pose data, loaded here if not given.
+        :param background_cache: shared decoded backgrounds.
+        :param replay: plays a recording through scoring and rendering
+            instead of opening the camera and the landmarker.
+        """
+        self.session_id = session_id
+        self.camera_source = camera_source
+        self.num_poses = num_poses
+        self.replay = replay
+        self.cam: FrameSource | None = (
+            open_source(camera_source) if replay is None else None
+        )
+        self.__scheduler = (
+            AdaptiveInferenceScheduler(
+                settings.model_asset_path,
+                settings.adaptive_target_latency_ms,
+                switch_models=settings.inference_workers == 0,
+            )
+            if settings.adaptive_inference
+            else None
+        )
+        # With inference workers the pool is started on the first frame,
+        # once the frame size is known.
+        self.__inference_pool: InferencePool | None = None
+        self.landmarker = None
+        if replay is None and settings.inference_workers == 0:
+            self.__create_landmarker(settings.model_asset_path)
+        self.__drawing_utils = drawing_utils or DrawingUtils()
+        self.__landmark_buffer = LandmarkBuffer(num_poses)
+        self.__person_filters = PersonFilters(self.__create_temporal_filter)
+        self.__compositor = MaskCompositor(soft_blend=settings.soft_mask_blend)
+        self.__roi_tracker = (
+            RoiTracker(num_poses, padding=settings.roi_padding)
+            if settings.roi_tracking
+            else None
         )
-        self.landmarker = PoseLandmarker.create_from_options(self.options)
-        self.__drawing_utils = DrawingUtils()
         self.current_pose = "no_pose"
         self.is_current_frame_wrong = False
         self.background_image = None
+        self.background_path: str | None = None
+        self.__background_cache = background_cache or BackgroundCache()
+        # (width, height) the camera actually delivers
+        self.__frame_size: Tuple[int, int] | None = None
+        self.__captured_frames: LatestFrameSlot[np.ndarray] = LatestFrameSlot()
+        # Composited frames are leased from the compositor until encoded.
+        self.__annotated_frames: LatestFrameSlot[np.ndarray] = LatestFrameSlot(
+            on_drop=self.__compositor.release,
+        )
+        self.__encoded_frames: FrameBroadcaster[EncodedFrame] = FrameBroadcaster()
+        self.__streams: Dict[StreamProfile, EncodedStream] = {}
+        # (landmarks message, mask message or None) per scored frame
+        self.__landmark_packets: FrameBroadcaster[Tuple[bytes, bytes | None]] = (
+            FrameBroadcaster()
+        )
+        self.__streams_lock = threading.Lock()
+        self.__stage_fps = {stage: FpsCounter() for stage in PIPELINE_STAGES}
+        self.__last_timestamp_ms = 0
+        self.__pose_events: FrameBroadcaster[PoseEvent] = FrameBroadcaster()
+        self.__published_verdict: bool | None = None
+        self.__last_event_ms = 0
+        self.__last_scores: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.__course: CourseRunner | None = None
+        self.__course_events: FrameBroadcaster[CourseProgress] = FrameBroadcaster()
+        self.__inference_sequence = 0
+        self.__encode_sequence = 0
+        self.__stop_event = threading.Event()
+        self.__threads: list[threading.Thread] = []
+        self.__start_lock = threading.Lock()
+        self.__frames_submitted = 0
+        self.__results_received = 0
+        # Full-size frames and the crop that was submitted by detect_async
+        # timestamp, so results of a cropped or downscaled submission are
+        # still composited at full resolution.
+        self.__submitted_frames: dict[int, Tuple[np.ndarray, Roi | None]] = {}
+        self.__submitted_lock = threading.Lock()
+        self.__render_lock = threading.Lock()
+        self.__last_mask: np.ndarray | None = None
+        self.__last_drawn: list[tuple[np.ndarray, np.ndarray]] = []
+        self.metrics = PipelineMetrics(LATENCY_STAGES, {"session": session_id})
+        self.__register_metrics()
 
-    def __del__(self) -> None:
-        self.cam.release()
+    def __create_landmarker(self, model_asset_path: str) -> None:
+        self.options = landmarker_options(
+            model_asset_path,
+            VisionRunningMode.LIVE_STREAM,
+            num_poses=self.num_poses,
+            output_segmentation_masks=True,
+            result_callback=self.on_get_result,
+        )
+        self.landmarker = PoseLandmarker.create_from_options(self.options)
+
+    def warm_up(self, image: np.ndarray | None = None, timeout: float = 30.0) -> float:
+        """
+        Runs one inference before the first camera frame.
+
+        The first inference of a landmarker is several times slower than the
+        rest, so it is paid for here instead of on a frame someone watches.
+        A blank frame only runs the person detector; pass a photo of a
+        person to warm up the landmark model as well. Does nothing for
+        replays and with inference workers, which load on the first frame.
+
+        :param image: frame to run, a black ``DEFAULT_RESOLUTION`` one if None.
+        :return: seconds until the result arrived.
+        """
+        if self.landmarker is None:
+            return 0.0
+        if image is None:
+            width, height = DEFAULT_RESOLUTION
+            image = np.zeros((height, width, 3), dtype=np.uint8)
+        done = threading.Event()
+        timestamp_ms = self.__next_timestamp_ms()
+        self.__warm_up = (timestamp_ms, done)
+        started = time.perf_counter()
+        try:
+            self.landmarker.detect_async(
+                to_image(image),
+                timestamp_ms,
+            )
+            if not done.wait(timeout):
+                logger.warning(f"Warm-up of {self.session_id} got no result.")
+        finally:
+            self.__warm_up = None
+        elapsed = time.perf_counter() - started
+        logger.info(f"Landmarker of {self.session_id} warmed up in {elapsed:.2f}s.")
+        return elapsed
+
+    def __register_metrics(self) -> None:
+        scheduler = self.__scheduler
+        if scheduler is not None:
+            self.metrics.add_gauge(
+                "inference_level",
+                "gauge",
+                "param",
+                lambda: {
+                    "scale": scheduler.level.scale,
+                    "stride": scheduler.level.stride,
+                    "latency_ms": scheduler.latency_ms,
+                },
+            )
+        self.metrics.add_gauge(
+            "stage_fps",
+            "gauge",
+            "stage",
+            lambda: {
+                **{stage: fps.fps for stage, fps in self.__stage_fps.items()},
+                **({"camera": self.cam.fps} if self.cam is not None else {}),
+            },
+        )
+        self.metrics.add_gauge(
+            "dropped_frames_total",
+            "counter",
+            "stage",
+            lambda: {
+                "camera": self.cam.dropped if self.cam is not None else 0,
+                "capture": self.__captured_frames.dropped,
+                "result": self.__annotated_frames.dropped,
+                "encode": self.__encoded_frames.skipped,
+            },
+        )
+        self.metrics.add_gauge(
+            "queue_depth",
+            "gauge",
+            "queue",
+            lambda: {
+                "captured": self.__captured_frames.pending,
+                "inference_in_flight": (
+                    self.__inference_pool.in_flight
+                    if self.__inference_pool is not None
+                    else max(self.__frames_submitted - self.__results_received, 0)
+                ),
+                "annotated": self.__annotated_frames.pending,
+            },
+        )
+        self.metrics.add_gauge(
+            "subscribers",
+            "gauge",
+            "stream",
+            lambda: {
+                "frame": self.__encoded_frames.subscriber_count,
+                "stream": sum(
+                    stream.broadcaster.subscriber_count
+                    for stream in list(self.__streams.values())
+                ),
+                "pose_events": self.__pose_events.subscriber_count,
+                "landmarks": self.__landmark_packets.subscriber_count,
+            },
+        )
+
+    def close(self) -> None:
+        """Stops the pipeline and releases the camera and the landmarker."""
+        self.stop()
+        self.stop_recording()
+        if self.cam is not None:
+            self.cam.release()
+        if self.__inference_pool is not None:
+            self.__inference_pool.close()
+            self.__inference_pool = None
         if self.landmarker:
             self.landmarker.close()
+            self.landmarker = None
+
+    def __del__(self) -> None:
+        # Nothing to close if the constructor failed, e.g. on a bad source.
+        if hasattr(self, "metrics"):
+            self.close()
 
     def draw_landmarks_on_image(
         self,
         rgb_image: np.ndarray,
         detection_result: PoseLandmarkerResult,
+        timestamp_ms: int | None = None,
     ) -> np.ndarray:
-        pose_landmarks_list = detection_result.pose_landmarks
-        annotated_image = np.copy(rgb_image)
-        for idx in range(len(pose_landmarks_list)):
-            pose_landmarks = pose_landmarks_list[idx]
-            pose_landmarks_proto = landmark_pb2.NormalizedLandmarkList()
-            pose_landmarks_proto.landmark.extend(
-                [
-                    landmark_pb2.NormalizedLandmark(
-                        x=landmark.x,
-                        y=landmark.y,
-                        z=landmark.z,
-                    )
-                    for landmark in pose_landmarks
-                ],
-            )
-            connections_style = self.__drawing_utils.get_pose_connections_style(
-                self.current_pose,
-                pose_landmarks_proto,
+        people = self.__landmark_buffer.update(detection_result)
+        return self.__draw_people(
+            rgb_image,
+            people,
+            self.__score_people(people, timestamp_ms),
+        )
+
+    def __draw_people(
+        self,
+        rgb_image: np.ndarray,
+        people: List[np.ndarray],
+        scores: List[Tuple[np.ndarray, np.ndarray]],
+    ) -> np.ndarray:
+        # Drawn in place: results are handed in on a freshly composited frame.
+        annotated_image = rgb_image
+        drawn = []
+        for landmarks, (_, connection_status) in zip(people, scores, strict=True):
+            self.__drawing_utils.draw_pose_landmarks(
+                annotated_image,
+                landmarks,
+                connection_status,
             )
+            drawn.append((landmarks.copy(), connection_status))
+        self.__last_drawn = drawn
+        return annotated_image
+
+    def __score_people(
+        self,
+        people: List[np.ndarray],
+        timestamp_ms: int | None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        filters: Sequence[TemporalPoseFilter | None] = [None] * len(people)
+        if timestamp_ms is not None:
+            matched = self.__person_filters.match(people)
+            for landmarks, temporal_filter in zip(people, matched, strict=True):
+                temporal_filter.smooth(landmarks, timestamp_ms)
+            filters = matched
 
-            solutions.drawing_utils.draw_landmarks(
-                image=annotated_image,
-                landmark_list=pose_landmarks_proto,
-                connections=[e.value for e in BodyConnections],
-                landmark_drawing_spec=solutions.drawing_styles.get_default_pose_landmarks_style(),
-                connection_drawing_spec=connections_style,
+        poses = [self.current_pose] * len(people)
+        sides: List[int | None] = [None] * len(people)
+        if self.current_pose == AUTO_POSE:
+            # On smoothed landmarks, so the recognized pose does not jitter.
+            recognition = [self.__recognize(landmarks) for landmarks in people]
+            self.__last_recognition = recognition
+            poses = [pose for pose, _ in recognition]
+            # Judge mirror poses on the side they were recognized on.
+            sides = [matches[0].side if matches else None for _, matches in recognition]
+        scores = [
+            self.__drawing_utils.evaluate_pose(
+                pose,
+                landmarks,
+                temporal_filter=temporal_filter,
+                side=side,
+            )
+            for pose, landmarks, temporal_filter, side in zip(
+                poses,
+                people,
+                filters,
+                sides,
+                strict=True,
             )
+        ]
+        # Nobody in the frame is not a wrong pose.
+        self.__last_scores = scores
+        self.is_current_frame_wrong = any(
+            bool(np.any(status == ConnectionStatus.WRONG)) for _, status in scores
+        )
+        return scores
 
-            is_wrong = False
-            for style in connections_style.values():
-                if style == _BODY_CONNECTION_STYLE[ConnectionsStyleAttribute.WRONG]:
-                    is_wrong = True
-                    break
-            self.is_current_frame_wrong = is_wrong
+    def __recognize(self, landmarks: np.ndarray) -> Tuple[str, List[PoseMatch]]:
+        matches = self.__drawing_utils.pose_classifier.classify(landmarks)
+        if matches and matches[0].confidence >= settings.pose_match_min_confidence:
+            return matches[0].pose, matches
+        return "no_pose", matches
 
-        return annotated_image
+    @staticmethod
+    def __create_temporal_filter() -> TemporalPoseFilter:
+        return TemporalPoseFilter(
+            NUM_LANDMARKS,
+            min_cutoff=settings.landmark_filter_min_cutoff,
+            beta=settings.landmark_filter_beta,
+            smooth_landmarks=settings.landmark_smoothing,
+        )
+
+    @property
+    def current_mask_frame(self) -> np.ndarray | None:
+        return self.__compositor.mask_bgr()
 
     def on_get_result(
         self,
@@ -117,73 +423,741 @@ class YogaPoseDetector:
         output_image: mp.Image,
         timestamp_ms: int,
     ) -> None:
+        warm_up = self.__warm_up
+        if warm_up is not None and warm_up[0] == timestamp_ms:
+            warm_up[1].set()
+            return
+        segmentation_mask = None
         if result.segmentation_masks is not None and len(result.segmentation_masks) > 0:
             segmentation_mask = result.segmentation_masks[0].numpy_view()
-            visualized_mask = (
-                np.repeat(segmentation_mask[:, :, np.newaxis], 3, axis=2) * 255
-            ).astype(np.uint8)
-            self.current_mask_frame = visualized_mask
+        self.__handle_result(
+            self.__landmark_buffer.update(result),
+            segmentation_mask,
+            timestamp_ms,
+            output_image.numpy_view(),
+        )
+
+    def __on_pool_result(
+        self,
+        people: List[np.ndarray],
+        segmentation_mask: np.ndarray | None,
+        timestamp_ms: int,
+    ) -> None:
+        self.__handle_result(people, segmentation_mask, timestamp_ms, None)
 
-            masked_frame = cv2.bitwise_and(
-                output_image.numpy_view().astype(np.uint8),
-                visualized_mask,
+    def __handle_result(
+        self,
+        people: List[np.ndarray],
+        segmentation_mask: np.ndarray | None,
+        timestamp_ms: int,
+        output_frame: np.ndarray | None,
+    ) -> None:
+        started = time.perf_counter()
+        self.__results_received += 1
+        lag_ms = max(time.monotonic_ns() // 1_000_000 - timestamp_ms, 0)
+        self.metrics.latency["inference"].observe(lag_ms / 1000)
+        if self.__scheduler is not None:
+            self.__scheduler.record_result(lag_ms)
+
+        frame, roi = self.__pop_submitted_frame(timestamp_ms) or (output_frame, None)
+        if frame is not None and self.__roi_tracker is not None:
+            segmentation_mask = self.__uncrop(roi, frame, people, segmentation_mask)
+
+        course = self.__course
+        if course is not None:
+            self.__advance_course(course, timestamp_ms)
+        recorder = self.__recorder
+        # Scoring smooths in place; recordings keep the raw landmarks and are
+        # smoothed again when replayed.
+        raw_people = (
+            [landmarks.copy() for landmarks in people]
+            if recorder is not None
+            else people
+        )
+        scores = self.__score_people(people, timestamp_ms)
+        # Empty results carry no mask, they are scored but not composited.
+        if frame is not None and segmentation_mask is not None:
+            self.__composite_result(frame, people, scores, segmentation_mask)
+        self.__stage_fps["result"].tick()
+        self.__publish_landmarks(people, scores, segmentation_mask, timestamp_ms)
+        self.__publish_pose_event(timestamp_ms)
+        if course is not None:
+            self.__record_course(course, scores, timestamp_ms)
+        if recorder is not None:
+            recorder.record(
+                timestamp_ms,
+                self.current_pose,
+                raw_people,
+                scores,
+                self.__frame_size or DEFAULT_RESOLUTION,
+            )
+        self.metrics.latency["result"].observe(time.perf_counter() - started)
+
+    def __composite_result(
+        self,
+        frame: np.ndarray,
+        people: List[np.ndarray],
+        scores: List[Tuple[np.ndarray, np.ndarray]],
+        segmentation_mask: np.ndarray,
+    ) -> None:
+        if segmentation_mask.shape[:2] != frame.shape[:2]:
+            segmentation_mask = cv2.resize(
+                segmentation_mask,
+                (frame.shape[1], frame.shape[0]),
             )
-            if self.background_image is not None:
-                nonzero_mask = visualized_mask != 0
-                background_copy = self.background_image.copy()
-                background_copy[nonzero_mask] = masked_frame[nonzero_mask]
-                masked_frame = background_copy
 
-            self.current_frame = self.draw_landmarks_on_image(
-                masked_frame,
-                result,
+        with self.__render_lock:
+            segmentation_mask = self.__keep_mask(segmentation_mask)
+            if self.__landmark_packets.subscriber_count and not self.__has_viewers():
+                # Only landmark clients, they draw the frame themselves.
+                return
+            masked_frame = self.__compositor.composite(
+                frame,
+                segmentation_mask,
+                self.background_image,
             )
+            self.current_frame = self.__draw_people(masked_frame, people, scores)
+        self.__annotated_frames.put(self.current_frame)
 
-    async def generate_frame(self) -> None:
-        frame = self.cam.get_frame()
-        mp_image = mp.Image(
-            image_format=mp.ImageFormat.SRGB,
-            data=frame,
+    def __keep_mask(self, segmentation_mask: np.ndarray) -> np.ndarray:
+        """
+        Copies the mask into ``__last_mask`` for frames that are not submitted.
+
+        The landmarker and the inference pool reuse the buffer of a result,
+        so the mask is never kept by reference. Call with the render lock.
+        """
+        last_mask = self.__last_mask
+        if (
+            last_mask is None
+            or last_mask.shape != segmentation_mask.shape
+            or last_mask.dtype != segmentation_mask.dtype
+        ):
+            last_mask = self.__last_mask = np.empty_like(segmentation_mask)
+        np.copyto(last_mask, segmentation_mask)
+        return last_mask
+
+    def __uncrop(
+        self,
+        roi: Roi | None,
+        frame: np.ndarray,
+        people: List[np.ndarray],
+        segmentation_mask: np.ndarray | None,
+    ) -> np.ndarray | None:
+        """
+        Maps the result of a cropped submission back onto the full frame.
+
+        :return: the segmentation mask covering the full frame.
+        """
+        if roi is not None:
+            frame_size = (frame.shape[1], frame.shape[0])
+            roi.to_frame(people, frame_size)
+            if segmentation_mask is not None:
+                segmentation_mask = roi.paste_mask(segmentation_mask, frame_size)
+        self.__roi_tracker.update(people)
+        return segmentation_mask
+
+    def __has_viewers(self) -> bool:
+        return self.__encoded_frames.subscriber_count > 0 or any(
+            stream.broadcaster.subscriber_count > 0
+            for stream in list(self.__streams.values())
         )
-        self.landmarker.detect_async(mp_image, int(time.time() * 1000))
 
-    async def get_frame(self) -> AsyncGenerator[bytes, None]:
+    def __publish_landmarks(
+        self,
+        people: List[np.ndarray],
+        scores: List[Tuple[np.ndarray, np.ndarray]],
+        segmentation_mask: np.ndarray | None,
+        timestamp_ms: int,
+    ) -> None:
+        if self.__landmark_packets.subscriber_count == 0:
+            return
+        landmarks_packet = encode_landmarks(
+            timestamp_ms,
+            [
+                (landmarks, status)
+                for landmarks, (_, status) in zip(people, scores, strict=True)
+            ],
+        )
+        mask_packet = None
+        if self.__mask_subscribers > 0 and segmentation_mask is not None:
+            mask_packet = encode_mask(
+                timestamp_ms,
+                segmentation_mask,
+                settings.landmark_mask_width,
+            )
+        self.__landmark_packets.publish((landmarks_packet, mask_packet))
 
+    async def landmark_packets(
+        self,
+        with_mask: bool = False,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Yields the binary messages of ``landmark_packets.py`` for every frame.
+
+        While only landmark clients are connected, frames are scored but
+        neither composited, drawn nor encoded.
+        """
+        self.start()
+        if with_mask:
+            self.__mask_subscribers += 1
         try:
-            while True:
+            async with aclosing(self.__landmark_packets.subscribe()) as packets:
+                async for _, (landmarks_packet, mask_packet) in packets:
+                    yield landmarks_packet
+                    if with_mask and mask_packet is not None:
+                        yield mask_packet
+        finally:
+            if with_mask:
+                self.__mask_subscribers -= 1
+
+    def __pop_submitted_frame(
+        self,
+        timestamp_ms: int,
+    ) -> Tuple[np.ndarray, Roi | None] | None:
+        with self.__submitted_lock:
+            submitted = self.__submitted_frames.pop(timestamp_ms, None)
+            # Anything older was dropped by MediaPipe and will never come back.
+            for stale in [t for t in self.__submitted_frames if t < timestamp_ms]:
+                del self.__submitted_frames[stale]
+        return submitted
+
+    def __render_with_last_result(self, frame: np.ndarray) -> bool:
+        """Composites a frame that was not submitted with the last result."""
+        if not self.__has_viewers():
+            # Nothing encodes it, landmark clients only get scored frames.
+            return False
+        if self.__last_mask is None or self.__last_mask.shape[:2] != frame.shape[:2]:
+            return False
+        with self.__render_lock:
+            masked_frame = self.__compositor.composite(
+                frame,
+                self.__last_mask,
+                self.background_image,
+            )
+            for landmarks, connection_status in self.__last_drawn:
+                self.__drawing_utils.draw_pose_landmarks(
+                    masked_frame,
+                    landmarks,
+                    connection_status,
+                )
+            self.current_frame = masked_frame
+        self.__annotated_frames.put(masked_frame)
+        return True
+
+    def __publish_pose_event(self, timestamp_ms: int) -> None:
+        verdict_changed = self.is_current_frame_wrong != self.__published_verdict
+        max_rate = settings.pose_event_max_rate
+        if not verdict_changed and (
+            max_rate <= 0 or timestamp_ms - self.__last_event_ms < 1000 / max_rate
+        ):
+            return
+
+        self.__published_verdict = self.is_current_frame_wrong
+        self.__last_event_ms = timestamp_ms
+        recognition = (
+            list(self.__last_recognition) if self.current_pose == AUTO_POSE else []
+        )
+        recognition += [(self.current_pose, [])] * (
+            len(self.__last_scores) - len(recognition)
+        )
+        people = [
+            PersonScore(
+                pose=pose,
+                is_wrong=bool(np.any(status == ConnectionStatus.WRONG)),
+                angles=np.round(angles, 1).tolist(),
+                wrong_connections=[
+                    CONNECTION_NAMES[i]
+                    for i in np.flatnonzero(status == ConnectionStatus.WRONG)
+                ],
+                matches=[
+                    RecognizedPose(
+                        pose=match.pose,
+                        confidence=match.confidence,
+                        mean_error=match.mean_error,
+                        mirrored=match.side == 1,
+                    )
+                    for match in matches
+                ],
+            )
+            for (angles, status), (pose, matches) in zip(
+                self.__last_scores,
+                recognition,
+                strict=True,
+            )
+        ]
+        self.__pose_events.publish(
+            PoseEvent(
+                session_id=self.session_id,
+                timestamp_ms=timestamp_ms,
+                pose=self.current_pose,
+                is_wrong=self.is_current_frame_wrong,
+                angles=people[0].angles if people else [],
+                wrong_connections=people[0].wrong_connections if people else [],
+                people=people,
+            ),
+        )
+
+    def start_course(self, course: Course) -> None:
+        """
+        Plays ``course`` from now on, replacing a running one.
+
+        :raises ValueError: if the course uses a pose missing from pose data.
+        """
+        missing = {
+            pose.server_id
+            for pose in course.poses
+            if pose.server_id not in self.__drawing_utils.pose_data
+        }
+        if missing:
+            raise ValueError(f"Poses {', '.join(sorted(missing))} not in pose data.")
+        first = course.poses[0] if course.poses else None
+        if first is not None and first.background and self.__frame_size:
+            self.__background_cache.preload([first.background], self.__frame_size)
+        self.__course = CourseRunner(course, time.monotonic_ns() // 1_000_000)
+        logger.info(f"Session {self.session_id} started course {course.id}.")
+        self.start()
+
+    def stop_course(self) -> None:
+        if self.__course is not None:
+            logger.info(f"Session {self.session_id} stopped its course.")
+        self.__course = None
+
+    @property
+    def course_progress(self) -> CourseProgress | None:
+        course = self.__course
+        if course is None:
+            return None
+        return course.progress(self.session_id, time.monotonic_ns() // 1_000_000)
+
+    def __advance_course(self, course: CourseRunner, timestamp_ms: int) -> None:
+        if not course.advance(timestamp_ms):
+            return
+        step = course.current
+        if step is None:
+            self.current_pose = "no_pose"
+            logger.info(
+                f"Session {self.session_id} finished course {course.course.id}.",
+            )
+            return
+
+        if step.server_id in self.__drawing_utils.pose_data:
+            self.current_pose = step.server_id
+        else:
+            # Removed by a reload after the course started.
+            logger.warning(f"Pose {step.server_id} not found in pose data.")
+            self.current_pose = "no_pose"
+        if step.background:
+            self.background_path = step.background
+            self.__fit_background(self.__frame_size or DEFAULT_RESOLUTION)
+        # Rules are compiled by the data store, only the image is left to warm.
+        upcoming = course.next
+        if upcoming is not None and upcoming.background:
+            self.__background_cache.preload(
+                [upcoming.background],
+                self.__frame_size or DEFAULT_RESOLUTION,
+            )
+
+    def __record_course(
+        self,
+        course: CourseRunner,
+        scores: List[Tuple[np.ndarray, np.ndarray]],
+        timestamp_ms: int,
+    ) -> None:
+        compiled_pose = self.__drawing_utils.pose_rule_engine.compiled_poses.get(
+            self.current_pose,
+        )
+        if compiled_pose is not None:
+            course.record(timestamp_ms, compiled_pose, scores)
+        if course.progress_due(timestamp_ms, COURSE_EVENT_INTERVAL_MS):
+            self.__course_events.publish(course.progress(self.session_id, timestamp_ms))
+
+    def start_recording(self, name: str) -> None:
+        """
+        Appends every scored frame to the recording ``name``.
+
+        :raises ValueError: if already recording or the name is invalid.
+        :raises FileExistsError: if the recording exists.
+        """
+        if self.__recorder is not None:
+            raise ValueError(f"Session {self.session_id} is already recording.")
+        self.__recorder = SessionRecorder(
+            settings.recordings_dir,
+            name,
+            self.session_id,
+        )
+        logger.info(f"Session {self.session_id} recording to {name}.")
+        self.start()
+
+    def stop_recording(self) -> SessionRecorder | None:
+        """:return: the recorder that was stopped, if any."""
+        recorder = self.__recorder
+        self.__recorder = None
+        if recorder is not None:
+            recorder.close()
+        return recorder
+
+    @property
+    def recording(self) -> str | None:
+        recorder = self.__recorder
+        return recorder.name if recorder is not None else None
+
+    async def course_events(self) -> AsyncGenerator[CourseProgress, None]:
+        """Yields course progress on every pose change and once a second."""
+        async with aclosing(self.__course_events.subscribe()) as events:
+            async for _, progress in events:
+                yield progress
 
-                await self.generate_frame()
+    async def pose_events(self) -> AsyncGenerator[PoseEvent, None]:
+        """Yields pose events as the detector publishes them."""
+        self.start()
+        async with aclosing(self.__pose_events.subscribe()) as events:
+            async for _, event in events:
+                yield event
 
-                if self.current_frame is None:
-                    self.current_frame = self.cam.get_frame()
+    @property
+    def pipeline_stats(self) -> Dict[str, Dict[str, float]]:
+        dropped = {
+            "capture": self.__captured_frames.dropped,
+            "result": self.__annotated_frames.dropped,
+            "encode": self.__encoded_frames.skipped,
+        }
+        stats = {
+            stage: {"fps": counter.fps, "dropped": dropped.get(stage, 0)}
+            for stage, counter in self.__stage_fps.items()
+        }
+        stats["encode"]["subscribers"] = self.__encoded_frames.subscriber_count
+        if self.cam is not None:
+            stats["camera"] = {"fps": self.cam.fps, "dropped": self.cam.dropped}
+        return stats
 
-                success, buffer = cv2.imencode(".jpg", self.current_frame)
+    @property
+    def is_running(self) -> bool:
+        return bool(self.__threads)
 
-                if success:
-                    frame_bytes = buffer.tobytes()
-                    yield (
-                        b"--frame\r\n"
-                        b"Content-Type: image/jpeg\r\n\r\n" + frame_bytes + b"\r\n"
+    def start(self) -> None:
+        """Starts the capture, inference and encode threads if not running."""
+        with self.__start_lock:
+            if self.__threads:
+                return
+            self.__stop_event.clear()
+            self.__threads = [
+                threading.Thread(
+                    target=self.__run_stage,
+                    args=(name, step),
+                    name=f"yoga-{self.session_id}-{name}",
+                    daemon=True,
+                )
+                for name, step in (
+                    # A replay produces scored frames directly.
+                    (("capture", self.__replay_step),)
+                    if self.replay is not None
+                    else (
+                        ("capture", self.__capture_step),
+                        ("inference", self.__inference_step),
                     )
-                else:
+                )
+                + (("encode", self.__encode_step),)
+            ]
+            for thread in self.__threads:
+                thread.start()
+            logger.info(f"Frame pipeline {self.session_id} started.")
+
+    def stop(self) -> None:
+        with self.__start_lock:
+            self.__stop_event.set()
+            for thread in self.__threads:
+                thread.join(timeout=1)
+            self.__threads = []
+
+    def __run_stage(self, name: str, step: Callable[[], bool]) -> None:
+        while not self.__stop_event.is_set():
+            try:
+                if step():
+                    self.__stage_fps[name].tick()
+            except Exception:
+                logger.exception(f"Pipeline stage {self.session_id}/{name} failed.")
+                time.sleep(0.1)
+        logger.info(f"Pipeline stage {self.session_id}/{name} exited.")
+
+    def __capture_step(self) -> bool:
+        with self.metrics.latency["capture"].time():
+            frame = self.cam.get_frame()
+        if frame.size == 0:
+            time.sleep(0.01)
+            return False
+        frame_size = (frame.shape[1], frame.shape[0])
+        if frame_size != self.__frame_size:
+            self.__frame_size = frame_size
+            self.__fit_background(frame_size)
+        self.__captured_frames.put(frame)
+        return True
+
+    def __replay_step(self) -> bool:
+        now_ms = time.monotonic_ns() // 1_000_000
+        due_ms, frame = self.replay.next(now_ms)
+        if due_ms > now_ms and self.__stop_event.wait((due_ms - now_ms) / 1000):
+            return False
+
+        frame_size = self.replay.recording.frame_size or DEFAULT_RESOLUTION
+        if self.__replay_canvas is None or frame_size != self.__frame_size:
+            self.__frame_size = frame_size
+            self.__fit_background(frame_size)
+            width, height = frame_size
+            self.__replay_canvas = (
+                np.zeros((height, width, 3), dtype=np.uint8),
+                np.zeros((height, width), dtype=np.float32),
+            )
+        pose = self.replay.pose or frame.pose
+        if self.__course is None and pose in self.__drawing_utils.pose_data:
+            self.current_pose = pose
+
+        canvas, mask = self.__replay_canvas
+        self.__handle_result(
+            list(frame.landmarks),
+            mask,
+            self.__next_timestamp_ms(),
+            canvas,
+        )
+        return True
+
+    def __next_timestamp_ms(self) -> int:
+        # detect_async requires strictly increasing timestamps.
+        timestamp_ms = max(
+            time.monotonic_ns() // 1_000_000,
+            self.__last_timestamp_ms + 1,
+        )
+        self.__last_timestamp_ms = timestamp_ms
+        return timestamp_ms
+
+    def __inference_step(self) -> bool:
+        item = self.__captured_frames.get(self.__inference_sequence, timeout=0.1)
+        if item is None:
+            return False
+        self.__inference_sequence, frame = item
+
+        scale = 1.0
+        scheduler = self.__scheduler
+        if scheduler is not None:
+            level = scheduler.update()
+            if (
+                level is not None
+                and self.landmarker is not None
+                and level.model_asset_path != self.options.base_options.model_asset_path
+            ):
+                previous_landmarker = self.landmarker
+                self.__create_landmarker(level.model_asset_path)
+                previous_landmarker.close()
+            if not scheduler.should_submit():
+                self.__render_with_last_result(frame)
+                return False
+            scale = scheduler.level.scale
+
+        input_frame, roi = self.__inference_input(frame, scale)
+        # The source reuses its buffers, and a slow result can outlive them.
+        owned_frame = frame.copy()
+        if input_frame is frame:
+            input_frame = owned_frame
+        timestamp_ms = self.__next_timestamp_ms()
+        with self.__submitted_lock:
+            self.__submitted_frames[timestamp_ms] = (owned_frame, roi)
+        with self.metrics.latency["inference_submit"].time():
+            try:
+                submitted = self.__submit(frame.shape, input_frame, timestamp_ms)
+            except Exception:
+                # No result will come for it.
+                self.__pop_submitted_frame(timestamp_ms)
+                raise
+            if not submitted:
+                self.__pop_submitted_frame(timestamp_ms)
+                return False
+        self.__frames_submitted += 1
+        if scheduler is not None:
+            scheduler.record_submit()
+        return True
+
+    def __inference_input(
+        self,
+        frame: np.ndarray,
+        scale: float,
+    ) -> Tuple[np.ndarray, Roi | None]:
+        """:return: the crop around the tracked people, scaled, and its region."""
+        roi = None
+        input_frame = frame
+        if self.__roi_tracker is not None:
+            roi = self.__roi_tracker.next_roi((frame.shape[1], frame.shape[0]))
+            if roi is not None:
+                input_frame = np.ascontiguousarray(roi.crop(frame))
+        if scale != 1.0:
+            input_frame = cv2.resize(
+                input_frame,
+                None,
+                fx=scale,
+                fy=scale,
+                interpolation=cv2.INTER_AREA,
+            )
+        return input_frame, roi
+
+    def __submit(
+        self,
+        frame_shape: Tuple[int, ...],
+        input_frame: np.ndarray,
+        timestamp_ms: int,
+    ) -> bool:
+        """:return: False if the frame was dropped."""
+        if self.landmarker is not None:
+            self.landmarker.detect_async(
+                to_image(input_frame),
+                timestamp_ms,
+            )
+            return True
+
+        pool = self.__inference_pool
+        if pool is not None and not pool.fits(input_frame):
+            # The camera switched to a larger size, the slots are too small.
+            logger.info(f"Resizing the inference pool for {frame_shape} frames.")
+            self.__inference_pool = None
+            pool.close()
+        if self.__inference_pool is None:
+            self.__inference_pool = InferencePool(
+                settings.model_asset_path,
+                frame_shape,
+                self.__on_pool_result,
+                workers=settings.inference_workers,
+                num_poses=self.num_poses,
+            )
+        # Every slot busy: the workers are behind, drop this frame.
+        return self.__inference_pool.submit(input_frame, timestamp_ms)
+
+    def __encode_step(self) -> bool:
+        item = self.__annotated_frames.get(self.__encode_sequence, timeout=0.1)
+        if item is None:
+            return self.__encode(None)
+        self.__encode_sequence = item[0]
+        try:
+            return self.__encode(item[1])
+        finally:
+            self.__compositor.release(item[1])
+
+    def __encode(self, frame: np.ndarray | None) -> bool:
+        """:param frame: the next annotated frame, None if there is none yet."""
+        mjpeg_watched = self.__encoded_frames.subscriber_count > 0
+        with self.__streams_lock:
+            streams = [
+                stream
+                for stream in self.__streams.values()
+                if stream.broadcaster.subscriber_count > 0
+            ]
+        if not mjpeg_watched and not streams:
+            # Nobody is watching, skip the encoding work.
+            return False
+        if frame is None:
+            if self.current_frame is not None:
+                return False
+            # 還沒有辨識結果之前先送原始畫面
+            item = self.__captured_frames.latest()
+            if item is None:
+                return False
+            # The camera ring buffer is refilled while we encode, copy it out.
+            if (
+                self.__preview_frame is None
+                or self.__preview_frame.shape != item[1].shape
+            ):
+                self.__preview_frame = np.empty_like(item[1])
+            np.copyto(self.__preview_frame, item[1])
+            frame = self.__preview_frame
+
+        with self.metrics.latency["encode"].time():
+            for stream in streams:
+                stream.publish(frame)
+            if mjpeg_watched:
+                success, buffer = cv2.imencode(".jpg", frame)
+                if not success:
                     logger.warning("Frame encoding failed.")
+                    return False
+                jpeg = buffer.tobytes()
+                self.__encoded_frames.publish(
+                    EncodedFrame(
+                        jpeg=jpeg,
+                        multipart=_MULTIPART_HEADER + jpeg + b"\r\n",
+                    ),
+                )
+        return True
 
-                await asyncio.sleep(0)
+    async def get_frame(self) -> AsyncGenerator[bytes, None]:
+        self.start()
+        try:
+            async with aclosing(self.__encoded_frames.subscribe()) as frames:
+                async for _, frame in frames:
+                    yield frame.multipart
 
         except (asyncio.CancelledError, GeneratorExit):
             logger.warning("Frame generation cancelled.")
         finally:
             logger.info("Frame generator exited.")
 
+    async def encoded_stream(
+        self,
+        profile: StreamProfile,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Yields the annotated frames encoded as ``profile`` asks.
+
+        Subscribers asking for the same profile share one encoder.
+
+        :raises ValueError: if the codec is not available.
+        """
+        with self.__streams_lock:
+            stream = self.__streams.get(profile)
+            if stream is None:
+                stream = self.__streams[profile] = EncodedStream(profile)
+        self.start()
+        try:
+            async with aclosing(stream.subscribe()) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            with self.__streams_lock:
+                if stream.broadcaster.subscriber_count == 0:
+                    self.__streams.pop(profile, None)
+
     async def set_current_pose(self, pose: str) -> None:
-        if (
-            self.__drawing_utils.pose_data is not None
-            and pose in self.__drawing_utils.pose_data
-        ):
+        if pose == AUTO_POSE or pose in self.__drawing_utils.pose_data:
+            # Choosing a pose by hand ends the course.
+            self.stop_course()
             self.current_pose = pose
         else:
             logger.warning(f"Pose {pose} not found in pose data.")
             raise ValueError(f"Pose {pose} not found in pose data.")
 
     async def load_background_image(self, path: str) -> None:
-        self.background_image = self.__drawing_utils.load_background_image(path)
+        """
+        Switches to the background image at ``path``.
+
+        :raises FileNotFoundError: if the image does not exist or cannot be read.
+        """
+        size = self.__frame_size or DEFAULT_RESOLUTION
+        background = await self.__background_cache.load(path, size)
+        self.background_path = path
+        self.background_image = background
+        if self.__frame_size not in (None, size):
+            # The camera size changed while decoding.
+            self.__fit_background(self.__frame_size)
+
+    def __fit_background(self, frame_size: Tuple[int, int]) -> None:
+        """Letterboxes the current background to a new frame size off-thread."""
+        path = self.background_path
+        if path is None:
+            return
+        try:
+            future = self.__background_cache.get(path, frame_size)
+        except OSError as e:
+            logger.error(f"Cannot refit background {path}: {e}")
+            return
+
+        def apply(future: Future[np.ndarray]) -> None:
+            if future.exception() is not None:
+                logger.error(f"Cannot refit background {path}: {future.exception()}")
+            elif self.background_path == path:
+                self.background_image = future.result()
+
+        future.add_done_callback(apply)
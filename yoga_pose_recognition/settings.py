@@ -38,6 +38,69 @@ class Settings(BaseSettings):
 
     log_level: LogLevel = LogLevel.INFO
 
+    # Frame source of the "default" session: camera index, video file, image
+    # directory or glob, "synthetic[:WxH@fps]" or a URL
+    camera_source: int | str = 0
+    # Pixel format requested from cameras, "" keeps the driver default
+    camera_fourcc: str = "MJPG"
+    # Frames the camera driver may queue; more only adds lag
+    camera_buffer_size: int = 1
+    # Upper bound on concurrently running detector sessions
+    max_sessions: int = 4
+    # People scored per frame in a new session
+    num_poses: int = 1
+
+    # MediaPipe pose landmarker model
+    model_asset_path: str = "models/pose_landmarker_full.task"
+    # Photo of a person run once at startup, so the first camera frame does
+    # not pay for the landmarker's setup; a blank frame warms up less.
+    warm_up_image: Path | None = None
+
+    # Run the landmarker in this many worker processes fed through shared
+    # memory instead of in-process; 0 keeps the in-process LIVE_STREAM mode.
+    inference_workers: int = 0
+
+    # In "auto" mode, the best template must reach this confidence (0-1) to
+    # be scored against; below it the person counts as doing no pose.
+    pose_match_min_confidence: float = 0.6
+
+    # Upper bound (Hz) for pose events while the verdict is unchanged.
+    # Verdict changes are always pushed immediately; 0 pushes only changes.
+    pose_event_max_rate: float = 5.0
+
+    # Lower inference resolution, skip frames or switch between the
+    # pose_landmarker_{lite,full,heavy}.task files next to model_asset_path
+    # to keep the detect_async callback latency under the target.
+    adaptive_inference: bool = False
+    adaptive_target_latency_ms: float = 100.0
+
+    # Run inference on the region around the people of the last result
+    # instead of the full frame, padded by this fraction of its longer side.
+    # Off by default: landmarks jitter a little whenever the crop moves.
+    roi_tracking: bool = False
+    roi_padding: float = 0.25
+
+    # One Euro filter on landmarks before scoring. Lower min_cutoff smooths
+    # more when still, higher beta follows fast movement more closely.
+    landmark_smoothing: bool = True
+    landmark_filter_min_cutoff: float = 1.0
+    landmark_filter_beta: float = 5.0
+
+    # Width of the run-length coded mask sent to landmark stream clients
+    landmark_mask_width: int = 64
+
+    # Seconds between checks of data/*.json for changes; 0 disables reloading
+    data_reload_interval: float = 2.0
+
+    # Where session recordings are written and replayed from
+    recordings_dir: Path = Path("recordings")
+
+    # Memory budget of decoded background images shared by all sessions
+    background_cache_mb: int = 256
+
+    # Alpha-blend the person onto the background instead of a hard cut-out
+    soft_mask_blend: bool = False
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_prefix="YOGA_",
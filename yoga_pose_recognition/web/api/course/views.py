@@ -1,15 +1,14 @@
-import json
+from fastapi import APIRouter, Depends, Request, Response
 
-import aiofiles
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from yoga_pose_recognition.data_store import COURSE, DataStore
+from yoga_pose_recognition.web.api.documents import document_response, get_data_store
 
 router = APIRouter()
 
 
 @router.get("/")
-async def get_frame() -> JSONResponse:
-    async with aiofiles.open("data/course.json", mode="r") as f:
-        contents = await f.read()
-        json_data = json.loads(contents)
-        return JSONResponse(content=json_data)
+async def get_frame(
+    request: Request,
+    store: DataStore = Depends(get_data_store),
+) -> Response:
+    return document_response(request, store, COURSE)
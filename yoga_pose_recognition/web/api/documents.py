@@ -0,0 +1,34 @@
+from fastapi import Request, Response
+from fastapi.requests import HTTPConnection
+
+from yoga_pose_recognition.data_store import DataStore
+
+
+def get_data_store(connection: HTTPConnection) -> DataStore:
+    return connection.app.state.data_store
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def document_response(request: Request, store: DataStore, name: str) -> Response:
+    """
+    Serves the pre-serialized body of a data document.
+
+    Clients polling with ``If-None-Match`` get a bodiless 304 until the file
+    changes.
+    """
+    document = store.document(name)
+    # no-cache: always revalidate, the file may be edited at any time
+    headers = {"ETag": document.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), document.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=document.body,
+        media_type="application/json",
+        headers=headers,
+    )
@@ -0,0 +1,5 @@
+"""Pipeline metrics API."""
+
+from yoga_pose_recognition.web.api.metrics.views import router
+
+__all__ = ["router"]
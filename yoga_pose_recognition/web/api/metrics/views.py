@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from yoga_pose_recognition.detection.session_manager import SessionManager
+from yoga_pose_recognition.detection.utils.metrics import prometheus_text
+from yoga_pose_recognition.web.api.video.views import get_session_manager
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics(
+    sessions: SessionManager = Depends(get_session_manager),
+) -> PlainTextResponse:
+    return PlainTextResponse(
+        prometheus_text(d.metrics for d in sessions.sessions.values()),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
+
+
+@router.get("/json")
+async def get_metrics_json(
+    sessions: SessionManager = Depends(get_session_manager),
+) -> JSONResponse:
+    return JSONResponse(
+        content={
+            session_id: detector.metrics.to_json()
+            for session_id, detector in sessions.sessions.items()
+        },
+    )
@@ -0,0 +1,5 @@
+"""Health and readiness API."""
+
+from yoga_pose_recognition.web.api.monitoring.views import router
+
+__all__ = ["router"]
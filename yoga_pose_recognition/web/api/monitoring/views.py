@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends
+from fastapi.requests import HTTPConnection
+from fastapi.responses import JSONResponse
+
+from yoga_pose_recognition.web.readiness import Readiness
+
+router = APIRouter()
+
+
+def get_readiness(connection: HTTPConnection) -> Readiness:
+    return connection.app.state.readiness
+
+
+@router.get("/health")
+async def health_check() -> JSONResponse:
+    """Answers as soon as the server is listening."""
+    return JSONResponse(content={"status": "ok"})
+
+
+@router.get("/ready")
+async def readiness_check(
+    readiness: Readiness = Depends(get_readiness),
+) -> JSONResponse:
+    """
+    Startup progress: 200 once the default session has warmed up.
+
+    503 while starting or after startup failed, with the current step or
+    the error.
+    """
+    return JSONResponse(
+        status_code=200 if readiness.is_ready else 503,
+        content=readiness.to_dict(),
+    )
@@ -1,7 +1,9 @@
 from fastapi.routing import APIRouter
 
-from yoga_pose_recognition.web.api import course, video
+from yoga_pose_recognition.web.api import course, metrics, monitoring, video
 
 api_router = APIRouter()
+api_router.include_router(monitoring.router, tags=["monitoring"])
 api_router.include_router(video.router, prefix="/video", tags=["video"])
 api_router.include_router(course.router, prefix="/course", tags=["course"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
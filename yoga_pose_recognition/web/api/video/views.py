@@ -1,20 +1,65 @@
 import asyncio
-import json
+import time
+from contextlib import aclosing
+from typing import Any, Coroutine, List
 
-import aiofiles
-from fastapi import APIRouter, Depends, WebSocket
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, WebSocket
+from fastapi.requests import HTTPConnection
 from fastapi.responses import JSONResponse, StreamingResponse
-from pydantic import BaseModel
+from loguru import logger
+from pydantic import BaseModel, Field, ValidationError
 
+from yoga_pose_recognition.data_store import BACKGROUND, COURSE, DataStore
+from yoga_pose_recognition.detection.recording import (
+    RECORDING_NAME_PATTERN,
+    RECORDING_SUFFIX,
+    Recording,
+    RecordingPlayer,
+)
+from yoga_pose_recognition.detection.session_manager import (
+    DEFAULT_SESSION_ID,
+    SessionManager,
+)
+from yoga_pose_recognition.detection.utils.stream_encoding import (
+    JPEG,
+    StreamProfile,
+    available_codecs,
+)
 from yoga_pose_recognition.detection.yoga_pose_detector import YogaPoseDetector
+from yoga_pose_recognition.settings import settings
+from yoga_pose_recognition.web.api.documents import document_response, get_data_store
 
 router = APIRouter()
 
-yoga_pose_detector = YogaPoseDetector()
 
+def get_session_manager(connection: HTTPConnection) -> SessionManager:
+    return connection.app.state.sessions
 
-def get_yoga_pose_detector() -> YogaPoseDetector:
-    return yoga_pose_detector
+
+def get_yoga_pose_detector(
+    connection: HTTPConnection,
+    sessions: SessionManager = Depends(get_session_manager),
+) -> YogaPoseDetector:
+    """
+    Detector of ``/{session_id}/...``.
+
+    The routes without a session id keep working on the default session,
+    which answers 503 until it has started. The id is only taken from the
+    path, so a ``session_id`` query on those routes cannot reach another
+    session.
+    """
+    session_id = connection.path_params.get("session_id", DEFAULT_SESSION_ID)
+    readiness = connection.app.state.readiness
+    if session_id == DEFAULT_SESSION_ID and not readiness.is_ready:
+        raise HTTPException(
+            status_code=503,
+            detail=readiness.error or f"Server is {readiness.step}.",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return sessions.get(session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from None
 
 
 class Pose(BaseModel):
@@ -25,7 +70,133 @@ class Background(BaseModel):
     path: str
 
 
+class CourseStart(BaseModel):
+    course_id: int
+
+
+class Session(BaseModel):
+    # Also used as a metrics label, so keep it to safe characters
+    session_id: str = Field(pattern=r"^[A-Za-z0-9_-]{1,64}$")
+    camera: int | str = 0
+    num_poses: int = Field(default=settings.num_poses, ge=1)
+    # Play this recording instead of opening the camera
+    replay: str | None = Field(default=None, pattern=RECORDING_NAME_PATTERN)
+    replay_speed: float = Field(default=1.0, gt=0)
+    # Re-score the replay against this pose instead of the recorded ones
+    replay_pose: str | None = None
+
+
+class RecordingStart(BaseModel):
+    # Defaults to <session id>-<date>-<time>
+    name: str | None = Field(default=None, pattern=RECORDING_NAME_PATTERN)
+
+
+class StreamRequest(BaseModel):
+    # Codecs the client can decode, preferred first
+    codecs: List[str] = [JPEG]
+    scale: float = Field(default=1.0, gt=0, le=1)
+    quality: int = Field(default=80, ge=1, le=100)
+    bitrate_kbps: int = Field(default=1500, ge=100, le=20000)
+
+
+def _session_info(detector: YogaPoseDetector) -> dict:
+    return {
+        "session_id": detector.session_id,
+        "camera": detector.camera_source,
+        "num_poses": detector.num_poses,
+        "pose": detector.current_pose,
+        "running": detector.is_running,
+        "recording": detector.recording,
+        "replay": (
+            detector.replay.recording.name if detector.replay is not None else None
+        ),
+    }
+
+
+@router.get("/sessions")
+async def get_sessions(
+    sessions: SessionManager = Depends(get_session_manager),
+) -> JSONResponse:
+    return JSONResponse(
+        content=[_session_info(d) for d in sessions.sessions.values()],
+    )
+
+
+@router.post("/sessions")
+async def post_session(
+    session: Session,
+    sessions: SessionManager = Depends(get_session_manager),
+    store: DataStore = Depends(get_data_store),
+) -> JSONResponse:
+    replay_pose = session.replay_pose
+    if replay_pose is not None and replay_pose not in store.pose_index.poses:
+        return JSONResponse(
+            status_code=400,
+            content={"message": f"Pose {replay_pose} not found in pose data."},
+        )
+    try:
+        replay = None
+        if session.replay is not None:
+            replay = RecordingPlayer(
+                Recording(settings.recordings_dir, session.replay),
+                speed=session.replay_speed,
+                pose=session.replay_pose,
+            )
+        detector = await asyncio.to_thread(
+            sessions.create,
+            session.session_id,
+            session.camera,
+            session.num_poses,
+            replay=replay,
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=(
+                f"Recording {session.replay} not found."
+                if session.replay is not None
+                else str(e)
+            ),
+        ) from None
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"message": str(e)},
+        )
+    return JSONResponse(content=_session_info(detector))
+
+
+@router.get("/recordings")
+async def get_recordings() -> JSONResponse:
+    infos = []
+    for path in sorted(settings.recordings_dir.glob(f"*{RECORDING_SUFFIX}")):
+        try:
+            infos.append(Recording(settings.recordings_dir, path.stem).info())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping recording {path}: {e}")
+    return JSONResponse(content=infos)
+
+
+@router.delete("/{session_id}")
+async def delete_session(
+    session_id: str,
+    sessions: SessionManager = Depends(get_session_manager),
+) -> JSONResponse:
+    try:
+        # Joins the pipeline threads and closes the landmarker.
+        await asyncio.to_thread(sessions.remove, session_id)
+    except KeyError as e:
+        return JSONResponse(
+            status_code=404,
+            content={"message": str(e)},
+        )
+    return JSONResponse(
+        content={"message": "Session removed successfully"},
+    )
+
+
 @router.get("/frame", response_class=StreamingResponse)
+@router.get("/{session_id}/frame", response_class=StreamingResponse)
 async def get_frame(
     detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
 ) -> StreamingResponse:
@@ -36,7 +207,16 @@ async def get_frame(
     )
 
 
+@router.get("/stats")
+@router.get("/{session_id}/stats")
+async def get_stats(
+    detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
+) -> JSONResponse:
+    return JSONResponse(content=detector.pipeline_stats)
+
+
 @router.post("/pose")
+@router.post("/{session_id}/pose")
 async def post_pose(
     pose: Pose,
     detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
@@ -53,19 +233,236 @@ async def post_pose(
     )
 
 
+@router.post("/course")
+@router.post("/{session_id}/course")
+async def post_course(
+    course: CourseStart,
+    detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
+    store: DataStore = Depends(get_data_store),
+) -> JSONResponse:
+    """Plays a course of data/course.json, switching poses on the server."""
+    courses = store.document(COURSE).data.courses
+    selected = next((c for c in courses if c.id == course.course_id), None)
+    if selected is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Course {course.course_id} not found.",
+        )
+    try:
+        detector.start_course(selected)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"message": str(e)},
+        )
+    return JSONResponse(
+        content={"message": "Course started successfully"},
+    )
+
+
+@router.get("/course")
+@router.get("/{session_id}/course")
+async def get_course(
+    detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
+) -> JSONResponse:
+    progress = detector.course_progress
+    if progress is None:
+        raise HTTPException(status_code=404, detail="No course is running.")
+    return JSONResponse(content=progress.model_dump())
+
+
+@router.post("/course/stop")
+@router.post("/{session_id}/course/stop")
+async def stop_course(
+    detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
+) -> JSONResponse:
+    detector.stop_course()
+    return JSONResponse(
+        content={"message": "Course stopped successfully"},
+    )
+
+
+@router.post("/recording")
+@router.post("/{session_id}/recording")
+async def post_recording(
+    recording: RecordingStart,
+    detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
+) -> JSONResponse:
+    """Starts appending the session's landmarks and verdicts to a recording."""
+    name = recording.name or f"{detector.session_id}-{time.strftime('%Y%m%d-%H%M%S')}"
+    try:
+        detector.start_recording(name)
+    except (FileExistsError, ValueError) as e:
+        return JSONResponse(
+            status_code=400,
+            content={"message": str(e)},
+        )
+    return JSONResponse(
+        content={"message": "Recording started successfully", "name": name},
+    )
+
+
+@router.post("/recording/stop")
+@router.post("/{session_id}/recording/stop")
+async def stop_recording(
+    detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
+) -> JSONResponse:
+    recorder = detector.stop_recording()
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Not recording.")
+    return JSONResponse(
+        content={
+            "message": "Recording stopped successfully",
+            "name": recorder.name,
+            "records": recorder.records,
+        },
+    )
+
+
+async def _forward_until_disconnect(
+    websocket: WebSocket,
+    forward: Coroutine[Any, Any, None],
+) -> None:
+    # Pose events may stay quiet for a long time, so watch the receive side
+    # to notice a closed socket without waiting for the next send.
+    forward_task = asyncio.create_task(forward)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        forward_task.cancel()
+
+
 @router.websocket("/is_pose_wrong/ws")
+@router.websocket("/{session_id}/is_pose_wrong/ws")
 async def recognition_websocket(
     *,
     websocket: WebSocket,
     detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
 ) -> None:
     await websocket.accept()
-    while True:
-        await websocket.send_text(f"{detector.is_current_frame_wrong}")
-        await asyncio.sleep(0.5)
+
+    async def forward() -> None:
+        is_wrong = detector.is_current_frame_wrong
+        await websocket.send_text(f"{is_wrong}")
+        async with aclosing(detector.pose_events()) as events:
+            async for event in events:
+                if event.is_wrong != is_wrong:
+                    is_wrong = event.is_wrong
+                    await websocket.send_text(f"{is_wrong}")
+
+    await _forward_until_disconnect(websocket, forward())
+
+
+@router.websocket("/pose_events/ws")
+@router.websocket("/{session_id}/pose_events/ws")
+async def pose_events_websocket(
+    *,
+    websocket: WebSocket,
+    detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
+) -> None:
+    await websocket.accept()
+
+    async def forward() -> None:
+        async with aclosing(detector.pose_events()) as events:
+            async for event in events:
+                await websocket.send_text(event.model_dump_json())
+
+    await _forward_until_disconnect(websocket, forward())
+
+
+@router.websocket("/course/ws")
+@router.websocket("/{session_id}/course/ws")
+async def course_websocket(
+    *,
+    websocket: WebSocket,
+    detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
+) -> None:
+    """Course progress and per-pose statistics, see ``CourseProgress``."""
+    await websocket.accept()
+
+    async def forward() -> None:
+        async with aclosing(detector.course_events()) as events:
+            async for progress in events:
+                await websocket.send_text(progress.model_dump_json())
+
+    await _forward_until_disconnect(websocket, forward())
+
+
+@router.websocket("/stream/ws")
+@router.websocket("/{session_id}/stream/ws")
+async def stream_websocket(
+    *,
+    websocket: WebSocket,
+    detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
+) -> None:
+    """
+    Binary frame stream with a negotiated codec.
+
+    The client first sends a ``StreamRequest`` as JSON. The server answers
+    with {"codec": ...}, the first requested codec it supports, and then
+    sends one binary message per frame: a JPEG, or an Annex-B H.264 access
+    unit. H.264 always starts at a keyframe.
+    """
+    await websocket.accept()
+    try:
+        request = StreamRequest.model_validate_json(await websocket.receive_text())
+    except ValidationError as e:
+        await websocket.close(code=1008, reason=str(e)[:120])
+        return
+
+    codec = next((c for c in request.codecs if c in available_codecs()), None)
+    if codec is None:
+        await websocket.send_json({"codec": None, "available": available_codecs()})
+        await websocket.close(code=1008, reason="No supported codec.")
+        return
+    await websocket.send_json({"codec": codec})
+
+    # Only the knobs of the chosen codec, so equal streams share an encoder.
+    defaults = StreamProfile()
+    profile = StreamProfile(
+        codec=codec,
+        scale=request.scale,
+        quality=request.quality if codec == JPEG else defaults.quality,
+        bitrate_kbps=request.bitrate_kbps if codec != JPEG else defaults.bitrate_kbps,
+    )
+
+    async def forward() -> None:
+        async with aclosing(detector.encoded_stream(profile)) as chunks:
+            async for chunk in chunks:
+                await websocket.send_bytes(chunk)
+
+    await _forward_until_disconnect(websocket, forward())
+
+
+@router.websocket("/landmarks/ws")
+@router.websocket("/{session_id}/landmarks/ws")
+async def landmarks_websocket(
+    *,
+    websocket: WebSocket,
+    mask: bool = False,
+    detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
+) -> None:
+    """
+    Binary landmarks and connection status per frame, no video.
+
+    With ``?mask=true`` a run-length coded low-res mask follows each frame.
+    See ``detection/landmark_packets.py`` for the layout.
+    """
+    await websocket.accept()
+
+    async def forward() -> None:
+        async with aclosing(detector.landmark_packets(with_mask=mask)) as packets:
+            async for packet in packets:
+                await websocket.send_bytes(packet)
+
+    await _forward_until_disconnect(websocket, forward())
 
 
 @router.post("/background")
+@router.post("/{session_id}/background")
 async def post_background(
     bg: Background,
     detector: YogaPoseDetector = Depends(get_yoga_pose_detector),
@@ -83,8 +480,8 @@ async def post_background(
 
 
 @router.get("/background")
-async def get_background() -> JSONResponse:
-    async with aiofiles.open("data/background.json", mode="r") as f:
-        contents = await f.read()
-        json_data = json.loads(contents)
-        return JSONResponse(content=json_data)
+async def get_background(
+    request: Request,
+    store: DataStore = Depends(get_data_store),
+) -> Response:
+    return document_response(request, store, BACKGROUND)
@@ -1,16 +1,42 @@
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncGenerator
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import UJSONResponse
 
-from yoga_pose_recognition.detection.yoga_pose_detector import YogaPoseDetector
+from yoga_pose_recognition.data_store import DataStore
+from yoga_pose_recognition.detection.session_manager import SessionManager
 from yoga_pose_recognition.log import configure_logging
+from yoga_pose_recognition.settings import settings
 from yoga_pose_recognition.web.api.router import api_router
+from yoga_pose_recognition.web.readiness import Readiness, start_default_session
 
 APP_ROOT = Path(__file__).parent.parent
 
 
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    # Camera and model load after the server is listening, see /api/ready.
+    startup = asyncio.create_task(
+        start_default_session(app.state.sessions, app.state.readiness),
+    )
+    watcher = None
+    if settings.data_reload_interval > 0:
+        watcher = asyncio.create_task(
+            app.state.data_store.watch(settings.data_reload_interval),
+        )
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    # Its threads cannot be cancelled; closing first could leave the default
+    # session's camera and model open.
+    await startup
+    app.state.sessions.close()
+
+
 def get_app() -> FastAPI:
     """
     Get FastAPI application.
@@ -27,6 +53,7 @@ def get_app() -> FastAPI:
         redoc_url="/api/redoc",
         openapi_url="/api/openapi.json",
         default_response_class=UJSONResponse,
+        lifespan=_lifespan,
     )
 
     # Add CORS middleware
@@ -44,7 +71,11 @@ def get_app() -> FastAPI:
     # This directory is used to access swagger files.
     # app.mount("/static", StaticFiles(directory=APP_ROOT / "static"), name="static")
 
-    # Initialize YogaPoseDetector
-    app.state.detector = YogaPoseDetector()
+    # pose/course/background JSON, parsed once and reloaded when edited
+    app.state.data_store = DataStore()
+    # Detector sessions, "default" backs the routes without a session id
+    app.state.sessions = SessionManager(app.state.data_store)
+    # The default session is opened in the lifespan, in the background
+    app.state.readiness = Readiness()
 
     return app
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from typing import Any, Dict
+
+import cv2
+from loguru import logger
+
+from yoga_pose_recognition.detection.session_manager import (
+    DEFAULT_SESSION_ID,
+    SessionManager,
+)
+from yoga_pose_recognition.settings import settings
+
+STARTING = "starting"
+READY = "ready"
+FAILED = "failed"
+
+
+class Readiness:
+    """
+    Progress of the startup work that runs after the server is listening.
+
+    Written by ``start_default_session`` and read by ``/api/ready``.
+    """
+
+    def __init__(self) -> None:
+        self.status = STARTING
+        self.step = STARTING
+        self.error: str | None = None
+        # Seconds each finished step took
+        self.durations: Dict[str, float] = {}
+        self.__started = time.monotonic()
+        self.__step_started = self.__started
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == READY
+
+    def begin(self, step: str) -> None:
+        self.__finish_step()
+        self.step = step
+        logger.info(f"Startup: {step}.")
+
+    def ready(self) -> None:
+        self.__finish_step()
+        self.status = self.step = READY
+        logger.info(f"Ready after {time.monotonic() - self.__started:.2f}s.")
+
+    def fail(self, error: str) -> None:
+        self.status = FAILED
+        self.error = error
+
+    def __finish_step(self) -> None:
+        now = time.monotonic()
+        if self.step != STARTING:
+            self.durations[self.step] = round(now - self.__step_started, 3)
+        self.__step_started = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "step": self.step,
+            "error": self.error,
+            "elapsed_s": round(time.monotonic() - self.__started, 3),
+            "durations_s": self.durations,
+        }
+
+
+async def start_default_session(
+    sessions: SessionManager,
+    readiness: Readiness,
+) -> None:
+    """Opens the camera and model of the default session and warms it up."""
+    try:
+        readiness.begin("opening camera and loading model")
+        detector = await asyncio.to_thread(
+            sessions.create,
+            DEFAULT_SESSION_ID,
+            settings.camera_source,
+            settings.num_poses,
+        )
+        readiness.begin("warming up")
+        image = None
+        if settings.warm_up_image is not None:
+            image = await asyncio.to_thread(cv2.imread, str(settings.warm_up_image))
+            if image is None:
+                logger.warning(
+                    f"Cannot read {settings.warm_up_image}, using a blank frame.",
+                )
+        await asyncio.to_thread(detector.warm_up, image)
+    except Exception as e:
+        logger.exception("Starting the default session failed.")
+        readiness.fail(str(e))
+        return
+    readiness.ready()